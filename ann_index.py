@@ -0,0 +1,161 @@
+import numpy as np
+
+from append_buffer import AppendBuffer
+
+
+def kmeans(vectors, k, iterations=10, sample_size=None, seed=0, chunk_size=8192):
+    """K-means sederhana berbasis NumPy untuk melatih centroid IVF"""
+    rng = np.random.default_rng(seed)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if sample_size and len(vectors) > sample_size:
+        vectors = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+
+    k = min(k, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+
+    for _ in range(iterations):
+        assign = assign_nearest(vectors, centroids, chunk_size)
+        counts = np.bincount(assign, minlength=k)
+        order = np.argsort(assign, kind='stable')
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        sums = np.zeros_like(centroids)
+        filled = counts > 0
+        sums[filled] = np.add.reduceat(vectors[order], starts[filled], axis=0)
+
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+            counts[empty] = 1
+        centroids = sums / counts[:, None]
+
+    return centroids.astype(np.float32)
+
+
+def assign_nearest(vectors, centroids, chunk_size=8192):
+    """Indeks centroid terdekat untuk setiap vektor (diproses per potongan agar hemat memori)"""
+    c_norms = np.einsum('ij,ij->i', centroids, centroids)
+    assign = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_size):
+        chunk = vectors[start:start + chunk_size]
+        scores = c_norms[None, :] - 2.0 * (chunk @ centroids.T)
+        assign[start:start + chunk_size] = np.argmin(scores, axis=1)
+    return assign
+
+
+class IVFIndex:
+    """Indeks inverted-file (IVF) untuk pencarian tetangga terdekat aproksimasi
+
+    Indeks hanya menyimpan nomor baris galeri per sel; vektornya tetap dibaca dari
+    matriks galeri saat pencarian sehingga tidak ada salinan kedua di memori.
+    nprobe adalah pengatur recall/kecepatan: makin banyak sel yang diperiksa,
+    makin mendekati hasil pencarian eksak.
+    """
+
+    def __init__(self, nlist=None, nprobe=8, min_size=2000, iterations=10, seed=0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_size = min_size
+        self.iterations = iterations
+        self.seed = seed
+        self.centroids = None
+        self._c_norms = None
+        self._lists = []
+        self._assign = AppendBuffer(dtype=np.int64)
+        self._trained_size = 0
+
+    def __len__(self):
+        return len(self._assign)
+
+    def fork(self):
+        """Salinan copy-on-write: daftar sel disalin dangkal, array per sel diganti (bukan diubah) saat berubah"""
+        other = IVFIndex(self.nlist, self.nprobe, self.min_size, self.iterations, self.seed)
+        other.centroids = self.centroids
+        other._c_norms = self._c_norms
+        other._lists = list(self._lists)
+        other._assign = self._assign.fork()
+        other._trained_size = self._trained_size
+        return other
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def needs_retrain(self):
+        """Latih ulang jika galeri sudah tumbuh jauh melebihi ukuran saat pelatihan"""
+        return not self.is_trained or len(self) > 4 * max(self._trained_size, self.min_size)
+
+    def build(self, matrix):
+        """Melatih centroid dan memasukkan seluruh baris matriks galeri"""
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if not len(matrix):
+            self.centroids = None
+            self._lists = []
+            self._assign = AppendBuffer(dtype=np.int64)
+            self._trained_size = 0
+            return
+
+        nlist = self.nlist or max(1, int(4 * np.sqrt(len(matrix))))
+        self.centroids = kmeans(matrix, nlist, self.iterations, sample_size=40 * nlist, seed=self.seed)
+        self._c_norms = np.einsum('ij,ij->i', self.centroids, self.centroids)
+        assign = assign_nearest(matrix, self.centroids)
+        self._assign = AppendBuffer(assign)
+
+        order = np.argsort(assign, kind='stable')
+        bounds = np.searchsorted(assign[order], np.arange(len(self.centroids) + 1))
+        self._lists = [order[bounds[c]:bounds[c + 1]].astype(np.int64) for c in range(len(self.centroids))]
+        self._trained_size = len(matrix)
+
+    def add(self, row_id, vector):
+        """Menambahkan satu baris baru (row_id harus sama dengan posisi barisnya di galeri)"""
+        if not self.is_trained:
+            return
+        if row_id != len(self._assign):
+            raise ValueError("row_id harus berada di akhir galeri")
+        cell = int(assign_nearest(np.asarray(vector, dtype=np.float32).reshape(1, -1), self.centroids)[0])
+        self._lists[cell] = np.append(self._lists[cell], row_id)
+        self._assign.append(cell)
+
+    def remove(self, row_id):
+        """Menghapus satu baris dan menggeser nomor baris setelahnya seperti pada galeri"""
+        if not self.is_trained:
+            return
+        cell = self._assign.array[row_id]
+        ids = self._lists[cell]
+        self._lists[cell] = ids[ids != row_id]
+        self._assign.delete(row_id)
+        # Array sel bisa dibagi dengan snapshot lama (fork), jadi diganti alih-alih diubah di tempat
+        for c, ids in enumerate(self._lists):
+            shift = ids > row_id
+            if shift.any():
+                self._lists[c] = ids - shift
+
+    def candidates(self, query, nprobe=None):
+        """Nomor baris kandidat dari nprobe sel terdekat"""
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        c_dist = self._c_norms - 2.0 * (self.centroids @ query)
+        cells = np.argpartition(c_dist, nprobe - 1)[:nprobe]
+        return np.concatenate([self._lists[c] for c in cells])
+
+    def search(self, queries, matrix, sq_norms, k=1, nprobe=None, allowed=None):
+        """Mengembalikan (ids, jarak) berukuran (jumlah query x k), diisi -1/inf bila kandidat kurang
+
+        allowed (opsional) adalah mask boolean per baris; kandidat di luar mask tidak dihitung.
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(len(queries), -1)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        dists = np.full((len(queries), k), np.inf, dtype=np.float32)
+
+        for qi, query in enumerate(queries):
+            cand = self.candidates(query, nprobe)
+            if allowed is not None:
+                cand = cand[allowed[cand]]
+            if not len(cand):
+                continue
+            sq = query @ query + sq_norms[cand] - 2.0 * (matrix[cand] @ query)
+            kk = min(k, len(cand))
+            top = np.argpartition(sq, kk - 1)[:kk]
+            top = top[np.argsort(sq[top])]
+            ids[qi, :kk] = cand[top]
+            dists[qi, :kk] = np.sqrt(np.maximum(sq[top], 0.0))
+
+        return ids, dists
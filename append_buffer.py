@@ -0,0 +1,66 @@
+import numpy as np
+
+
+class AppendBuffer:
+    """Array NumPy berkapasitas cadangan yang bisa dibagi oleh snapshot copy-on-write
+
+    Setiap pemilik hanya membaca [:len] miliknya. fork() memakai buffer yang sama tanpa menyalin;
+    append menulis tepat setelah baris terakhir pemiliknya selama belum ada pemilik lain yang menulis
+    di sana (snapshot lama tidak pernah membaca posisi itu). Penghapusan di buffer yang dibagi, atau
+    append dari pemilik yang sudah tertinggal, menyalin buffer lebih dulu.
+    """
+
+    def __init__(self, data=None, row_shape=(), dtype=np.float32):
+        if data is None:
+            data = np.empty((0,) + tuple(row_shape), dtype=dtype)
+        self._data = data
+        self._size = len(data)
+        # Jumlah baris yang sudah dipakai pemilik terjauh buffer ini (dibagi antar fork)
+        self._claim = [self._size]
+        self._shared = False
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def array(self):
+        return self._data[:self._size]
+
+    @property
+    def dtype(self):
+        return self._data.dtype
+
+    def fork(self):
+        """Pemilik baru untuk buffer yang sama; O(1)"""
+        other = AppendBuffer.__new__(AppendBuffer)
+        other._data = self._data
+        other._size = self._size
+        other._claim = self._claim
+        other._shared = self._shared = True
+        return other
+
+    def _detach(self, capacity):
+        data = np.empty((capacity,) + self._data.shape[1:], dtype=self._data.dtype)
+        data[:self._size] = self._data[:self._size]
+        self._data = data
+        self._claim = [self._size]
+        self._shared = False
+
+    def append(self, rows):
+        rows = np.asarray(rows, dtype=self._data.dtype).reshape((-1,) + self._data.shape[1:])
+        end = self._size + len(rows)
+        if end > len(self._data):
+            self._detach(max(end, 2 * len(self._data), 16))
+        elif self._shared and self._claim[0] != self._size:
+            self._detach(len(self._data))
+        self._data[self._size:end] = rows
+        self._size = end
+        self._claim[0] = end
+
+    def delete(self, index):
+        """Menghapus satu baris; baris setelahnya bergeser satu"""
+        if self._shared or not self._data.flags.writeable:
+            self._detach(len(self._data))
+        self._data[index:self._size - 1] = self._data[index + 1:self._size]
+        self._size -= 1
+        self._claim[0] = self._size
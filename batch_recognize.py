@@ -0,0 +1,169 @@
+"""Pengenalan wajah batch tanpa UI untuk folder atau daftar gambar
+
+Contoh:
+    python batch_recognize.py arsip/2024 --output hasil.jsonl --workers 8
+    python batch_recognize.py --file-list daftar.txt --annotate-dir anotasi
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+import cv2
+
+from face_gallery import DEFAULT_TOLERANCE
+from gallery_store import load_gallery
+from recognition import FaceRecognizer
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+_recognizer = None
+_annotate_dir = None
+
+
+def iter_image_paths(inputs, recursive=True):
+    """Path gambar dari campuran folder dan file, dalam urutan stabil"""
+    for item in inputs:
+        if os.path.isdir(item):
+            if recursive:
+                for root, dirs, files in os.walk(item):
+                    dirs.sort()
+                    for filename in sorted(files):
+                        if filename.lower().endswith(IMAGE_EXTENSIONS):
+                            yield os.path.join(root, filename)
+            else:
+                for filename in sorted(os.listdir(item)):
+                    path = os.path.join(item, filename)
+                    if os.path.isfile(path) and filename.lower().endswith(IMAGE_EXTENSIONS):
+                        yield path
+        else:
+            yield item
+
+
+def read_file_list(path):
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def _init_worker(model_dir, tolerance, annotate_dir):
+    """Initializer pool: setiap worker memuat galeri dan detektor satu kali"""
+    global _recognizer, _annotate_dir
+    _recognizer = FaceRecognizer(load_gallery(model_dir), tolerance=tolerance)
+    _annotate_dir = annotate_dir
+
+
+def _finite(value):
+    return round(value, 6) if math.isfinite(value) else None
+
+
+def annotated_path(annotate_dir, image_path):
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    digest = hashlib.sha1(os.path.abspath(image_path).encode('utf-8')).hexdigest()[:8]
+    return os.path.join(annotate_dir, f"{stem}_{digest}.jpg")
+
+
+def recognize_path(image_path, recognizer=None, annotate_dir=None):
+    """Mengenali satu file gambar dan mengembalikan record yang siap ditulis sebagai JSONL"""
+    recognizer = recognizer or _recognizer
+    start = time.perf_counter()
+    record = {'image': image_path}
+
+    frame = cv2.imread(image_path)
+    if frame is None:
+        record['error'] = 'Gagal membaca gambar'
+        return record
+
+    try:
+        detections = recognizer.recognize_frame(frame, encode=len(recognizer.gallery) > 0)
+    except Exception as e:
+        record['error'] = str(e)
+        return record
+
+    record['width'] = frame.shape[1]
+    record['height'] = frame.shape[0]
+    record['faces'] = []
+    for face, (top, right, bottom, left), match in detections:
+        entry = {
+            'box': {'top': int(top), 'right': int(right), 'bottom': int(bottom), 'left': int(left)},
+            'score': round(float(face['score'][0]), 4),
+            'name': None,
+            'distance': None,
+            'confidence': None,
+        }
+        if match is not None:
+            entry['name'] = match.name
+            entry['distance'] = _finite(match.distance)
+            entry['confidence'] = _finite(match.confidence)
+        record['faces'].append(entry)
+
+    annotate_dir = annotate_dir or _annotate_dir
+    if annotate_dir:
+        output_path = annotated_path(annotate_dir, image_path)
+        cv2.imwrite(output_path, recognizer.annotate_frame(frame, detections))
+        record['annotated'] = output_path
+
+    record['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return record
+
+
+def recognize_images(image_paths, model_dir='saved_models', processes=None, tolerance=DEFAULT_TOLERANCE,
+                     annotate_dir=None, chunksize=4):
+    """Generator record hasil pengenalan; gambar dibagi ke beberapa proses (urutan hasil tidak dijamin)"""
+    if annotate_dir:
+        os.makedirs(annotate_dir, exist_ok=True)
+
+    if processes == 1:
+        _init_worker(model_dir, tolerance, annotate_dir)
+        for image_path in image_paths:
+            yield recognize_path(image_path)
+        return
+
+    with Pool(processes=processes, initializer=_init_worker, initargs=(model_dir, tolerance, annotate_dir)) as pool:
+        for record in pool.imap_unordered(recognize_path, image_paths, chunksize=chunksize):
+            yield record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pengenalan wajah batch (output JSONL)")
+    parser.add_argument('inputs', nargs='*', help="Folder atau file gambar")
+    parser.add_argument('--file-list', help="File teks berisi satu path gambar per baris")
+    parser.add_argument('--output', '-o', default='-', help="File JSONL output (default: stdout)")
+    parser.add_argument('--model-dir', default='saved_models')
+    parser.add_argument('--workers', '-w', type=int, default=None, help="Jumlah proses (default: jumlah core)")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--annotate-dir', help="Simpan gambar beranotasi ke folder ini")
+    parser.add_argument('--no-recursive', action='store_true')
+    args = parser.parse_args(argv)
+
+    inputs = list(args.inputs)
+    if args.file_list:
+        inputs.extend(read_file_list(args.file_list))
+    if not inputs:
+        parser.error("Tidak ada input gambar")
+
+    image_paths = iter_image_paths(inputs, recursive=not args.no_recursive)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+
+    count = 0
+    errors = 0
+    start = time.perf_counter()
+    try:
+        for record in recognize_images(image_paths, args.model_dir, args.workers, args.tolerance, args.annotate_dir):
+            output.write(json.dumps(record, ensure_ascii=False) + '\n')
+            count += 1
+            errors += 'error' in record
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"{count} gambar diproses ({errors} error) dalam {elapsed:.1f} s "
+          f"({count / elapsed if elapsed else 0:.1f} gambar/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Benchmark indeks ANN (IVF) terhadap pencarian eksak
+
+Jalankan dari root repo:
+    python -m benchmarks.ann_benchmark --sizes 10000 100000 --nprobe 1 4 8 16 32
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from ann_index import IVFIndex
+from face_gallery import FaceGallery
+from benchmarks.synthetic import synthetic_encodings, synthetic_queries, synthetic_names
+
+
+def time_queries(gallery, queries):
+    """Latensi per query (ms) untuk pencarian satu wajah, seperti pada loop webcam"""
+    latencies = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        indices, _ = gallery._nearest(query[None, :], 1)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(indices[0, 0])
+    return np.array(latencies), np.array(results)
+
+
+def summarize(latencies):
+    return {
+        'p50_ms': round(float(np.percentile(latencies, 50)), 4),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 4),
+        'mean_ms': round(float(latencies.mean()), 4),
+    }
+
+
+def run(size, query_count, nprobes, nlist=None, seed=0):
+    encodings = synthetic_encodings(size, seed=seed)
+    queries, _ = synthetic_queries(encodings, query_count, seed=seed + 1)
+    gallery = FaceGallery(encodings, synthetic_names(size))
+
+    exact_latency, exact_ids = time_queries(gallery, queries)
+    report = {'size': size, 'queries': query_count, 'exact': summarize(exact_latency), 'ann': []}
+
+    start = time.perf_counter()
+    index = gallery.enable_ann(IVFIndex(nlist=nlist, min_size=0, seed=seed))
+    report['build_s'] = round(time.perf_counter() - start, 3)
+    report['nlist'] = len(index.centroids)
+
+    for nprobe in nprobes:
+        index.nprobe = nprobe
+        ann_latency, ann_ids = time_queries(gallery, queries)
+        entry = {'nprobe': nprobe, 'recall_at_1': round(float(np.mean(ann_ids == exact_ids)), 4)}
+        entry.update(summarize(ann_latency))
+        entry['speedup'] = round(float(np.median(exact_latency) / np.median(ann_latency)), 2)
+        report['ann'].append(entry)
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recall@1 dan latensi indeks ANN vs pencarian eksak")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 4, 8, 16, 32])
+    parser.add_argument('--nlist', type=int, default=None)
+    parser.add_argument('--json', help="Simpan hasil ke file JSON")
+    args = parser.parse_args()
+
+    reports = []
+    for size in args.sizes:
+        report = run(size, args.queries, args.nprobe, nlist=args.nlist)
+        reports.append(report)
+
+        print(f"\n=== Galeri {size} identitas (nlist={report['nlist']}, build {report['build_s']} s) ===")
+        print(f"eksak      p50 {report['exact']['p50_ms']:.3f} ms  p95 {report['exact']['p95_ms']:.3f} ms")
+        for entry in report['ann']:
+            print(f"nprobe {entry['nprobe']:>3}  p50 {entry['p50_ms']:.3f} ms  p95 {entry['p95_ms']:.3f} ms  "
+                  f"recall@1 {entry['recall_at_1']:.3f}  speedup {entry['speedup']}x")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
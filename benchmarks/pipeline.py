@@ -0,0 +1,260 @@
+"""Benchmark offline pipeline pengenalan (tanpa kamera, cukup CPU)
+
+Frame dibaca dari video rekaman atau folder gambar dan dilewatkan ke jalur kode yang sama
+dengan process_image (jalur "upload") dan loop webcam (jalur "webcam": tracker + overlay),
+terhadap galeri sintetis berbagai ukuran. Hasil berupa JSON agar bisa dibandingkan antar run:
+
+    python -m benchmarks.pipeline --video lobi.mp4 --gallery-sizes 1 1000 100000 --json hasil.json
+    python -m benchmarks.pipeline --video lobi.mp4 --baseline hasil_lama.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from ann_index import IVFIndex
+from detection import FaceDetectionStage
+from face_gallery import FaceGallery
+from gallery_store import load_gallery
+from recognition import FaceRecognizer
+from tracking import FaceTracker
+from benchmarks.sources import iter_frames, add_source_arguments
+from benchmarks.synthetic import synthetic_encodings, synthetic_names
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class StageRecorder:
+    """Mengumpulkan durasi mentah (ms) per tahap; antarmuka stage() sama dengan FaceRecognizer.timings"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[name].append((time.perf_counter() - start) * 1000)
+
+    def summary(self):
+        return {name: summarize(values) for name, values in sorted(self.samples.items())}
+
+
+def summarize(values):
+    values = np.asarray(values, dtype=np.float64)
+    return {
+        'count': int(len(values)),
+        'mean_ms': round(float(values.mean()), 4),
+        'p50_ms': round(float(np.percentile(values, 50)), 4),
+        'p90_ms': round(float(np.percentile(values, 90)), 4),
+        'p99_ms': round(float(np.percentile(values, 99)), 4),
+        'max_ms': round(float(values.max()), 4),
+    }
+
+
+def _peak_working_set_bytes():
+    """Puncak working set proses di Windows (psutil bila terpasang, selain itu GetProcessMemoryInfo)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset
+    except ImportError:
+        pass
+
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ('cb', wintypes.DWORD),
+            ('PageFaultCount', wintypes.DWORD),
+            ('PeakWorkingSetSize', ctypes.c_size_t),
+            ('WorkingSetSize', ctypes.c_size_t),
+            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+            ('PagefileUsage', ctypes.c_size_t),
+            ('PeakPagefileUsage', ctypes.c_size_t),
+        ]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        raise OSError("GetProcessMemoryInfo gagal")
+    return counters.PeakWorkingSetSize
+
+
+def peak_rss_mb():
+    """Puncak resident memory proses: ru_maxrss di Linux/macOS, peak working set di Windows"""
+    if resource is None:
+        return round(_peak_working_set_bytes() / (1024 * 1024), 1)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024) if platform.system() == 'Darwin' else peak / 1024, 1)
+
+
+def build_gallery(size, base=None, ann=False, seed=0):
+    """Galeri sintetis berukuran size, ditambah galeri asli (base) bila ada"""
+    encodings = synthetic_encodings(size, seed=seed)
+    names = synthetic_names(size)
+    if base is not None and len(base):
+        encodings = np.vstack([base.matrix, encodings])
+        names = list(base.names) + names
+    gallery = FaceGallery(encodings, names)
+    if ann:
+        gallery.enable_ann(IVFIndex())
+    return gallery
+
+
+def run_upload_path(recognizer, frames, recorder):
+    """Jalur process_image: batasi resolusi, deteksi, encoding, pencocokan, anotasi, konversi RGB"""
+    for frame in frames:
+        with recorder.stage('total'):
+            recognizer.recognize_image(frame)
+
+
+def run_webcam_path(recognizer, frames, recorder):
+    """Jalur loop webcam: deteksi + tracker (encoding selektif), anotasi, overlay teks, konversi tampilan"""
+    tracker = FaceTracker()
+    for frame in frames:
+        with recorder.stage('total'):
+            frame = frame.copy()
+            detections = recognizer.recognize_tracked(frame, tracker)
+            recognizer.annotate_frame(frame, detections)
+            with recorder.stage('display'):
+                cv2.putText(frame, f'Wajah: {len(detections)}', (10, 30), recognizer.font, 0.7, (255, 255, 0), 2)
+                cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    return {'encodes': tracker.encodes, 'encodes_skipped': tracker.encodes_skipped}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    frames = list(iter_frames(args.video, args.images, args.max_frames, args.stride))
+    if not frames:
+        raise SystemExit("Tidak ada frame yang bisa dibaca")
+
+    base = load_gallery(args.model_dir) if args.model_dir else None
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'commit': git_commit(),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'cpu_count': os.cpu_count(),
+            'source': args.video or args.images,
+            'frames': len(frames),
+            'frame_shape': list(frames[0].shape),
+            'detection_scale': args.detection_scale,
+            'ann': args.ann,
+        },
+        'runs': [],
+    }
+
+    if args.trace_memory:
+        tracemalloc.start()
+
+    for size in args.gallery_sizes:
+        gallery = build_gallery(size, base, ann=args.ann)
+        for path in args.paths:
+            recognizer = FaceRecognizer(gallery, detection=FaceDetectionStage(scale=args.detection_scale))
+            recorder = StageRecorder()
+            recognizer.timings = recorder
+
+            if args.trace_memory:
+                tracemalloc.reset_peak()
+
+            extra = {}
+            start = time.perf_counter()
+            if path == 'upload':
+                run_upload_path(recognizer, frames, recorder)
+            else:
+                extra = run_webcam_path(recognizer, frames, recorder)
+            elapsed = time.perf_counter() - start
+
+            entry = {
+                'path': path,
+                'gallery_size': len(gallery),
+                'frames': len(frames),
+                'fps': round(len(frames) / elapsed, 2) if elapsed else None,
+                'stages': recorder.summary(),
+                'peak_rss_mb': peak_rss_mb(),
+            }
+            if args.trace_memory:
+                entry['tracemalloc_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+            entry.update(extra)
+            report['runs'].append(entry)
+
+    if args.trace_memory:
+        tracemalloc.stop()
+    return report
+
+
+def print_report(report, baseline=None):
+    previous = {}
+    if baseline:
+        for entry in baseline['runs']:
+            previous[(entry['path'], entry['gallery_size'])] = entry
+
+    for entry in report['runs']:
+        print(f"\n=== jalur {entry['path']}, galeri {entry['gallery_size']} wajah: "
+              f"{entry['fps']} fps, peak RSS {entry['peak_rss_mb']} MB ===")
+        old = previous.get((entry['path'], entry['gallery_size']))
+        for name, stats in entry['stages'].items():
+            line = (f"{name:<12} n={stats['count']:<6} p50 {stats['p50_ms']:>9.3f} ms  "
+                    f"p90 {stats['p90_ms']:>9.3f} ms  p99 {stats['p99_ms']:>9.3f} ms")
+            if old and name in old['stages'] and old['stages'][name]['p50_ms']:
+                change = stats['p50_ms'] / old['stages'][name]['p50_ms'] - 1.0
+                line += f"  ({change:+.1%} vs baseline)"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark latensi per tahap pipeline pengenalan wajah")
+    add_source_arguments(parser)
+    parser.add_argument('--gallery-sizes', type=int, nargs='+', default=[1, 1000, 100000])
+    parser.add_argument('--paths', nargs='+', choices=['upload', 'webcam'], default=['upload', 'webcam'])
+    parser.add_argument('--model-dir', help="Tambahkan galeri asli dari folder model ini")
+    parser.add_argument('--detection-scale', type=float, default=1.0)
+    parser.add_argument('--ann', action='store_true', help="Gunakan indeks ANN pada galeri")
+    parser.add_argument('--trace-memory', action='store_true', help="Ukur puncak alokasi Python (lebih lambat)")
+    parser.add_argument('--json', help="Simpan hasil ke file JSON")
+    parser.add_argument('--baseline', help="File JSON hasil run sebelumnya untuk dibandingkan")
+    args = parser.parse_args()
+
+    report = run(args)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Benchmark identitas multi-sampel: sampel mentah vs prototipe per identitas vs satu foto per orang
+
+Setiap identitas diberi beberapa sampel di sekitar encoding "asli"-nya. Dilaporkan latensi
+match() per query, jumlah baris/prototipe yang dipindai, kesesuaian keputusan prototipe dengan
+pencocokan sampel mentah, dan berapa query yang jatuh ke pemeriksaan sampel mentah.
+
+Jalankan dari root repo:
+    python -m benchmarks.prototypes --identities 1000 10000 --samples 10
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from face_gallery import FaceGallery, DEFAULT_TOLERANCE
+from benchmarks.synthetic import synthetic_encodings, synthetic_names
+
+
+def multi_sample_gallery(identities, samples, noise=0.3, seed=0):
+    """(centroid asli, matriks sampel, nama) dengan samples sampel per identitas (jarak ke aslinya ~noise)"""
+    rng = np.random.default_rng(seed)
+    centers = synthetic_encodings(identities, seed=seed)
+    dim = centers.shape[1]
+    matrix = np.repeat(centers, samples, axis=0)
+    matrix += rng.normal(scale=noise / np.sqrt(dim), size=matrix.shape).astype(np.float32)
+    names = [name for name in synthetic_names(identities) for _ in range(samples)]
+    return centers, matrix, names
+
+
+def time_match(gallery, queries, tolerance):
+    latencies = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(gallery.match([query], tolerance=tolerance)[0])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies), results
+
+
+def run(identities, samples, query_count, noise=0.3, tolerance=DEFAULT_TOLERANCE, seed=0):
+    centers, matrix, names = multi_sample_gallery(identities, samples, noise, seed)
+    rng = np.random.default_rng(seed + 1)
+    truth = rng.integers(0, identities, size=query_count)
+    # Separuh query dekat dengan orangnya, separuh lagi sengaja di sekitar ambang toleransi
+    scale = np.where(np.arange(query_count) % 2, noise, 2 * noise)[:, None] / np.sqrt(centers.shape[1])
+    queries = (centers[truth] + rng.normal(size=(query_count, centers.shape[1])) * scale).astype(np.float32)
+
+    gallery = FaceGallery(matrix, names)
+    raw_latencies, raw_results = time_match(gallery, queries, tolerance)
+
+    start = time.perf_counter()
+    prototypes = gallery.enable_prototypes()
+    build_s = time.perf_counter() - start
+    proto_latencies, proto_results = time_match(gallery, queries, tolerance)
+
+    single = FaceGallery(centers, synthetic_names(identities))
+    single_latencies, _ = time_match(single, queries, tolerance)
+
+    return {
+        'identities': identities,
+        'samples_per_identity': samples,
+        'rows': len(gallery),
+        'prototypes': len(prototypes),
+        'build_s': round(build_s, 3),
+        'raw_p50_ms': round(float(np.percentile(raw_latencies, 50)), 4),
+        'prototype_p50_ms': round(float(np.percentile(proto_latencies, 50)), 4),
+        'single_photo_p50_ms': round(float(np.percentile(single_latencies, 50)), 4),
+        'decision_agreement': round(float(np.mean([a.name == b.name for a, b in zip(raw_results, proto_results)])), 5),
+        'fallback_rate': round(prototypes.fallbacks / float(query_count), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pencocokan identitas multi-sampel dengan prototipe")
+    parser.add_argument('--identities', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--samples', type=int, default=10, help="Sampel per identitas")
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--noise', type=float, default=0.3, help="Jarak khas sampel ke encoding asli orangnya")
+    parser.add_argument('--json', help="Simpan hasil ke file JSON")
+    args = parser.parse_args()
+
+    reports = []
+    for identities in args.identities:
+        report = run(identities, args.samples, args.queries, args.noise)
+        reports.append(report)
+        print(f"{identities} orang x {args.samples} sampel ({report['rows']} baris, {report['prototypes']} prototipe, "
+              f"dibangun {report['build_s']:.2f} s): mentah {report['raw_p50_ms']:.3f} ms, "
+              f"prototipe {report['prototype_p50_ms']:.3f} ms, satu foto {report['single_photo_p50_ms']:.3f} ms, "
+              f"keputusan sama {report['decision_agreement']:.4f}, fallback {report['fallback_rate']:.1%}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Benchmark galeri kompak (float16 / int8 + re-rank eksak) terhadap jalur float64 lama
+
+Jalur referensi meniru kode lama: list encoding float64 dan jarak per baris seperti
+face_recognition.face_distance. Galeri ditulis ke GalleryStore sementara lalu dimuat seperti
+aplikasi: float32 penuh di RAM, atau mode kompak (kode di RAM, baris float32 dari memmap).
+Dilaporkan waktu muat, latensi, memori di RAM, kesesuaian hasil top-1 (nama dan keputusan
+dikenal/tidak) dan selisih jarak terhadap referensi. Pemuatan kompak pertama membuat file kode,
+pemuatan kedua (yang dilaporkan) membacanya.
+
+Jalankan dari root repo:
+    python -m benchmarks.quantization --sizes 10000 100000 --rerank 8 32 128
+"""
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from face_gallery import DEFAULT_TOLERANCE
+from gallery_store import GalleryStore
+from benchmarks.synthetic import synthetic_encodings, synthetic_queries, synthetic_names
+
+
+def reference_match(encodings64, queries):
+    """Top-1 dan jarak dengan float64, seperti face_recognition.face_distance pada list encoding"""
+    ids = []
+    dists = []
+    for query in queries.astype(np.float64):
+        distances = np.linalg.norm(encodings64 - query, axis=1)
+        best = int(np.argmin(distances))
+        ids.append(best)
+        dists.append(distances[best])
+    return np.array(ids), np.array(dists)
+
+
+def time_matches(gallery, queries):
+    latencies = []
+    ids = []
+    dists = []
+    for query in queries:
+        start = time.perf_counter()
+        indices, distances = gallery._nearest(query[None, :], 1)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids.append(indices[0, 0])
+        dists.append(distances[0, 0])
+    return np.array(latencies), np.array(ids), np.array(dists)
+
+
+def run(size, query_count, codecs, reranks, tolerance=DEFAULT_TOLERANCE, seed=0):
+    encodings = synthetic_encodings(size, seed=seed)
+    queries, _ = synthetic_queries(encodings, query_count, seed=seed + 1)
+
+    ref_ids, ref_dists = reference_match(encodings.astype(np.float64), queries)
+    ref_known = ref_dists <= tolerance
+
+    with tempfile.TemporaryDirectory() as directory:
+        GalleryStore(directory).rewrite(encodings, synthetic_names(size))
+        report = {'size': size, 'queries': query_count, 'modes': []}
+        modes = [('float32', None)] + [(codec, rerank) for codec in codecs for rerank in reranks]
+        for codec, rerank in modes:
+            codec = None if codec == 'float32' else codec
+            GalleryStore(directory).load_gallery(codec, rerank=rerank)
+            start = time.perf_counter()
+            gallery = GalleryStore(directory).load_gallery(codec, rerank=rerank)
+            # Galeri float32 penuh dimuat ke RAM (memmap copy-on-write disalin pada penambahan pertama)
+            if codec is None:
+                gallery.set(np.array(gallery.matrix), gallery.names, gallery.sq_norms)
+            load_s = time.perf_counter() - start
+            if codec is None:
+                report['memory'] = gallery.memory_report()
+
+            latencies, ids, dists = time_matches(gallery, queries)
+            memory = gallery.memory_report()
+            report['modes'].append({
+                'codec': codec or 'float32',
+                'rerank': rerank,
+                'load_s': round(load_s, 3),
+                'p50_ms': round(float(np.percentile(latencies, 50)), 4),
+                'p95_ms': round(float(np.percentile(latencies, 95)), 4),
+                'top1_agreement': round(float(np.mean(ids == ref_ids)), 5),
+                'decision_agreement': round(float(np.mean((dists <= tolerance) == ref_known)), 5),
+                'max_distance_error': float(np.abs(dists - ref_dists).max()),
+                'compact_bytes': memory['compact_bytes'],
+                'total_bytes': memory['total_bytes'],
+            })
+            del gallery
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memori dan akurasi galeri kompak vs jalur float64")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--codecs', nargs='+', choices=['float16', 'int8'], default=['float16', 'int8'])
+    parser.add_argument('--rerank', type=int, nargs='+', default=[8, 32, 128])
+    parser.add_argument('--json', help="Simpan hasil ke file JSON")
+    args = parser.parse_args()
+
+    reports = []
+    for size in args.sizes:
+        report = run(size, args.queries, args.codecs, args.rerank)
+        reports.append(report)
+        memory = report['memory']
+
+        print(f"\n=== Galeri {size} wajah: list float64 {memory['float64_list_bytes'] / 2**20:.1f} MB, "
+              f"matriks float32 {memory['float32_bytes'] / 2**20:.1f} MB ===")
+        for entry in report['modes']:
+            print(f"{entry['codec']:<8} rerank {str(entry['rerank']):>4}  muat {entry['load_s']:.3f} s  "
+                  f"p50 {entry['p50_ms']:.3f} ms  top1 sama {entry['top1_agreement']:.4f}  "
+                  f"keputusan sama {entry['decision_agreement']:.4f}  selisih jarak maks {entry['max_distance_error']:.2e}  "
+                  f"RAM {entry['total_bytes'] / 2**20:.1f} MB")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Membandingkan skala deteksi / encoding ROI terhadap pemrosesan resolusi penuh
+
+Jalankan dari root repo, misalnya untuk memilih pengaturan per kamera:
+    python -m benchmarks.resolution --video rekaman_pintu1.mp4 --scales 1.0 0.5 0.25
+"""
+import argparse
+import itertools
+import json
+import time
+
+import numpy as np
+
+from detection import FaceDetectionStage
+from gallery_store import load_gallery
+from recognition import FaceRecognizer
+from tracking import location_iou
+from benchmarks.sources import iter_frames, add_source_arguments
+
+
+def make_recognizer(gallery, scale, roi, max_face_size, max_input_side=None):
+    recognizer = FaceRecognizer(gallery, detection=FaceDetectionStage(scale=scale))
+    recognizer.roi_encoding = roi
+    recognizer.max_face_size = max_face_size
+    recognizer.max_input_side = max_input_side
+    return recognizer
+
+
+def run_frame(recognizer, frame):
+    start = time.perf_counter()
+    frame = recognizer.limit_resolution(frame)
+    faces, face_locations, face_encodings = recognizer.detect_faces(frame)
+    matches = recognizer.match_faces(face_encodings) if face_encodings else []
+    elapsed = (time.perf_counter() - start) * 1000
+    return elapsed, face_locations, face_encodings, matches, frame.shape
+
+
+def compare(reference, candidate, ref_shape, cand_shape, iou_threshold=0.5):
+    """Mencocokkan wajah kandidat ke referensi (IoU), mengembalikan (ditemukan, nama sama, drift encoding)"""
+    _, ref_locations, ref_encodings, ref_matches = reference
+    _, cand_locations, cand_encodings, cand_matches = candidate
+    factor = ref_shape[0] / float(cand_shape[0])
+    cand_locations = [tuple(int(round(v * factor)) for v in location) for location in cand_locations]
+
+    found = agree = 0
+    drifts = []
+    used = set()
+    for ri, ref_location in enumerate(ref_locations):
+        best, best_iou = None, iou_threshold
+        for ci, cand_location in enumerate(cand_locations):
+            iou = location_iou(ref_location, cand_location)
+            if ci not in used and iou >= best_iou:
+                best, best_iou = ci, iou
+        if best is None:
+            continue
+        used.add(best)
+        found += 1
+        if ri < len(ref_matches) and best < len(cand_matches):
+            agree += ref_matches[ri].name == cand_matches[best].name
+        if ri < len(ref_encodings) and best < len(cand_encodings):
+            drifts.append(float(np.linalg.norm(ref_encodings[ri] - cand_encodings[best])))
+    return found, agree, drifts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latensi dan kesesuaian hasil vs resolusi penuh")
+    add_source_arguments(parser)
+    parser.add_argument('--model-dir', default='saved_models')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1.0, 0.75, 0.5, 0.25])
+    parser.add_argument('--max-face-size', type=int, nargs='+', default=[300])
+    parser.add_argument('--max-input-side', type=int, default=None)
+    parser.add_argument('--json', help="Simpan hasil ke file JSON")
+    args = parser.parse_args()
+
+    gallery = load_gallery(args.model_dir)
+    frames = list(iter_frames(args.video, args.images, args.max_frames, args.stride))
+    if not frames:
+        parser.error("Tidak ada frame yang bisa dibaca")
+
+    reference = make_recognizer(gallery, 1.0, False, None)
+    ref_results = []
+    ref_latency = []
+    for frame in frames:
+        elapsed, locations, encodings, matches, shape = run_frame(reference, frame)
+        ref_latency.append(elapsed)
+        ref_results.append(((elapsed, locations, encodings, matches), shape))
+
+    total_ref_faces = sum(len(result[1]) for result, _ in ref_results)
+    reports = [{
+        'config': 'referensi (skala 1.0, frame penuh)',
+        'p50_ms': round(float(np.percentile(ref_latency, 50)), 2),
+        'p95_ms': round(float(np.percentile(ref_latency, 95)), 2),
+        'faces': total_ref_faces,
+    }]
+
+    for scale, roi, max_face_size in itertools.product(args.scales, [True, False], args.max_face_size):
+        recognizer = make_recognizer(gallery, scale, roi, max_face_size if roi else None, args.max_input_side)
+        latency = []
+        found = agree = 0
+        drifts = []
+        for frame, (ref, ref_shape) in zip(frames, ref_results):
+            elapsed, locations, encodings, matches, shape = run_frame(recognizer, frame)
+            latency.append(elapsed)
+            f, a, d = compare(ref, (elapsed, locations, encodings, matches), ref_shape, shape)
+            found += f
+            agree += a
+            drifts.extend(d)
+
+        reports.append({
+            'config': f"skala {scale}, {'ROI' if roi else 'frame penuh'}"
+                      + (f", max_face {max_face_size}" if roi else ''),
+            'settings': recognizer.settings(),
+            'p50_ms': round(float(np.percentile(latency, 50)), 2),
+            'p95_ms': round(float(np.percentile(latency, 95)), 2),
+            'speedup': round(float(np.median(ref_latency) / max(np.median(latency), 1e-6)), 2),
+            'face_recall': round(found / total_ref_faces, 4) if total_ref_faces else None,
+            'name_agreement': round(agree / found, 4) if found else None,
+            'mean_encoding_drift': round(float(np.mean(drifts)), 4) if drifts else None,
+        })
+
+    print(f"{len(frames)} frame, {total_ref_faces} wajah pada referensi, galeri {len(gallery)} wajah\n")
+    for report in reports:
+        line = f"{report['config']:<45} p50 {report['p50_ms']:>8.2f} ms  p95 {report['p95_ms']:>8.2f} ms"
+        if 'speedup' in report:
+            line += (f"  speedup {report['speedup']:>5}x  recall {report['face_recall']}"
+                     f"  nama sama {report['name_agreement']}  drift {report['mean_encoding_drift']}")
+        print(line)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
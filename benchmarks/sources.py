@@ -0,0 +1,48 @@
+import os
+
+import cv2
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+def iter_frames(video=None, images=None, max_frames=None, stride=1):
+    """Frame BGR dari file video atau folder gambar, sebagai pengganti kamera saat benchmark"""
+    count = 0
+    if video:
+        cap = cv2.VideoCapture(video)
+        if not cap.isOpened():
+            raise IOError(f"Tidak dapat membuka video {video}")
+        try:
+            index = 0
+            while max_frames is None or count < max_frames:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if index % stride == 0:
+                    count += 1
+                    yield frame
+                index += 1
+        finally:
+            cap.release()
+        return
+
+    if images:
+        names = sorted(name for name in os.listdir(images) if name.lower().endswith(IMAGE_EXTENSIONS))
+        for name in names[::stride]:
+            if max_frames is not None and count >= max_frames:
+                break
+            frame = cv2.imread(os.path.join(images, name))
+            if frame is None:
+                continue
+            count += 1
+            yield frame
+        return
+
+    raise ValueError("Butuh --video atau --images")
+
+
+def add_source_arguments(parser):
+    parser.add_argument('--video', help="File video rekaman")
+    parser.add_argument('--images', help="Folder gambar")
+    parser.add_argument('--max-frames', type=int, default=200)
+    parser.add_argument('--stride', type=int, default=1, help="Ambil setiap frame ke-N")
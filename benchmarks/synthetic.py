@@ -0,0 +1,26 @@
+import numpy as np
+
+from face_gallery import ENCODING_DIM
+
+
+def synthetic_encodings(count, clusters=64, spread=0.8, seed=0, dim=ENCODING_DIM):
+    """Encoding sintetis berkerumun; spread adalah jarak khas antar dua orang dalam satu kerumunan"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    centers *= 0.8 / np.linalg.norm(centers, axis=1, keepdims=True)
+    owners = rng.integers(0, clusters, size=count)
+    encodings = centers[owners] + rng.normal(scale=spread / np.sqrt(2 * dim), size=(count, dim)).astype(np.float32)
+    return encodings.astype(np.float32)
+
+
+def synthetic_queries(encodings, count, noise=0.35, seed=1):
+    """Query yang berasal dari baris galeri acak ditambah derau (jarak ke aslinya ~noise)"""
+    rng = np.random.default_rng(seed)
+    truth = rng.integers(0, len(encodings), size=count)
+    dim = encodings.shape[1]
+    queries = encodings[truth] + rng.normal(scale=noise / np.sqrt(dim), size=(count, dim)).astype(np.float32)
+    return queries.astype(np.float32), truth
+
+
+def synthetic_names(count):
+    return [f"orang_{i:06d}" for i in range(count)]
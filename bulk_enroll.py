@@ -0,0 +1,185 @@
+import os
+import shutil
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from multiprocessing import Pool
+
+from face_gallery import FaceGallery
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+DUPLICATE_TOLERANCE = 0.3
+
+_archives = {}
+
+
+class EnrollmentReport:
+    """Ringkasan hasil enrollment massal"""
+
+    def __init__(self):
+        self.total = 0
+        self.added = []
+        self.skipped = []
+        self.duplicates = []
+
+    def skip(self, source, reason):
+        self.skipped.append((source, reason))
+
+    def summary(self):
+        return {
+            'total': self.total,
+            'added': len(self.added),
+            'skipped': len(self.skipped),
+            'duplicates': len(self.duplicates),
+            'identities': len(set(name for name, _ in self.added)),
+        }
+
+
+def _is_image(filename):
+    return filename.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def iter_enrollment_items(source):
+    """Daftar (nama, sumber, payload) dari folder atau ZIP berstruktur nama/foto
+
+    payload adalah path file (folder) atau (path ZIP, nama member); bytes gambar baru dibaca
+    oleh worker sehingga memori tidak tumbuh dengan ukuran arsip. source adalah path folder
+    atau path .zip (objek file ZIP disalin dulu ke file sementara oleh bulk_encode).
+    """
+    if isinstance(source, (str, os.PathLike)) and os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            person_dir = os.path.join(source, name)
+            if not os.path.isdir(person_dir):
+                continue
+            for filename in sorted(os.listdir(person_dir)):
+                path = os.path.join(person_dir, filename)
+                if os.path.isfile(path) and _is_image(filename):
+                    yield name, path, path
+        return
+
+    with zipfile.ZipFile(source) as archive:
+        for info in sorted(archive.infolist(), key=lambda info: info.filename):
+            parts = [part for part in info.filename.replace('\\', '/').split('/') if part]
+            if info.is_dir() or len(parts) < 2 or not _is_image(parts[-1]):
+                continue
+            if any(part.startswith(('.', '__MACOSX')) for part in parts):
+                continue
+            yield parts[-2], info.filename, (source, info.filename)
+
+
+@contextmanager
+def _archive_path(source):
+    """Path yang bisa dibuka ulang oleh worker; objek file ZIP (mis. unggahan) disalin ke file sementara"""
+    if isinstance(source, (str, os.PathLike)):
+        yield source
+        return
+
+    source.seek(0)
+    with tempfile.NamedTemporaryFile(suffix='.zip', delete=False) as f:
+        shutil.copyfileobj(source, f)
+    try:
+        yield f.name
+    finally:
+        os.remove(f.name)
+
+
+def _open_payload(payload):
+    """Path file apa adanya, atau file-like untuk member ZIP (arsip dibuka sekali per worker)"""
+    if not isinstance(payload, tuple):
+        return payload
+    archive_path, member = payload
+    archive = _archives.get(archive_path)
+    if archive is None:
+        archive = _archives[archive_path] = zipfile.ZipFile(archive_path)
+    return archive.open(member)
+
+
+def encode_enrollment_item(item):
+    """Worker: encoding satu foto enrollment, hanya diterima bila tepat satu wajah terdeteksi"""
+    import face_recognition
+
+    name, source, payload = item
+    try:
+        image = face_recognition.load_image_file(_open_payload(payload))
+        face_locations = face_recognition.face_locations(image)
+
+        if not face_locations:
+            return name, source, 'Tidak ada wajah terdeteksi', None
+        if len(face_locations) > 1:
+            return name, source, f'{len(face_locations)} wajah terdeteksi', None
+
+        encoding = face_recognition.face_encodings(image, face_locations)[0]
+        return name, source, None, encoding
+    except Exception as e:
+        return name, source, f'Gagal membaca gambar: {e}', None
+
+
+def bulk_encode(source, processes=None, progress_callback=None, chunksize=4):
+    """Encoding semua foto enrollment secara paralel, menghasilkan (nama, sumber, error, encoding)
+
+    Yang dikirim ke worker hanya path/nama member; setiap worker membaca gambarnya sendiri.
+    """
+    with _archive_path(source) as path:
+        items = list(iter_enrollment_items(path))
+        total = len(items)
+
+        if progress_callback:
+            progress_callback(0, total)
+        if not items:
+            return
+
+        with Pool(processes=processes) as pool:
+            for done, result in enumerate(pool.imap_unordered(encode_enrollment_item, items, chunksize=chunksize), 1):
+                if progress_callback:
+                    progress_callback(done, total)
+                yield result
+
+
+def prepare_enrollment(gallery, source, processes=None, progress_callback=None,
+                       duplicate_tolerance=DUPLICATE_TOLERANCE):
+    """(laporan, galeri batch) untuk enrollment massal tanpa mengubah gallery
+
+    Foto tanpa wajah/lebih dari satu wajah dan duplikat (terhadap gallery dan batch) dilewati.
+    gallery hanya dibaca, sehingga bisa berupa snapshot yang dipakai sesi lain; hasilnya
+    diterapkan kemudian dengan add_batch.
+    """
+    report = EnrollmentReport()
+    batch = FaceGallery()
+
+    for name, source_name, error, encoding in bulk_encode(source, processes, progress_callback):
+        report.total += 1
+        if error:
+            report.skip(source_name, error)
+            continue
+
+        duplicate = None
+        for candidates in (gallery, batch):
+            match = candidates.match([encoding], tolerance=duplicate_tolerance)[0]
+            if match.is_known:
+                duplicate = match
+                break
+
+        if duplicate is not None:
+            report.duplicates.append((source_name, duplicate.name, duplicate.distance))
+            report.skip(source_name, f'Duplikat dari {duplicate.name} (jarak {duplicate.distance:.3f})')
+            continue
+
+        batch.add(encoding, name)
+        report.added.append((name, source_name))
+
+    return report, batch
+
+
+def add_batch(gallery, batch):
+    """Menambahkan semua baris batch ke gallery"""
+    for encoding, name in zip(batch.matrix, batch.names):
+        gallery.add(encoding, name)
+    return len(batch)
+
+
+def bulk_enroll(gallery, source, processes=None, progress_callback=None,
+                duplicate_tolerance=DUPLICATE_TOLERANCE):
+    """Enrollment massal ke gallery; gallery hanya diubah di memori, pemanggil menyimpan satu kali setelahnya"""
+    report, batch = prepare_enrollment(gallery, source, processes, progress_callback, duplicate_tolerance)
+    add_batch(gallery, batch)
+    return report
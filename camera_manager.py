@@ -0,0 +1,284 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from webcam_pipeline import LatestFrameCapture
+
+
+def probe_camera(index):
+    """True bila kamera index bisa dibuka dan mengembalikan satu frame"""
+    cap = cv2.VideoCapture(index)
+    try:
+        if not cap.isOpened():
+            return False
+        ret, _ = cap.read()
+        return bool(ret)
+    finally:
+        cap.release()
+
+
+def probe_cameras(indices=range(5), max_workers=None):
+    """Memeriksa semua indeks kamera secara paralel, mengembalikan indeks yang tersedia (terurut)"""
+    indices = list(indices)
+    if not indices:
+        return []
+    with ThreadPoolExecutor(max_workers=max_workers or len(indices), thread_name_prefix="camera-probe") as pool:
+        results = list(pool.map(probe_camera, indices))
+    return [index for index, ok in zip(indices, results) if ok]
+
+
+class CameraManager:
+    """Daftar kamera yang tersedia, di-probe paralel dan di-cache selama ttl detik
+
+    Selama ada MultiCameraPipeline yang berjalan, cache yang kadaluarsa tidak di-probe ulang
+    (kamera sedang dipakai); probe ulang hanya terjadi bila diminta eksplisit.
+    """
+
+    def __init__(self, indices=range(5), ttl=60.0):
+        self.indices = list(indices)
+        self.ttl = ttl
+        self._cameras = None
+        self._probed_at = 0.0
+        self._lock = threading.Lock()
+        self._probe_thread = None
+        self._streaming = 0
+
+    def expired(self):
+        return self._cameras is None or time.monotonic() - self._probed_at > self.ttl
+
+    def available_cameras(self, refresh=False):
+        """Daftar kamera, di-probe ulang bila diminta atau cache kadaluarsa (menunggu hasil probe)"""
+        with self._lock:
+            if refresh or self.expired():
+                self._cameras = probe_cameras(self.indices)
+                self._probed_at = time.monotonic()
+            return list(self._cameras)
+
+    def cached_cameras(self):
+        """Hasil probe terakhir tanpa menunggu, None bila belum pernah selesai"""
+        cameras = self._cameras
+        return None if cameras is None else list(cameras)
+
+    def probe_async(self, refresh=False, report=None):
+        """Memulai probe di thread latar bila cache kosong/kadaluarsa (atau refresh); tidak menunggu hasil"""
+        if self.probing or not (refresh or (self.expired() and not (self._streaming and self._cameras is not None))):
+            return self._probe_thread
+
+        def probe():
+            if report is None:
+                self.available_cameras(refresh=True)
+            else:
+                with report.phase('camera_probe', background=True):
+                    self.available_cameras(refresh=True)
+
+        self._probe_thread = threading.Thread(target=probe, name="camera-probe", daemon=True)
+        self._probe_thread.start()
+        return self._probe_thread
+
+    def wait(self, timeout=None):
+        """Menunggu probe latar selesai, True bila sudah tidak ada probe yang berjalan"""
+        thread = self._probe_thread
+        if thread is not None:
+            thread.join(timeout)
+        return not self.probing
+
+    @property
+    def probing(self):
+        return self._probe_thread is not None and self._probe_thread.is_alive()
+
+    def stream_started(self):
+        with self._lock:
+            self._streaming += 1
+
+    def stream_stopped(self):
+        with self._lock:
+            self._streaming -= 1
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def camera_manager(ttl=60.0):
+    """CameraManager bersama untuk semua sesi di proses ini, dibuat sekali seperti shared_gallery"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = CameraManager(ttl=ttl)
+        return _manager
+
+
+class CameraStream:
+    """Status satu kamera dalam MultiCameraPipeline"""
+
+    def __init__(self, source, capture):
+        self.source = source
+        self.capture = capture
+        self.busy = False
+        self.taken_seq = 0
+        self.result = None
+        self.result_seq = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.error = None
+
+    def stats(self):
+        return {
+            'source': self.source,
+            'frames_captured': self.capture.frames_captured,
+            'frames_processed': self.frames_processed,
+            'frames_dropped': self.frames_dropped,
+            'failed': self.capture.failed,
+        }
+
+
+class MultiCameraPipeline:
+    """Beberapa kamera sekaligus: satu thread capture per kamera, satu pool thread inferensi bersama
+
+    Worker mengambil kamera secara round-robin dan setiap kamera paling banyak punya satu frame
+    yang sedang diproses, sehingga saat pool kewalahan setiap kamera hanya kehilangan frame
+    miliknya sendiri (frame terbaru selalu menimpa yang lama) tanpa menahan kamera lain.
+    process_fn(source, frame) dipanggil dari thread worker. Bila manager diberikan, pipeline
+    tercatat sebagai pemakai kamera selama berjalan.
+    """
+
+    def __init__(self, sources, process_fn, workers=2, target_fps=15, width=640, height=480, metrics=None,
+                 manager=None):
+        self.process_fn = process_fn
+        self.manager = manager
+        self.target_fps = target_fps
+        self.metrics = metrics
+        self.streams = [
+            CameraStream(source, LatestFrameCapture(source, width=width, height=height, fps=target_fps,
+                                                    metrics=metrics))
+            for source in sources
+        ]
+        self.frames_displayed = 0
+        self._cursor = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._workers = [threading.Thread(target=self._run, name=f"inference-{i}", daemon=True)
+                         for i in range(max(1, workers))]
+        self._started = False
+
+    def opened_sources(self):
+        return [stream.source for stream in self.streams if stream.capture.is_opened()]
+
+    def start(self):
+        for stream in self.streams:
+            if not stream.capture.is_opened():
+                stream.capture.stop()
+        self.streams = [stream for stream in self.streams if stream.capture.is_opened()]
+        for stream in self.streams:
+            stream.capture.start()
+        for worker in self._workers:
+            worker.start()
+        self._started = True
+        if self.manager is not None:
+            self.manager.stream_started()
+        return self
+
+    def _next_job(self):
+        """(stream, seq, frame) berikutnya secara round-robin, atau None bila belum ada frame baru"""
+        with self._cond:
+            count = len(self.streams)
+            for offset in range(count):
+                stream = self.streams[(self._cursor + offset) % count]
+                if stream.busy or stream.error is not None:
+                    continue
+                seq, frame = stream.capture.read(after_seq=stream.taken_seq, timeout=0)
+                if frame is None:
+                    continue
+
+                dropped = seq - stream.taken_seq - 1 if stream.taken_seq else 0
+                stream.frames_dropped += dropped
+                if dropped and self.metrics is not None:
+                    self.metrics.count('frames_dropped', dropped)
+                stream.taken_seq = seq
+                stream.busy = True
+                self._cursor = (self._cursor + offset + 1) % count
+                return stream, seq, frame
+        return None
+
+    def _run(self):
+        while not self._stop.is_set():
+            job = self._next_job()
+            if job is None:
+                if all(stream.capture.failed or stream.error is not None for stream in self.streams):
+                    break
+                with self._cond:
+                    self._cond.wait(0.005)
+                continue
+
+            stream, seq, frame = job
+            try:
+                result = self.process_fn(stream.source, frame)
+            except Exception as e:
+                result = None
+                stream.error = e
+
+            with self._cond:
+                if stream.error is None:
+                    stream.result = result
+                    stream.result_seq = seq
+                    stream.frames_processed += 1
+                stream.busy = False
+                self._cond.notify_all()
+            if stream.error is None and self.metrics is not None:
+                self.metrics.count('frames_processed')
+
+    def frames(self):
+        """Generator daftar (source, frame, hasil_inferensi) untuk kamera yang punya frame baru, dipacu ke target_fps"""
+        interval = 1.0 / self.target_fps if self.target_fps else 0.0
+        next_time = time.monotonic()
+        shown = {stream.source: 0 for stream in self.streams}
+
+        while not self._stop.is_set():
+            live = [stream for stream in self.streams if not stream.capture.failed and stream.error is None]
+            if not live:
+                break
+
+            batch = []
+            for stream in live:
+                seq, frame = stream.capture.read(after_seq=shown[stream.source], timeout=0)
+                if frame is not None:
+                    shown[stream.source] = seq
+                    batch.append((stream.source, frame.copy(), stream.result))
+
+            if batch:
+                self.frames_displayed += len(batch)
+                yield batch
+
+            next_time += interval
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_time = time.monotonic()
+
+    def stats(self):
+        with self._cond:
+            return [stream.stats() for stream in self.streams]
+
+    def errors(self):
+        return {stream.source: stream.error for stream in self.streams if stream.error is not None}
+
+    def stop(self):
+        """Menghentikan worker dan melepas semua kamera"""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._started:
+            for worker in self._workers:
+                worker.join(timeout=5.0)
+            if self.manager is not None:
+                self.manager.stream_stopped()
+            self._started = False
+        for stream in self.streams:
+            stream.capture.stop()
+
+    @property
+    def failed(self):
+        return all(stream.capture.failed for stream in self.streams)
@@ -0,0 +1,109 @@
+import threading
+
+import cv2
+
+
+def bbox_to_location(bbox, frame_shape, padding=0.1):
+    """Mengubah bbox cvzone (x, y, w, h) menjadi lokasi face_recognition (top, right, bottom, left)
+
+    Kotak diperlebar sebesar padding (fraksi dari lebar/tinggi) lalu dipotong ke batas frame.
+    """
+    x, y, w, h = bbox
+    pad_x = int(round(w * padding))
+    pad_y = int(round(h * padding))
+    height, width = frame_shape[:2]
+
+    top = max(0, y - pad_y)
+    left = max(0, x - pad_x)
+    bottom = min(height, y + h + pad_y)
+    right = min(width, x + w + pad_x)
+    return top, right, bottom, left
+
+
+def scale_face(face, factor):
+    """Salinan deteksi cvzone dengan bbox dan center yang diskalakan (mis. dari frame kecil ke asli)"""
+    x, y, w, h = face['bbox']
+    scaled = dict(face)
+    scaled['bbox'] = (int(round(x * factor)), int(round(y * factor)), int(round(w * factor)), int(round(h * factor)))
+    if 'center' in face:
+        cx, cy = face['center']
+        scaled['center'] = (int(round(cx * factor)), int(round(cy * factor)))
+    return scaled
+
+
+def bboxes_to_locations(faces, frame_shape, padding=0.1):
+    """Lokasi face_recognition untuk setiap deteksi, membuang kotak yang kosong setelah dipotong"""
+    locations = []
+    kept = []
+    for face in faces:
+        top, right, bottom, left = bbox_to_location(face['bbox'], frame_shape, padding)
+        if bottom > top and right > left:
+            locations.append((top, right, bottom, left))
+            kept.append(face)
+    return kept, locations
+
+
+class FaceDetectionStage:
+    """Satu tahap deteksi (cvzone/mediapipe) yang hasilnya langsung dipakai face_encodings"""
+
+    def __init__(self, min_detection_confidence=0.5, padding=0.1, scale=1.0, max_detection_side=None):
+        self.min_detection_confidence = min_detection_confidence
+        self.padding = padding
+        self.scale = scale
+        self.max_detection_side = max_detection_side
+        self._local = threading.local()
+
+    @property
+    def detector(self):
+        """Detektor mediapipe per thread (graph mediapipe tidak aman dipakai bersamaan oleh beberapa thread)"""
+        detector = getattr(self._local, 'detector', None)
+        if detector is None:
+            from cvzone.FaceDetectionModule import FaceDetector
+            detector = self._local.detector = FaceDetector(minDetectionCon=self.min_detection_confidence)
+        return detector
+
+    def settings(self):
+        """Pengaturan yang memengaruhi hasil deteksi (dipakai sebagai bagian kunci cache)"""
+        return {
+            'detector': 'cvzone',
+            'min_detection_confidence': self.min_detection_confidence,
+            'padding': self.padding,
+            'scale': self.scale,
+            'max_detection_side': self.max_detection_side,
+        }
+
+    def detection_scale(self, frame_shape):
+        """Skala frame untuk deteksi: scale, diperkecil lagi bila sisi terpanjang melebihi max_detection_side"""
+        scale = self.scale
+        if self.max_detection_side:
+            scale = min(scale, self.max_detection_side / float(max(frame_shape[:2])))
+        return min(scale, 1.0)
+
+    def detect(self, frame):
+        """Deteksi wajah pada frame BGR tanpa menggambar apa pun di atasnya
+
+        Deteksi dijalankan pada frame yang diperkecil sesuai detection_scale, lalu kotaknya
+        dipetakan kembali ke resolusi asli. Mengembalikan (faces, face_locations) dengan urutan yang sama.
+        """
+        scale = self.detection_scale(frame.shape)
+        if scale < 1.0:
+            small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            _, faces = self.detector.findFaces(small, draw=False)
+            faces = [scale_face(face, 1.0 / scale) for face in faces or []]
+        else:
+            _, faces = self.detector.findFaces(frame, draw=False)
+
+        if not faces:
+            return [], []
+        return bboxes_to_locations(faces, frame.shape, self.padding)
+
+    def draw(self, frame, faces):
+        """Menggambar kotak deteksi dengan gaya yang sama seperti findFaces(draw=True)"""
+        import cvzone
+
+        for face in faces:
+            x, y, w, h = face['bbox']
+            cvzone.cornerRect(frame, (x, y, w, h))
+            cv2.putText(frame, f"{int(face['score'][0] * 100)}%", (x, y - 20),
+                        cv2.FONT_HERSHEY_PLAIN, 2, (255, 0, 255), 2)
+        return frame
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+CachedFaces = namedtuple('CachedFaces', ['faces', 'face_locations', 'face_encodings'])
+
+
+def image_cache_key(image_bytes, settings=None):
+    """Kunci cache dari hash isi gambar ditambah pengaturan detektor yang memengaruhi hasil"""
+    digest = hashlib.sha1(image_bytes)
+    if settings is not None:
+        digest.update(json.dumps(settings, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _face_to_json(face):
+    """Deteksi cvzone sebagai dict JSON; score cvzone berupa container protobuf, bukan float"""
+    data = {}
+    for key, value in face.items():
+        if key == 'score':
+            data[key] = [float(s) for s in value]
+        elif key in ('bbox', 'center'):
+            data[key] = [int(v) for v in value]
+        elif key == 'id':
+            data[key] = int(value)
+    return data
+
+
+def _entry_size(entry):
+    encodings = entry.face_encodings or []
+    return 256 + 64 * len(entry.faces) + sum(np.asarray(encoding).nbytes for encoding in encodings)
+
+
+class EncodingCache:
+    """Cache LRU (lokasi + encoding wajah) per gambar dengan batas ukuran dan tier disk opsional"""
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024, disk_dir=None, max_disk_entries=10000):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.npz")
+
+    def get(self, key):
+        """CachedFaces untuk key, atau None bila tidak ada di memori maupun disk"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        entry = self._load_disk(key) if self.disk_dir else None
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.disk_hits += 1
+        self._put_memory(key, entry)
+        return entry
+
+    def put(self, key, faces, face_locations, face_encodings=None):
+        """Menyimpan hasil deteksi; face_encodings None berarti encoding belum dihitung"""
+        entry = CachedFaces(
+            list(faces),
+            [tuple(int(v) for v in location) for location in face_locations],
+            None if face_encodings is None else [np.asarray(encoding, dtype=np.float64) for encoding in face_encodings],
+        )
+        self._put_memory(key, entry)
+        if self.disk_dir:
+            self._save_disk(key, entry)
+        return entry
+
+    def _put_memory(self, key, entry):
+        size = _entry_size(entry)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= _entry_size(old)
+            self._entries[key] = entry
+            self._bytes += size
+
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= _entry_size(evicted)
+
+    def _save_disk(self, key, entry):
+        path = self._disk_path(key)
+        tmp_path = path + '.tmp.npz'
+        encodings = np.asarray(entry.face_encodings if entry.face_encodings is not None else [], dtype=np.float64)
+        try:
+            np.savez(
+                tmp_path,
+                faces=np.array(json.dumps([_face_to_json(face) for face in entry.faces])),
+                locations=np.asarray(entry.face_locations, dtype=np.int64).reshape(-1, 4),
+                encodings=encodings.reshape(-1, encodings.shape[-1] if encodings.size else 128),
+                encoded=np.array(entry.face_encodings is not None),
+            )
+            os.replace(tmp_path, path)
+            self._trim_disk()
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error menyimpan cache encoding: {e}")
+
+    def _load_disk(self, key):
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                faces = json.loads(str(data['faces']))
+                locations = [tuple(int(v) for v in row) for row in data['locations']]
+                encodings = list(data['encodings']) if bool(data['encoded']) else None
+            os.utime(path)
+            return CachedFaces(faces, locations, encodings)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _trim_disk(self):
+        paths = [os.path.join(self.disk_dir, name) for name in os.listdir(self.disk_dir) if name.endswith('.npz')]
+        if len(paths) <= self.max_disk_entries:
+            return
+        paths.sort(key=os.path.getmtime)
+        for path in paths[:len(paths) - self.max_disk_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+        }
@@ -0,0 +1,360 @@
+import sys
+import numpy as np
+from collections import namedtuple
+from ann_index import IVFIndex
+from append_buffer import AppendBuffer
+from mapped_rows import MappedRows
+from prototypes import PrototypeIndex
+from quantization import QuantizedMatrix
+
+UNKNOWN_NAME = "Tidak Dikenal"
+DEFAULT_TOLERANCE = 0.6
+ENCODING_DIM = 128
+
+
+class MatchResult(namedtuple('MatchResult', ['name', 'distance', 'confidence', 'index'])):
+    """Hasil pencocokan satu wajah terhadap galeri"""
+    __slots__ = ()
+
+    @property
+    def is_known(self):
+        return self.index >= 0
+
+
+def distance_to_confidence(distances, tolerance=DEFAULT_TOLERANCE):
+    """Mengubah jarak euclidean menjadi skor keyakinan 0..1 (0.5 tepat di batas toleransi)"""
+    distances = np.asarray(distances, dtype=np.float32)
+    linear = (1.0 - distances) / ((1.0 - tolerance) * 2.0)
+    boosted = linear + (1.0 - linear) * np.power(np.clip((linear - 0.5) * 2.0, 0.0, None), 0.2)
+    return np.clip(np.where(distances > tolerance, linear, boosted), 0.0, 1.0)
+
+
+class FaceGallery:
+    """Galeri encoding wajah dalam satu matriks float32 kontigu dengan norma yang sudah dihitung
+
+    Pada mode kompak yang dimuat dari GalleryStore, baris float32 dibaca dari memmap file store (MappedRows).
+    """
+
+    def __init__(self, encodings=None, names=None, dim=ENCODING_DIM, sq_norms=None):
+        self.dim = dim
+        self.names = []
+        self._size = 0
+        self._rows = AppendBuffer(row_shape=(dim,))
+        self._norms = AppendBuffer()
+        self.ann = None
+        self.compact = None
+        self.rerank = 32
+        self.prototypes = None
+
+        if encodings is not None and len(encodings):
+            self.set(encodings, names, sq_norms)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def matrix(self):
+        return self._rows.array
+
+    @property
+    def sq_norms(self):
+        return self._norms.array
+
+    @property
+    def encodings(self):
+        """Daftar encoding float64 (format lama untuk pickle dan kompatibilitas)"""
+        return [row.astype(np.float64) for row in np.asarray(self.matrix)]
+
+    def set(self, encodings, names, sq_norms=None):
+        """Mengganti seluruh isi galeri
+
+        sq_norms (opsional) adalah norma kuadrat yang sudah tersimpan, mis. dari GalleryStore; tanpa itu
+        norma dihitung dari seluruh matriks, yang pada memmap berarti membaca semua halaman file.
+        encodings berupa MappedRows (lihat GalleryStore.load_gallery) dipakai apa adanya tanpa dimuat ke RAM.
+        """
+        if len(encodings) != len(names):
+            raise ValueError("Jumlah encoding dan nama tidak sama")
+
+        if isinstance(encodings, MappedRows):
+            matrix = encodings
+        else:
+            matrix = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+            matrix = np.ascontiguousarray(matrix)
+        if sq_norms is None:
+            rows = np.asarray(matrix)
+            sq_norms = np.einsum('ij,ij->i', rows, rows)
+        self._rows = matrix if isinstance(matrix, MappedRows) else AppendBuffer(matrix)
+        self._norms = AppendBuffer(np.asarray(sq_norms, dtype=np.float32))
+        self._size = len(matrix)
+        self.names = list(names)
+        self._rebuild_ann()
+        self._rebuild_compact()
+        self._rebuild_prototypes()
+
+    def copy(self):
+        """Salinan copy-on-write untuk snapshot berikutnya
+
+        Matriks, norma dan indeks berbagi buffer dengan galeri ini (lihat AppendBuffer), sehingga
+        add pada salinan tidak menyalin seluruh galeri; hanya daftar nama yang disalin. Galeri ini
+        sendiri tidak boleh diubah lagi setelah disalin.
+        """
+        gallery = FaceGallery(dim=self.dim)
+        gallery._rows = self._rows.fork()
+        gallery._norms = self._norms.fork()
+        gallery._size = self._size
+        gallery.names = list(self.names)
+        gallery.ann = self.ann.fork() if self.ann is not None else None
+        gallery.compact = self.compact.fork() if self.compact is not None else None
+        gallery.rerank = self.rerank
+        gallery.prototypes = self.prototypes.fork() if self.prototypes is not None else None
+        return gallery
+
+    def enable_ann(self, index=None):
+        """Mengaktifkan indeks ANN (IVF) yang selalu sinkron dengan penambahan/penghapusan"""
+        self.ann = index if index is not None else IVFIndex()
+        self._rebuild_ann()
+        return self.ann
+
+    def disable_ann(self):
+        self.ann = None
+
+    def _rebuild_ann(self):
+        if self.ann is None:
+            return
+        if self._size >= self.ann.min_size:
+            self.ann.build(self.matrix)
+        else:
+            self.ann.build(self.matrix[:0])
+
+    @property
+    def mapped(self):
+        """True bila baris float32 dibaca dari memmap file store (mode kompak dari GalleryStore.load_gallery)"""
+        return isinstance(self._rows, MappedRows)
+
+    def enable_compact(self, codec='int8', rerank=32, compact=None):
+        """Mode kompak: kandidat dipindai dari kode float16/int8, lalu shortlist rerank baris diurutkan ulang secara eksak
+
+        compact (opsional) adalah QuantizedMatrix yang sudah sinkron dengan baris galeri, mis. kode yang
+        dibaca GalleryStore dari disk. Memori hanya berkurang bila baris float32 dibaca dari memmap store
+        (galeri dari GalleryStore.load_gallery dengan codec); pada galeri di RAM kode menjadi salinan tambahan.
+        """
+        self.compact = compact if compact is not None else QuantizedMatrix(codec)
+        self.rerank = rerank
+        if compact is None:
+            self._rebuild_compact()
+        return self.compact
+
+    def disable_compact(self):
+        """Kembali ke pencarian float32 penuh; baris yang dibaca dari memmap store dimuat ke RAM"""
+        self.compact = None
+        if self.mapped:
+            self._rows = AppendBuffer(np.asarray(self._rows))
+
+    def _rebuild_compact(self):
+        if self.compact is not None:
+            self.compact.build(self.matrix)
+
+    def enable_prototypes(self, index=None):
+        """Pencocokan lewat prototipe per identitas (centroid/medoid), sampel mentah hanya di dekat ambang
+
+        Prototipe hanya untuk orang dengan beberapa foto; orang dengan satu foto tetap dicari lewat
+        ANN/mode kompak/eksak, dan match() mengambil yang terdekat dari keduanya. top_k tetap per sampel.
+        """
+        self.prototypes = index if index is not None else PrototypeIndex()
+        self._rebuild_prototypes()
+        return self.prototypes
+
+    def disable_prototypes(self):
+        self.prototypes = None
+
+    def _rebuild_prototypes(self):
+        if self.prototypes is not None:
+            self.prototypes.build(self.matrix, self.names)
+
+    def positions(self, name):
+        """Indeks semua baris (sampel) milik name"""
+        return [i for i, row_name in enumerate(self.names) if row_name == name]
+
+    def memory_report(self):
+        """Perkiraan byte per representasi: list float64 (format lama), matriks float32, dan kode kompak
+
+        float32_resident_bytes adalah bagian float32 yang ada di RAM: seluruh matriks dan norma, atau pada
+        galeri mapped hanya norma, nomor baris dan baris yang ditambahkan setelah dimuat. total_bytes
+        adalah yang benar-benar dipakai galeri: bagian float32 di RAM ditambah kode kompak bila aktif.
+        """
+        row_overhead = sys.getsizeof(np.empty(0)) + 8
+        float32_bytes = self._size * (self.dim * 4 + 4)
+        resident_bytes = self._rows.resident_bytes + self._size * 4 if self.mapped else float32_bytes
+        compact_bytes = self.compact.nbytes if self.compact is not None else None
+        return {
+            'faces': self._size,
+            'float64_list_bytes': self._size * (self.dim * 8 + row_overhead),
+            'float32_bytes': float32_bytes,
+            'float32_resident_bytes': resident_bytes,
+            'mapped': self.mapped,
+            'compact_codec': self.compact.codec if self.compact is not None else None,
+            'compact_bytes': compact_bytes,
+            'total_bytes': resident_bytes + (compact_bytes or 0),
+            'identities': len(set(self.names)),
+            'prototypes': len(self.prototypes) if self.prototypes is not None else None,
+        }
+
+    def add(self, encoding, name):
+        """Menambahkan satu encoding, mengembalikan indeks barisnya"""
+        row = np.asarray(encoding, dtype=np.float32).reshape(self.dim)
+        self._rows.append(row)
+        self._norms.append(row @ row)
+        self.names.append(name)
+        self._size += 1
+
+        if self.ann is not None:
+            if self.ann.needs_retrain() and self._size >= self.ann.min_size:
+                self._rebuild_ann()
+            else:
+                self.ann.add(self._size - 1, row)
+        if self.compact is not None:
+            if self.compact.needs_rebuild(row):
+                self._rebuild_compact()
+            else:
+                self.compact.add(row)
+        if self.prototypes is not None:
+            self.prototypes.add(self.matrix, name)
+        return self._size - 1
+
+    def remove_at(self, index):
+        """Menghapus satu baris berdasarkan indeks"""
+        self._delete_row(index)
+        if self.prototypes is not None:
+            self.prototypes.remove(index, self.matrix)
+
+    def _delete_row(self, index):
+        """Menghapus baris dari matriks, norma, nama, ANN dan kode kompak (prototipe diurus pemanggil)"""
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        self._rows.delete(index)
+        self._norms.delete(index)
+        self.names.pop(index)
+        self._size -= 1
+
+        if self.ann is not None:
+            self.ann.remove(index)
+        if self.compact is not None:
+            self.compact.remove(index)
+
+    def remove_all(self, name):
+        """Menghapus semua sampel dengan nama tertentu, mengembalikan posisi baris yang dihapus
+
+        Prototipe identitas itu dihitung ulang sekali setelah semua barisnya dihapus.
+        """
+        positions = self.positions(name)
+        for index in reversed(positions):
+            self._delete_row(index)
+            if self.prototypes is not None:
+                self.prototypes.remove(index, self.matrix, refresh=False)
+        if self.prototypes is not None:
+            self.prototypes.refresh(name, self.matrix)
+        return positions
+
+    def distances(self, face_encodings, rows=None):
+        """Matriks jarak (jumlah wajah x jumlah identitas) dalam satu perhitungan batch; rows membatasi kolom ke baris itu"""
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, self.dim)
+        size = self._size if rows is None else len(rows)
+        if not size or not len(queries):
+            return np.empty((len(queries), size), dtype=np.float32)
+
+        matrix = np.asarray(self.matrix) if rows is None else self.matrix[rows]
+        sq_norms = self.sq_norms if rows is None else self.sq_norms[rows]
+        q_norms = np.einsum('ij,ij->i', queries, queries)
+        sq = q_norms[:, None] + sq_norms[None, :] - 2.0 * (queries @ matrix.T)
+        np.maximum(sq, 0.0, out=sq)
+        return np.sqrt(sq, out=sq)
+
+    def _nearest(self, face_encodings, k, rows=None):
+        """Indeks dan jarak k baris terdekat, lewat indeks ANN bila aktif atau pencarian eksak
+
+        rows (opsional) membatasi pencarian ke nomor baris itu; indeks yang dikembalikan tetap nomor baris galeri.
+        """
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, self.dim)
+        size = self._size if rows is None else len(rows)
+        k = min(k, size)
+        if not k or not len(queries):
+            return np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0), dtype=np.float32)
+
+        if self.ann is not None and self.ann.is_trained:
+            allowed = None
+            if rows is not None:
+                allowed = np.zeros(self._size, dtype=bool)
+                allowed[rows] = True
+            return self.ann.search(queries, self.matrix, self.sq_norms, k=k, allowed=allowed)
+        if self.compact is not None and size > max(k, self.rerank):
+            return self._nearest_compact(queries, k, rows)
+
+        dist = self.distances(queries, rows)
+        if k == 1:
+            indices = np.argmin(dist, axis=1)[:, None]
+            dist = np.take_along_axis(dist, indices, axis=1)
+        else:
+            part = np.argpartition(dist, k - 1, axis=1)[:, :k]
+            part_dist = np.take_along_axis(dist, part, axis=1)
+            order = np.argsort(part_dist, axis=1)
+            indices, dist = np.take_along_axis(part, order, axis=1), np.take_along_axis(part_dist, order, axis=1)
+        return (indices if rows is None else rows[indices]), dist
+
+    def _nearest_compact(self, queries, k, rows=None):
+        """Shortlist dari jarak di domain kompak, lalu jarak eksak float32 hanya untuk shortlist"""
+        shortlist = max(k, self.rerank)
+        approx = self.compact.distances(queries, rows)
+        candidates = np.argpartition(approx, shortlist - 1, axis=1)[:, :shortlist]
+        if rows is not None:
+            candidates = rows[candidates]
+
+        rows = self.matrix[candidates]
+        q_norms = np.einsum('ij,ij->i', queries, queries)
+        sq = q_norms[:, None] + self.sq_norms[candidates] - 2.0 * np.einsum('qd,qsd->qs', queries, rows)
+        np.maximum(sq, 0.0, out=sq)
+        dist = np.sqrt(sq, out=sq)
+
+        order = np.argsort(dist, axis=1)[:, :k]
+        return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(dist, order, axis=1)
+
+    def _nearest_with_prototypes(self, queries, tolerance):
+        """Top-1 lewat prototipe untuk orang multi-foto, digabung dengan pencarian biasa untuk foto tunggal"""
+        indices, dist = self.prototypes.match(queries, self.matrix, self.sq_norms, tolerance)
+        rows = self.prototypes.single_rows
+        if not len(rows):
+            return indices, dist
+
+        # Pencarian biasa (ANN, kompak atau eksak) hanya atas baris foto tunggal
+        other, other_dist = self._nearest(queries, 1, rows=None if len(rows) == self._size else rows)
+        other, other_dist = other[:, 0], other_dist[:, 0]
+        closer = other_dist < dist
+        return np.where(closer, other, indices), np.where(closer, other_dist, dist).astype(np.float32)
+
+    def match(self, face_encodings, tolerance=DEFAULT_TOLERANCE):
+        """Mencari identitas terdekat untuk setiap wajah (bukan yang pertama di bawah toleransi)"""
+        if self.prototypes is not None and self._size:
+            queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, self.dim)
+            indices, dist = self._nearest_with_prototypes(queries, tolerance)
+            indices, dist = indices[:, None], dist[:, None]
+        else:
+            indices, dist = self._nearest(face_encodings, 1)
+        if not indices.shape[1]:
+            return [MatchResult(UNKNOWN_NAME, float('inf'), 0.0, -1) for _ in range(len(indices))]
+
+        confidences = distance_to_confidence(dist[:, 0], tolerance)
+        results = []
+        for i, d, c in zip(indices[:, 0], dist[:, 0], confidences):
+            if i < 0 or d > tolerance:
+                results.append(MatchResult(UNKNOWN_NAME, float(d), float(c), -1))
+            else:
+                results.append(MatchResult(self.names[i], float(d), float(c), int(i)))
+        return results
+
+    def top_k(self, face_encodings, k=5, tolerance=DEFAULT_TOLERANCE):
+        """Mengembalikan k kandidat terdekat (urut dari jarak terkecil, tanpa ambang) untuk setiap wajah"""
+        indices, dist = self._nearest(face_encodings, k)
+        confidences = distance_to_confidence(dist, tolerance)
+        return [
+            [MatchResult(self.names[i], float(d), float(c), int(i)) for i, d, c in zip(row_i, row_d, row_c) if i >= 0]
+            for row_i, row_d, row_c in zip(indices, dist, confidences)
+        ]
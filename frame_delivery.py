@@ -0,0 +1,106 @@
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from metrics import RollingHistogram
+
+
+class FrameDelivery:
+    """Tahap pengiriman frame live ke satu klien (satu sesi, satu kamera)
+
+    Frame BGR di-encode JPEG satu kali pada max_width dan quality tertentu sehingga Streamlit
+    cukup meneruskan bytes-nya. Laju tampilan dibatasi max_fps terlepas dari laju inferensi, dan
+    frame yang isi maupun overlay-nya praktis sama dengan frame terakhir yang dikirim dilewati
+    (tetap dikirim minimal sekali per keepalive_s).
+    """
+
+    def __init__(self, quality=80, max_width=960, max_fps=15, skip_unchanged=True, change_threshold=1.5,
+                 keepalive_s=1.0, window_s=2.0):
+        self.quality = quality
+        self.max_width = max_width
+        self.max_fps = max_fps
+        self.skip_unchanged = skip_unchanged
+        self.change_threshold = change_threshold
+        self.keepalive_s = keepalive_s
+        self.window_s = window_s
+
+        self.frames_sent = 0
+        self.skipped_rate = 0
+        self.skipped_unchanged = 0
+        self.bytes_sent = 0
+        self.encode_ms = RollingHistogram(window=256)
+        self._sent = deque()
+        self._last_sent_at = None
+        self._last_thumbnail = None
+        self._last_overlay_key = None
+
+    def due(self, now=None):
+        """False bila frame berikutnya melanggar batas max_fps (dihitung sebagai dilewati)"""
+        now = time.monotonic() if now is None else now
+        if self.max_fps and self._last_sent_at is not None and now - self._last_sent_at < 1.0 / self.max_fps:
+            self.skipped_rate += 1
+            return False
+        return True
+
+    def _thumbnail(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, (64, 36), interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def _unchanged(self, thumbnail, overlay_key, now):
+        if self._last_thumbnail is None or overlay_key != self._last_overlay_key:
+            return False
+        if now - self._last_sent_at >= self.keepalive_s:
+            return False
+        return float(np.abs(thumbnail - self._last_thumbnail).mean()) < self.change_threshold
+
+    def encode(self, frame, overlay_key=None, force=False, now=None):
+        """Bytes JPEG untuk frame BGR, atau None bila frame tidak perlu dikirim
+
+        overlay_key merangkum isi overlay (mis. lokasi dan nama wajah); perubahan overlay selalu dikirim.
+        """
+        now = time.monotonic() if now is None else now
+        thumbnail = None
+        if self.skip_unchanged and not force:
+            thumbnail = self._thumbnail(frame)
+            if self._unchanged(thumbnail, overlay_key, now):
+                self.skipped_unchanged += 1
+                return None
+
+        start = time.perf_counter()
+        height, width = frame.shape[:2]
+        if self.max_width and width > self.max_width:
+            factor = self.max_width / float(width)
+            frame = cv2.resize(frame, (self.max_width, int(round(height * factor))), interpolation=cv2.INTER_AREA)
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, int(self.quality)])
+        self.encode_ms.observe((time.perf_counter() - start) * 1000)
+        if not ok:
+            return None
+
+        payload = buffer.tobytes()
+        self.frames_sent += 1
+        self.bytes_sent += len(payload)
+        self._sent.append((now, len(payload)))
+        self._last_sent_at = now
+        self._last_thumbnail = thumbnail if thumbnail is not None else self._thumbnail(frame)
+        self._last_overlay_key = overlay_key
+        return payload
+
+    def stats(self, now=None):
+        """Laju kirim (fps, bytes/detik) dalam jendela terakhir, waktu encode, dan jumlah frame dilewati"""
+        now = time.monotonic() if now is None else now
+        while self._sent and now - self._sent[0][0] > self.window_s:
+            self._sent.popleft()
+        span = now - self._sent[0][0] if len(self._sent) > 1 else 0.0
+        considered = self.frames_sent + self.skipped_rate + self.skipped_unchanged
+        return {
+            'fps': (len(self._sent) - 1) / span if span > 0 else 0.0,
+            'bytes_per_sec': sum(size for _, size in list(self._sent)[1:]) / span if span > 0 else 0.0,
+            'encode_p50_ms': self.encode_ms.percentiles((50,))[50],
+            'frames_sent': self.frames_sent,
+            'bytes_sent': self.bytes_sent,
+            'skipped_rate': self.skipped_rate,
+            'skipped_unchanged': self.skipped_unchanged,
+            'skip_ratio': 1.0 - self.frames_sent / considered if considered else 0.0,
+        }
@@ -0,0 +1,570 @@
+import glob
+import json
+import os
+import pickle
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+
+from face_gallery import FaceGallery, ENCODING_DIM
+from mapped_rows import MappedRows
+from quantization import CODEC_DTYPES, QuantizedMatrix
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+LEGACY_PICKLE = 'face_encodings.pkl'
+STORE_DIRNAME = 'gallery'
+MANIFEST = 'manifest.json'
+LOCK_FILE = 'store.lock'
+
+
+def _fsync_write(path, data, mode='wb'):
+    with open(path, mode) as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _atomic_write(path, data):
+    """Menulis ke file sementara lalu os.replace, sehingga file lama tetap utuh bila proses mati"""
+    tmp_path = path + '.tmp'
+    _fsync_write(tmp_path, data)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def _file_lock(path):
+    """Lock eksklusif antar proses selama blok berjalan (flock di POSIX, msvcrt.locking di Windows)"""
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _file_size(path):
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+class GalleryStore:
+    """Penyimpanan galeri bersegmen di disk: encoding float32 lebar tetap + log append-only
+
+    - encodings-<gen>.f32: baris float32 berukuran tetap, hanya ditambah, bisa di-memory-map
+    - norms-<gen>.f32: norma kuadrat setiap baris, agar startup tidak perlu membaca semua encoding
+    - codes-<gen>.float16 / codes-<gen>.int8: kode mode kompak per baris (int8 diawali skala float32
+      per dimensi), dibuat saat galeri pertama kali dimuat dengan codec itu lalu ikut ditambah
+    - log-<gen>.jsonl: catatan {"op": "add"|"del", ...}; penghapusan dicatat sebagai tombstone
+    - manifest.json: generasi aktif, diganti secara atomik saat kompaksi
+
+    Beberapa proses boleh menulis ke direktori yang sama (mis. aplikasi Streamlit dan layanan
+    pengenalan). Setiap penulisan memegang file lock, membaca ulang manifest dan log dari disk,
+    lalu menghitung nomor baris baru dari ukuran file. Setiap baris punya id tetap (juga setelah
+    kompaksi), sehingga delete_at dengan posisi galeri milik proses ini tetap mengenai baris yang
+    benar walaupun proses lain sudah menambah, menghapus, atau mengompaksi.
+    """
+
+    def __init__(self, directory, dim=ENCODING_DIM, compact_ratio=0.25, compact_min_rows=64, read_only=False):
+        self.directory = directory
+        self.dim = dim
+        self.read_only = read_only
+        self.compact_ratio = compact_ratio
+        self.compact_min_rows = compact_min_rows
+        self.row_bytes = dim * 4
+        self.generation = 0
+        # Keadaan di disk, dibaca ulang di bawah file lock sebelum setiap penulisan
+        self._rows = 0
+        self._live = []
+        self._live_ids = []
+        self._live_names = []
+        self._tombstones = 0
+        self._disk_signature = None
+        # Urutan baris galeri milik proses ini; dasar posisi untuk delete_at
+        self._ids = []
+        self._names = []
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        self._compactor = None
+
+        if not read_only:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def _encodings_path(self, generation=None):
+        return self._path(f"encodings-{self.generation if generation is None else generation:06d}.f32")
+
+    def _norms_path(self, generation=None):
+        return self._path(f"norms-{self.generation if generation is None else generation:06d}.f32")
+
+    def _codes_path(self, codec, generation=None):
+        return self._path(f"codes-{self.generation if generation is None else generation:06d}.{codec}")
+
+    def _log_path(self, generation=None):
+        return self._path(f"log-{self.generation if generation is None else generation:06d}.jsonl")
+
+    def exists(self):
+        return os.path.exists(self._path(MANIFEST))
+
+    def __len__(self):
+        return len(self._ids)
+
+    @property
+    def names(self):
+        return list(self._names)
+
+    @contextmanager
+    def _write_lock(self):
+        """Lock thread + file lock antar proses; reentrant di dalam satu objek store"""
+        with self._lock:
+            if self._lock_depth:
+                yield
+                return
+            with _file_lock(self._path(LOCK_FILE)):
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+
+    def _write_manifest(self, generation):
+        manifest = {
+            'format': 1,
+            'dim': self.dim,
+            'generation': generation,
+            'encodings': os.path.basename(self._encodings_path(generation)),
+            'log': os.path.basename(self._log_path(generation)),
+        }
+        _atomic_write(self._path(MANIFEST), json.dumps(manifest, indent=2).encode('utf-8'))
+
+    def _read_manifest(self):
+        with open(self._path(MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest['dim'] != self.dim:
+            raise ValueError(f"Dimensi store {manifest['dim']} tidak sama dengan {self.dim}")
+        return manifest
+
+    def _signature(self):
+        """(generasi, ukuran file encoding, ukuran log) di disk; berubah bila ada proses yang menulis"""
+        generation = self._read_manifest()['generation']
+        return generation, _file_size(self._encodings_path(generation)), _file_size(self._log_path(generation))
+
+    def _replay_log(self):
+        """Membaca ulang log; baris terakhir yang terpotong (crash saat menulis) diabaikan dan dipangkas"""
+        live = []
+        ids = []
+        names = []
+        tombstones = 0
+        valid_bytes = 0
+        log_path = self._log_path()
+
+        if os.path.exists(log_path):
+            with open(log_path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    valid_bytes += len(line)
+
+                    if record['op'] == 'add' and record['row'] < self._rows:
+                        live.append(record['row'])
+                        # Log lama belum punya id; nomor baris dalam generasinya sudah unik
+                        ids.append(record.get('id') or f"{self.generation}-{record['row']}")
+                        names.append(record['name'])
+                    elif record['op'] == 'del' and record['row'] in live:
+                        position = live.index(record['row'])
+                        live.pop(position)
+                        ids.pop(position)
+                        names.pop(position)
+                        tombstones += 1
+
+            if valid_bytes != os.path.getsize(log_path) and not self.read_only:
+                with open(log_path, 'r+b') as f:
+                    f.truncate(valid_bytes)
+
+        self._live = live
+        self._live_ids = ids
+        self._live_names = names
+        self._tombstones = tombstones
+
+    def _open(self):
+        self.generation = self._read_manifest()['generation']
+
+        encodings_path = self._encodings_path()
+        size = _file_size(encodings_path)
+        if size % self.row_bytes and not self.read_only:
+            with open(encodings_path, 'r+b') as f:
+                f.truncate(size - size % self.row_bytes)
+        self._rows = size // self.row_bytes
+        if not self.read_only:
+            self._sync_norms()
+
+        self._replay_log()
+        self._disk_signature = self._signature()
+
+    def _compute_norms(self, first, last, chunk_size=8192):
+        mapped = np.memmap(self._encodings_path(), dtype=np.float32, mode='r', shape=(self._rows, self.dim))
+        norms = np.empty(last - first, dtype=np.float32)
+        for start in range(first, last, chunk_size):
+            block = mapped[start:min(start + chunk_size, last)]
+            norms[start - first:start - first + len(block)] = np.einsum('ij,ij->i', block, block)
+        return norms
+
+    def _sync_norms(self):
+        """Menyamakan panjang file norma dengan file encoding (store lama atau crash di tengah append)"""
+        path = self._norms_path()
+        count = _file_size(path) // 4
+        if count > self._rows or _file_size(path) % 4:
+            with open(path, 'r+b') as f:
+                f.truncate(min(count, self._rows) * 4)
+            count = min(count, self._rows)
+        if count < self._rows:
+            _fsync_write(path, self._compute_norms(count, self._rows).tobytes(), mode='ab')
+
+    def _load_norms(self):
+        """Norma kuadrat semua baris file encoding; yang belum tercatat (store read-only) dihitung di memori"""
+        path = self._norms_path()
+        count = min(_file_size(path) // 4, self._rows)
+        norms = np.fromfile(path, dtype=np.float32, count=count) if count else np.empty(0, dtype=np.float32)
+        if count < self._rows:
+            norms = np.concatenate([norms, self._compute_norms(count, self._rows)])
+        return norms
+
+    def _refresh(self):
+        """Menyamakan keadaan disk di memori bila proses lain sudah menulis (dipanggil di bawah file lock)"""
+        if self.exists() and self._signature() != self._disk_signature:
+            self._open()
+
+    def _codes_header(self, codec):
+        return self.dim * 4 if codec == 'int8' else 0
+
+    def _codes_row_bytes(self, codec):
+        return self.dim * np.dtype(CODEC_DTYPES[codec]).itemsize
+
+    def _codes_size(self, codec, rows):
+        return self._codes_header(codec) + rows * self._codes_row_bytes(codec)
+
+    def _read_codes(self, codec):
+        """(kode, skala) dari file kode generasi aktif, paling banyak sejumlah baris file encoding; (None, None) bila belum ada"""
+        path = self._codes_path(codec)
+        header = self._codes_header(codec)
+        size = _file_size(path)
+        if not os.path.exists(path) or size < header:
+            return None, None
+        count = min((size - header) // self._codes_row_bytes(codec), self._rows)
+        scale = np.fromfile(path, dtype=np.float32, count=self.dim) if header else None
+        codes = np.fromfile(path, dtype=CODEC_DTYPES[codec], count=count * self.dim, offset=header)
+        return codes.reshape(count, self.dim), scale
+
+    def _write_codes(self, codec, quantized, generation=None):
+        header = quantized.scale.astype(np.float32).tobytes() if self._codes_header(codec) else b''
+        _atomic_write(self._codes_path(codec, generation), header + quantized.codes.tobytes())
+
+    def _codes_quantizer(self, codec, chunk_size=8192):
+        """QuantizedMatrix untuk semua baris file encoding, memakai kode tersimpan bila ada
+
+        Baris yang belum punya kode (store lama, crash di tengah append, atau ditulis tanpa kode)
+        dikuantisasi dengan skala yang tersimpan; bila skala int8 tidak lagi mencukupi, semua kode
+        dibangun ulang. Penulis menyimpan hasilnya; store read-only hanya menghitungnya di memori.
+        """
+        quantized = QuantizedMatrix(codec)
+        if not self._rows:
+            quantized.build(np.empty((0, self.dim), dtype=np.float32))
+            return quantized
+
+        mapped = np.memmap(self._encodings_path(), dtype=np.float32, mode='r', shape=(self._rows, self.dim))
+        codes, scale = self._read_codes(codec)
+        if codes is not None:
+            quantized.scale = scale
+            if any(quantized.needs_rebuild(mapped[start:start + chunk_size])
+                   for start in range(len(codes), self._rows, chunk_size)):
+                codes = None
+        if codes is None:
+            quantized.build(mapped)
+            if not self.read_only:
+                self._write_codes(codec, quantized)
+            return quantized
+
+        if len(codes) < self._rows:
+            codes = np.concatenate([codes] + [quantized.quantize(mapped[start:start + chunk_size])
+                                              for start in range(len(codes), self._rows, chunk_size)])
+        quantized.load(codes, scale)
+        if not self.read_only and _file_size(self._codes_path(codec)) != self._codes_size(codec, self._rows):
+            self._write_codes(codec, quantized)
+        return quantized
+
+    def _append_codes(self, matrix):
+        """Menambah kode baris baru ke setiap file kode generasi aktif; file int8 yang skalanya
+        tidak cukup dihapus dan dibangun ulang pada pemuatan berikutnya"""
+        for codec in CODEC_DTYPES:
+            path = self._codes_path(codec)
+            if not os.path.exists(path):
+                continue
+            quantized = QuantizedMatrix(codec)
+            if self._codes_header(codec):
+                quantized.scale = np.fromfile(path, dtype=np.float32, count=self.dim)
+            if _file_size(path) != self._codes_size(codec, self._rows) or quantized.needs_rebuild(matrix):
+                os.remove(path)
+            else:
+                _fsync_write(path, quantized.quantize(matrix).tobytes(), mode='ab')
+
+    def _remove_stale_generations(self):
+        current = {os.path.basename(path) for path in (self._encodings_path(), self._norms_path(), self._log_path())}
+        current.update(os.path.basename(self._codes_path(codec)) for codec in CODEC_DTYPES)
+        for path in (glob.glob(self._path('encodings-*.f32')) + glob.glob(self._path('norms-*.f32'))
+                     + glob.glob(self._path('codes-*')) + glob.glob(self._path('log-*.jsonl'))):
+            if os.path.basename(path) not in current:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def load(self):
+        """Membuka store dan mengembalikan (matriks encoding, nama, norma kuadrat) untuk baris yang masih hidup
+
+        Bila tidak ada tombstone, matriks adalah memmap copy-on-write dari file encoding dan norma
+        dibaca dari file norma, sehingga startup tidak perlu membaca seluruh file encoding.
+        """
+        with self._lock:
+            self._load_state()
+            if not self._live:
+                return np.empty((0, self.dim), dtype=np.float32), [], np.empty(0, dtype=np.float32)
+
+            mapped = np.memmap(self._encodings_path(), dtype=np.float32, mode='c', shape=(self._rows, self.dim))
+            norms = self._load_norms()
+            if self._live == list(range(len(self._live))):
+                return mapped[:len(self._live)], self.names, norms[:len(self._live)]
+            return np.array(mapped[self._live]), self.names, norms[self._live]
+
+    def _load_state(self, codec=None):
+        """Membuka keadaan disk terbaru dan menjadikannya urutan galeri proses ini; dengan codec juga
+        mengembalikan QuantizedMatrix semua baris file encoding"""
+        quantized = None
+        if self.read_only:
+            self._open()
+            if codec is not None:
+                quantized = self._codes_quantizer(codec)
+        else:
+            with self._write_lock():
+                self._open()
+                self._remove_stale_generations()
+                if codec is not None:
+                    quantized = self._codes_quantizer(codec)
+        self._ids = list(self._live_ids)
+        self._names = list(self._live_names)
+        return quantized
+
+    def load_gallery(self, codec=None, rerank=32):
+        """Galeri dari store; dengan codec ('float16'/'int8') galeri dimuat dalam mode kompak
+
+        Pada mode kompak hanya kode (dari file kode) dan norma yang dimuat ke RAM. Baris float32 tetap
+        di file encoding dan dibaca lewat memmap hanya untuk re-rank shortlist (lihat MappedRows).
+        """
+        if codec is None:
+            matrix, names, sq_norms = self.load()
+            return FaceGallery(matrix, names, dim=self.dim, sq_norms=sq_norms)
+
+        with self._lock:
+            quantized = self._load_state(codec)
+            gallery = FaceGallery(dim=self.dim)
+            if self._live:
+                mapped = np.memmap(self._encodings_path(), dtype=np.float32, mode='r', shape=(self._rows, self.dim))
+                quantized.load(quantized.codes[self._live], quantized.scale)
+                gallery.set(MappedRows(mapped, self._live), self.names, self._load_norms()[self._live])
+            gallery.enable_compact(codec, rerank=rerank, compact=quantized if self._live else None)
+            return gallery
+
+    def _check_writable(self):
+        if self.read_only:
+            raise PermissionError("GalleryStore dibuka read-only")
+
+    def _append_log(self, records):
+        data = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+        _fsync_write(self._log_path(), data.encode('utf-8'), mode='ab')
+
+    def append(self, encodings, names):
+        """Menambahkan encoding di akhir: baris ditulis dulu, lalu dicatat di log (titik commit)"""
+        matrix = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+        if len(matrix) != len(names):
+            raise ValueError("Jumlah encoding dan nama tidak sama")
+        if not len(matrix):
+            return []
+
+        with self._write_lock():
+            self._check_writable()
+            self._refresh()
+            first = self._rows
+            rows = list(range(first, first + len(matrix)))
+            ids = [uuid.uuid4().hex for _ in rows]
+            _fsync_write(self._encodings_path(), matrix.tobytes(), mode='ab')
+            _fsync_write(self._norms_path(), np.einsum('ij,ij->i', matrix, matrix).tobytes(), mode='ab')
+            self._append_codes(matrix)
+            self._append_log([{'op': 'add', 'row': row, 'name': name, 'id': row_id}
+                              for row, name, row_id in zip(rows, names, ids)])
+
+            self._rows += len(matrix)
+            self._live.extend(rows)
+            self._live_ids.extend(ids)
+            self._live_names.extend(names)
+            self._disk_signature = self._signature()
+            self._ids.extend(ids)
+            self._names.extend(names)
+            return rows
+
+    def delete_at(self, positions):
+        """Mencatat tombstone untuk baris pada posisi galeri (urut sesuai galeri sebelum penghapusan)
+
+        Posisi diterjemahkan ke id baris sebelum keadaan disk dibaca ulang; baris yang sudah
+        dihapus proses lain dilewati.
+        """
+        with self._write_lock():
+            self._check_writable()
+            ids = []
+            for position in sorted(positions, reverse=True):
+                ids.append(self._ids.pop(position))
+                self._names.pop(position)
+
+            self._refresh()
+            on_disk = {row_id: position for position, row_id in enumerate(self._live_ids)}
+            records = []
+            for position in sorted((on_disk[row_id] for row_id in ids if row_id in on_disk), reverse=True):
+                records.append({'op': 'del', 'row': self._live.pop(position), 'id': self._live_ids.pop(position)})
+                self._live_names.pop(position)
+            if records:
+                self._append_log(records)
+                self._tombstones += len(records)
+                self._disk_signature = self._signature()
+
+    def _write_generation(self, matrix, names, ids):
+        """Menulis generasi baru (dipanggil di bawah file lock setelah _refresh)"""
+        generation = self.generation + 1
+        _fsync_write(self._encodings_path(generation), matrix.tobytes())
+        _fsync_write(self._norms_path(generation), np.einsum('ij,ij->i', matrix, matrix).tobytes())
+        # Kode mode kompak yang sudah dipakai ikut ditulis, agar pemuatan berikutnya tidak membangunnya ulang
+        for codec in CODEC_DTYPES:
+            if os.path.exists(self._codes_path(codec)):
+                quantized = QuantizedMatrix(codec)
+                quantized.build(matrix)
+                self._write_codes(codec, quantized, generation)
+        log = ''.join(json.dumps({'op': 'add', 'row': row, 'name': name, 'id': row_id}, ensure_ascii=False) + '\n'
+                      for row, (name, row_id) in enumerate(zip(names, ids)))
+        _fsync_write(self._log_path(generation), log.encode('utf-8'))
+        self._write_manifest(generation)
+
+        self.generation = generation
+        self._rows = len(matrix)
+        self._live = list(range(len(matrix)))
+        self._live_ids = list(ids)
+        self._live_names = list(names)
+        self._tombstones = 0
+        self._disk_signature = self._signature()
+        self._remove_stale_generations()
+
+    def rewrite(self, encodings, names):
+        """Menulis seluruh isi galeri sebagai generasi baru (dipakai untuk impor dan simpan manual)
+
+        Isi store diganti dengan galeri ini, termasuk perubahan proses lain yang belum ada di dalamnya.
+        """
+        matrix = np.ascontiguousarray(np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim))
+        if len(matrix) != len(names):
+            raise ValueError("Jumlah encoding dan nama tidak sama")
+
+        with self._write_lock():
+            self._check_writable()
+            self._refresh()
+            ids = [uuid.uuid4().hex for _ in names]
+            self._write_generation(matrix, list(names), ids)
+            self._ids = ids
+            self._names = list(names)
+
+    def compact(self):
+        """Membuang tombstone dan baris yatim dengan menulis generasi baru secara atomik
+
+        Keadaan disk dibaca ulang lebih dulu sehingga baris milik proses lain ikut disalin, dan id
+        baris dipertahankan agar posisi galeri setiap proses tetap bisa diterjemahkan.
+        """
+        with self._write_lock():
+            self._check_writable()
+            self._refresh()
+            if not self._live:
+                self._write_generation(np.empty((0, self.dim), dtype=np.float32), [], [])
+                return
+            mapped = np.memmap(self._encodings_path(), dtype=np.float32, mode='r', shape=(self._rows, self.dim))
+            matrix = np.array(mapped[self._live])
+            del mapped
+            self._write_generation(matrix, self._live_names, self._live_ids)
+
+    def needs_compaction(self):
+        total = len(self._live) + self._tombstones
+        return self._tombstones >= self.compact_min_rows and self._tombstones > self.compact_ratio * total
+
+    def maybe_compact(self, background=True):
+        """Menjalankan kompaksi (di thread latar) bila tombstone sudah terlalu banyak"""
+        if not self.needs_compaction():
+            return False
+        if not background:
+            self.compact()
+            return True
+        if self._compactor is not None and self._compactor.is_alive():
+            return False
+        self._compactor = threading.Thread(target=self.compact, name="gallery-compaction", daemon=True)
+        self._compactor.start()
+        return True
+
+    def import_pickle(self, pickle_path):
+        """Impor galeri lama (pickle {'encodings', 'names'}) menjadi generasi pertama store"""
+        with open(pickle_path, 'rb') as f:
+            model_data = pickle.load(f)
+        self.rewrite(model_data['encodings'], model_data['names'])
+        return len(model_data['names'])
+
+
+def open_store(model_dir, dim=ENCODING_DIM):
+    """Membuka store di model_dir, mengimpor pickle lama secara otomatis pada penggunaan pertama"""
+    store = GalleryStore(os.path.join(model_dir, STORE_DIRNAME), dim=dim)
+    with store._write_lock():
+        if not store.exists():
+            legacy_path = os.path.join(model_dir, LEGACY_PICKLE)
+            if os.path.exists(legacy_path):
+                store.import_pickle(legacy_path)
+            else:
+                store.rewrite(np.empty((0, dim), dtype=np.float32), [])
+    return store
+
+
+def load_gallery(model_dir):
+    """Memuat galeri dari model_dir (store bersegmen, atau pickle lama bila store belum ada)"""
+    store_dir = os.path.join(model_dir, STORE_DIRNAME)
+    if os.path.exists(os.path.join(store_dir, MANIFEST)):
+        return GalleryStore(store_dir, read_only=True).load_gallery()
+
+    legacy_path = os.path.join(model_dir, LEGACY_PICKLE)
+    if not os.path.exists(legacy_path):
+        return FaceGallery()
+    with open(legacy_path, 'rb') as f:
+        model_data = pickle.load(f)
+    return FaceGallery(model_data['encodings'], model_data['names'])
@@ -1,7 +1,6 @@
+from startup import STARTUP
 import cv2
 import time
-import face_recognition
-from cvzone.FaceDetectionModule import FaceDetector
 import numpy as np
 import os
 import traceback
@@ -10,39 +9,92 @@ from PIL import Image
 import tempfile
 import base64
 from datetime import datetime, timedelta
-import pickle
 import json
+from collections import Counter
+from face_gallery import UNKNOWN_NAME
+from recognition import FaceRecognizer, apply_ann_settings, apply_compact_settings, apply_prototype_settings
+from shared_gallery import shared_gallery
+from camera_manager import MultiCameraPipeline, camera_manager
+from tracking import FaceTracker
+from bulk_enroll import add_batch, prepare_enrollment
+from encoding_cache import EncodingCache, image_cache_key
+from metrics import PipelineMetrics, STAGES, start_metrics_server
+from frame_delivery import FrameDelivery
+from motion_gate import MotionGate
+from sightings import SightingStore
+from video_recognize import DEFAULT_DB as SIGHTINGS_DB, recognize_videos
+from service_client import RecognitionClient, ServiceUnavailable, DEFAULT_SERVICE_URL
+STARTUP.mark('imports')
 
-class FaceRecognitionApp:
+class FaceRecognitionApp(FaceRecognizer):
     def __init__(self):
-        self.known_face_encodings = []
-        self.known_face_names = []
-        self.font = cv2.FONT_HERSHEY_SIMPLEX
+        super().__init__(encoding_cache=EncodingCache(max_entries=128))
+        self.metrics = PipelineMetrics()
+        self.timings = self.metrics
+        self.cameras = camera_manager(ttl=60.0)
+        self.service = None
         self.running = True
         self.model_dir = "saved_models"
-        self.auto_save_enabled = True
+        self._sightings = None
         
         os.makedirs(self.model_dir, exist_ok=True)
         
-        self.load_saved_model()
-    
+        with STARTUP.phase('gallery_load'):
+            self.shared = shared_gallery(self.model_dir)
+        self.gallery_version = -1
+        self.sync_gallery()
+        if STARTUP.once('prototypes'):
+            self.configure_prototypes(True)
+        
+        self.cameras.probe_async(report=STARTUP)
+        if STARTUP.once('warm_up'):
+            self.start_warm_up(STARTUP)
+
+    @property
+    def known_face_encodings(self):
+        return self.gallery.encodings
+
+    @property
+    def known_face_names(self):
+        self.sync_gallery()
+        if self.service is not None:
+            try:
+                return self.service.names()
+            except ServiceUnavailable as e:
+                print(f"Error layanan pengenalan: {e}")
+                return []
+        return self.gallery.names
+
+    def connect_service(self, url):
+        """Memakai layanan pengenalan di url (deteksi, encoding, galeri); False bila tidak bisa dihubungi"""
+        client = RecognitionClient(url)
+        if not client.is_available():
+            self.service = None
+            return False
+        self.service = client
+        return True
+
+    def disconnect_service(self):
+        self.service = None
+
     def get_model_path(self, filename):
         """Mendapatkan path lengkap untuk file model"""
         return os.path.join(self.model_dir, filename)
     
+    @property
+    def sightings(self):
+        """Log sighting rekaman video (dibuka saat pertama dipakai)"""
+        if self._sightings is None:
+            self._sightings = SightingStore(self.get_model_path(SIGHTINGS_DB))
+        return self._sightings
+    
     def save_model(self):
         """Menyimpan model encoding wajah ke file"""
         try:
             if not self.auto_save_enabled:
                 return False
-                
-            model_data = {
-                'encodings': self.known_face_encodings,
-                'names': self.known_face_names
-            }
             
-            with open(self.get_model_path('face_encodings.pkl'), 'wb') as f:
-                pickle.dump(model_data, f)
+            self.shared.save()
 
             metadata = {
                 'names': self.known_face_names,
@@ -61,17 +113,12 @@ class FaceRecognitionApp:
             return False
     
     def load_saved_model(self):
-        """Memuat model encoding wajah dari file"""
+        """Memuat ulang model dari store dan membagikannya ke semua sesi"""
         try:
-            model_path = self.get_model_path('face_encodings.pkl')
+            self.shared.reload()
+            self.sync_gallery()
             
-            if os.path.exists(model_path):
-                with open(model_path, 'rb') as f:
-                    model_data = pickle.load(f)
-                
-                self.known_face_encodings = model_data['encodings']
-                self.known_face_names = model_data['names']
-                
+            if len(self.gallery):
                 print(f"Model berhasil dimuat: {len(self.known_face_names)} wajah")
                 return True
             else:
@@ -82,11 +129,55 @@ class FaceRecognitionApp:
             print(f"Error memuat model: {e}")
             return False
     
-    def auto_save(self):
-        """Fungsi auto save yang dipanggil setelah perubahan data wajah"""
-        if self.auto_save_enabled:
-            return self.save_model()
-        return False
+    def sync_gallery(self):
+        """Mengambil snapshot galeri bersama terbaru bila version berubah (murah, tanpa lock)"""
+        version, gallery = self.shared.state()
+        if version == self.gallery_version:
+            return False
+        self.gallery = gallery
+        self.gallery_version = version
+        self.ann_enabled = gallery.ann is not None
+        if gallery.ann is not None:
+            self.ann_nprobe = gallery.ann.nprobe
+        self.compact_codec = gallery.compact.codec if gallery.compact is not None else None
+        self.compact_rerank = gallery.rerank
+        self.prototypes_enabled = gallery.prototypes is not None
+        return True
+
+    @property
+    def auto_save_enabled(self):
+        return self.shared.auto_save
+
+    @auto_save_enabled.setter
+    def auto_save_enabled(self, enabled):
+        self.shared.auto_save = enabled
+
+    def saved(self):
+        """True bila perubahan terakhir sudah tersimpan ke store"""
+        return self.auto_save_enabled and not self.shared.dirty
+
+    def configure_ann(self, enabled, nprobe=8):
+        """Mengaktifkan/menonaktifkan indeks ANN pada galeri bersama (berlaku untuk semua sesi)"""
+        self.ann_enabled = enabled
+        self.ann_nprobe = nprobe
+        self.shared.update(lambda gallery: apply_ann_settings(gallery, enabled, nprobe), persist=False)
+        self.sync_gallery()
+
+    def configure_compact(self, codec=None, rerank=32):
+        """Mode galeri kompak pada galeri bersama (berlaku untuk semua sesi)"""
+        self.compact_codec = codec
+        self.compact_rerank = rerank
+        current = self.shared.snapshot.compact
+        switching = codec is not None and (current is None or current.codec != codec)
+        if not (switching and self.shared.load_compact(codec, rerank)):
+            self.shared.update(lambda gallery: apply_compact_settings(gallery, codec, rerank), persist=False)
+        self.sync_gallery()
+
+    def configure_prototypes(self, enabled):
+        """Pencocokan lewat prototipe per identitas pada galeri bersama (berlaku untuk semua sesi)"""
+        self.prototypes_enabled = enabled
+        self.shared.update(lambda gallery: apply_prototype_settings(gallery, enabled), persist=False)
+        self.sync_gallery()
 
     def load_known_faces(self, image_path, name):
         """Load wajah yang sudah dikenal dengan nama"""
@@ -96,20 +187,42 @@ class FaceRecognitionApp:
                 return False
                 
             st.info(f"Memuat foto {image_path} untuk {name}...")
-            wajah_image = face_recognition.load_image_file(image_path)
-            encoding_list = face_recognition.face_encodings(wajah_image)
+            with open(image_path, 'rb') as f:
+                image_bytes = f.read()
+            
+            if self.service is not None:
+                response = self.service.enroll(name, image_bytes)
+                st.success(f"✓ Berhasil memuat data wajah untuk {name} (layanan, {response['faces']} wajah)")
+                return True
+            
+            cache_key = image_cache_key(image_bytes, {'detector': 'hog', 'purpose': 'enroll'})
+            
+            cached = self.encoding_cache.get(cache_key)
+            if cached is not None:
+                face_locations = cached.face_locations
+                encoding_list = cached.face_encodings
+            else:
+                import face_recognition
+                wajah_image = face_recognition.load_image_file(image_path)
+                face_locations = face_recognition.face_locations(wajah_image)
+                encoding_list = face_recognition.face_encodings(wajah_image, face_locations)
+                self.encoding_cache.put(cache_key, [{} for _ in face_locations], face_locations, encoding_list)
             
             if not encoding_list:
                 st.error(f"PERINGATAN: Tidak ada wajah yang terdeteksi di {image_path}!")
                 return False
-                
-            self.known_face_encodings.append(encoding_list[0])
-            self.known_face_names.append(name)
             
-            if self.auto_save():
-                st.success(f"✓ Berhasil memuat data wajah untuk {name} (Auto-saved)")
+            # Foto berisi beberapa wajah: wajah terbesar dianggap milik orang yang didaftarkan
+            largest = max(range(len(encoding_list)),
+                          key=lambda i: (face_locations[i][2] - face_locations[i][0]) * (face_locations[i][1] - face_locations[i][3]))
+            self.shared.add(encoding_list[largest], name)
+            self.sync_gallery()
+            samples = self.gallery.names.count(name)
+            
+            if self.saved():
+                st.success(f"✓ Berhasil memuat data wajah untuk {name} (sampel ke-{samples}, Auto-saved)")
             else:
-                st.success(f"✓ Berhasil memuat data wajah untuk {name}")
+                st.success(f"✓ Berhasil memuat data wajah untuk {name} (sampel ke-{samples})")
                 
             return True
             
@@ -117,18 +230,35 @@ class FaceRecognitionApp:
             st.error(f"Error saat memuat wajah: {e}")
             return False
 
+    def bulk_enroll(self, source, processes=None, progress_callback=None):
+        """Enrollment massal dari folder/ZIP (nama/foto), model disimpan sekali di akhir
+
+        Encoding dan pemeriksaan duplikat berjalan di luar write lock galeri bersama (terhadap snapshot
+        saat mulai); hasilnya diterapkan dalam satu update singkat.
+        """
+        report, batch = prepare_enrollment(self.shared.snapshot, source, processes=processes,
+                                           progress_callback=progress_callback)
+        if len(batch):
+            self.shared.update(lambda gallery: add_batch(gallery, batch))
+        self.sync_gallery()
+        return report
+
     def delete_face(self, name):
         """Menghapus wajah dari daftar known faces"""
         try:
-            if name in self.known_face_names:
-                idx = self.known_face_names.index(name)
-                self.known_face_names.pop(idx)
-                self.known_face_encodings.pop(idx)
+            if self.service is not None:
+                if self.service.delete(name):
+                    st.success(f"Wajah {name} berhasil dihapus (layanan)")
+                    return True
+                return False
+            
+            if self.shared.remove(name):
+                self.sync_gallery()
                 
-                if self.auto_save():
-                    st.success(f"Wajah {name} berhasil dihapus (Auto-saved)")
+                if self.saved():
+                    st.success(f"Semua sampel wajah {name} berhasil dihapus (Auto-saved)")
                 else:
-                    st.success(f"Wajah {name} berhasil dihapus")
+                    st.success(f"Semua sampel wajah {name} berhasil dihapus")
                     
                 return True
             return False
@@ -136,61 +266,74 @@ class FaceRecognitionApp:
             st.error(f"Error menghapus wajah: {e}")
             return False
 
-    def process_image(self, image):
+    def process_image(self, image, image_bytes=None):
         """Process single image for face recognition"""
         try:
-            detector = FaceDetector()
-            
-            if isinstance(image, Image.Image):
-                frame = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+            if self.service is not None:
+                result_image, detections = self.recognize_remote(image)
             else:
-                frame = image.copy()
-            
-            frame, faces = detector.findFaces(frame, draw=True)
-            recognized_faces = []
-            
-            if faces and self.known_face_encodings:
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                face_locations = face_recognition.face_locations(rgb_frame)
-                face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
-                
-                for face_encoding, face_location in zip(face_encodings, face_locations):
-                    matches = face_recognition.compare_faces(self.known_face_encodings, face_encoding, tolerance=0.6)
-                    name = "Tidak Dikenal"
-                    
-                    if True in matches:
-                        first_match_index = matches.index(True)
-                        name = self.known_face_names[first_match_index]
-                    
-                    recognized_faces.append(name)
-                    
-                    top, right, bottom, left = face_location
-                    cv2.rectangle(frame, (left, bottom + 5), (right, bottom + 30), (0, 0, 0), -1)
-                    color = (0, 255, 0) if name != "Tidak Dikenal" else (0, 0, 255)
-                    cv2.putText(frame, name, (left + 5, bottom + 22), self.font, 0.6, color, 2)
-            
-            result_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            return result_image, len(faces), recognized_faces
+                result_image, detections = self.recognize_image(image, image_bytes=image_bytes)
+            recognized_faces = [match.name for _, _, match in detections if match is not None]
+            return result_image, len(detections), recognized_faces
             
         except Exception as e:
             st.error(f"Error processing image: {e}")
             return None, 0, []
 
-    def get_available_cameras(self):
-        """Mendapatkan daftar kamera yang tersedia"""
-        available_cameras = []
-        
-        for i in range(5):
-            cap = cv2.VideoCapture(i)
-            if cap.isOpened():
-                ret, frame = cap.read()
-                if ret:
-                    available_cameras.append(i)
-                cap.release()
-            else:
-                cap.release()
-                
-        return available_cameras
+    def recognize_remote(self, image):
+        """Seperti recognize_image, tetapi deteksi dan pencocokan dikerjakan layanan pengenalan"""
+        frame = cv2.cvtColor(np.array(image.convert('RGB')), cv2.COLOR_RGB2BGR)
+        frame = self.limit_resolution(frame)
+        detections = self.service.recognize_frame(frame)
+        self.annotate_frame(frame, detections)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), detections
+
+    def get_available_cameras(self, refresh=False):
+        """Mendapatkan daftar kamera yang tersedia (probe paralel, di-cache oleh CameraManager)"""
+        return self.cameras.available_cameras(refresh=refresh)
+
+def render_metrics_panel(container, metrics, deliveries=None):
+    """Panel metrik pipeline webcam (FPS, frame drop, latensi per tahap, pengiriman frame ke browser)"""
+    snapshot = metrics.snapshot()
+    with container.container():
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("FPS Tampilan", f"{snapshot['display_fps']:.1f}")
+        col2.metric("FPS Inferensi", f"{snapshot['inference_fps']:.1f}")
+        col3.metric("Frame Drop", snapshot['counters'].get('frames_dropped', 0))
+        col4.metric("Ukuran Galeri", snapshot['gauges'].get('gallery_size', 0))
+        skipped_static = snapshot['counters'].get('frames_skipped_static', 0)
+        if skipped_static:
+            st.caption(f"Frame statis yang tidak dideteksi ulang: {skipped_static}")
+        
+        rows = []
+        for name in STAGES:
+            stats = snapshot['stages'].get(name)
+            if stats and stats['count']:
+                rows.append({
+                    'Tahap': name,
+                    'p50 (ms)': round(stats['p50_ms'], 2),
+                    'p90 (ms)': round(stats['p90_ms'], 2),
+                    'p99 (ms)': round(stats['p99_ms'], 2),
+                    'Jumlah': stats['count'],
+                })
+        if rows:
+            st.dataframe(rows, use_container_width=True, hide_index=True)
+            bottleneck = metrics.busiest_stage()
+            if bottleneck:
+                st.caption(f"Tahap paling lambat saat ini: **{bottleneck}**")
+        
+        if deliveries:
+            delivery_rows = []
+            for source, delivery in deliveries.items():
+                stats = delivery.stats()
+                delivery_rows.append({
+                    'Kamera': source,
+                    'FPS kirim': round(stats['fps'], 1),
+                    'KB/detik': round(stats['bytes_per_sec'] / 1024, 1),
+                    'Encode p50 (ms)': round(stats['encode_p50_ms'], 2) if stats['encode_p50_ms'] is not None else None,
+                    'Dilewati': f"{stats['skip_ratio']:.0%}",
+                })
+            st.dataframe(delivery_rows, use_container_width=True, hide_index=True)
 
 def main_streamlit():
     """Streamlit application"""
@@ -204,18 +347,22 @@ def main_streamlit():
     st.markdown("Aplikasi pengenalan wajah dengan Streamlit - Multi Wajah & Real-time Streaming")
     
     if 'app' not in st.session_state:
-        st.session_state.app = FaceRecognitionApp()
+        with STARTUP.phase('app_init'):
+            st.session_state.app = FaceRecognitionApp()
         st.session_state.known_faces_loaded = False
         st.session_state.webcam_active = False
         st.session_state.face_recognized = False
         st.session_state.last_capture_time = None
         st.session_state.recognized_name = None
         st.session_state.available_cameras = []
-        st.session_state.selected_camera = 0
+        st.session_state.selected_cameras = []
+        st.session_state.streaming_cameras = []
         st.session_state.known_faces_list = st.session_state.app.known_face_names.copy()
         st.session_state.operation_mode = "Streaming Real-time" 
     
     app = st.session_state.app
+    if app.sync_gallery():
+        st.session_state.known_faces_list = app.known_face_names.copy()
     
     st.sidebar.header("🔧 Konfigurasi Wajah")
     
@@ -241,12 +388,47 @@ def main_streamlit():
             
             os.unlink(tmp_path)
     
+    with st.sidebar.expander("📦 Tambah Wajah Massal", expanded=False):
+        st.caption("Struktur: satu folder per orang, berisi foto-foto orang tersebut (nama/foto.jpg)")
+        bulk_folder = st.text_input("Path folder", placeholder="contoh: D:/data/karyawan", key="bulk_folder")
+        bulk_zip = st.file_uploader("atau upload ZIP", type=['zip'], key="bulk_zip")
+        bulk_processes = st.slider("Jumlah proses", 1, os.cpu_count() or 1, os.cpu_count() or 1, key="bulk_processes")
+        
+        if st.button("📥 Proses Enrollment Massal", use_container_width=True) and (bulk_zip is not None or bulk_folder):
+            source = bulk_zip if bulk_zip is not None else bulk_folder
+            if bulk_zip is None and not os.path.isdir(bulk_folder):
+                st.error(f"Folder {bulk_folder} tidak ditemukan!")
+            else:
+                progress_bar = st.progress(0.0, text="Menyiapkan...")
+                
+                def update_progress(done, total):
+                    progress_bar.progress(done / total if total else 1.0, text=f"{done}/{total} foto diproses")
+                
+                try:
+                    report = app.bulk_enroll(source, processes=bulk_processes, progress_callback=update_progress)
+                    summary = report.summary()
+                    st.success(f"✓ {summary['added']} foto ({summary['identities']} orang) ditambahkan dari {summary['total']} foto")
+                    
+                    if report.skipped:
+                        st.warning(f"{summary['skipped']} foto dilewati ({summary['duplicates']} duplikat)")
+                        st.dataframe(
+                            [{'Foto': source_name, 'Alasan': reason} for source_name, reason in report.skipped],
+                            use_container_width=True
+                        )
+                    
+                    if report.added:
+                        st.session_state.known_faces_loaded = True
+                        st.session_state.known_faces_list = app.known_face_names.copy()
+                except Exception as e:
+                    st.error(f"Error enrollment massal: {e}")
+    
     if st.session_state.known_faces_list:
-        with st.sidebar.expander(f"👥 Wajah Terdaftar ({len(st.session_state.known_faces_list)})", expanded=True):
-            for i, name in enumerate(st.session_state.known_faces_list):
+        identities = Counter(st.session_state.known_faces_list)
+        with st.sidebar.expander(f"👥 Wajah Terdaftar ({len(identities)} orang)", expanded=True):
+            for i, (name, samples) in enumerate(identities.items()):
                 col1, col2 = st.columns([3, 1])
                 with col1:
-                    st.write(f"**{name}**")
+                    st.write(f"**{name}**" + (f" ({samples} sampel)" if samples > 1 else ""))
                 with col2:
                     if st.button("🗑️", key=f"delete_{i}"):
                         if app.delete_face(name):
@@ -279,29 +461,168 @@ def main_streamlit():
         if st.session_state.known_faces_list:
             st.metric("Total Wajah Tersimpan", len(st.session_state.known_faces_list))
 
+    with st.sidebar.expander("🛰️ Layanan Pengenalan", expanded=False):
+        st.caption("Jalankan `python recognition_service.py` agar semua sesi berbagi model dan galeri yang sama")
+        use_service = st.checkbox("Gunakan layanan lokal", value=app.service is not None)
+        service_url = st.text_input("URL layanan", value=DEFAULT_SERVICE_URL)
+        
+        if use_service and (app.service is None or app.service.base_url != service_url.rstrip('/')):
+            if app.connect_service(service_url):
+                st.session_state.known_faces_list = app.known_face_names.copy()
+                st.session_state.known_faces_loaded = bool(st.session_state.known_faces_list)
+            else:
+                st.error(f"Layanan {service_url} tidak bisa dihubungi, memakai model lokal")
+        elif not use_service and app.service is not None:
+            app.disconnect_service()
+            st.session_state.known_faces_list = app.known_face_names.copy()
+            st.session_state.known_faces_loaded = bool(st.session_state.known_faces_list)
+        
+        if app.service is not None:
+            st.success(f"✅ Terhubung ke {app.service.base_url}")
+
+    with st.sidebar.expander("⚡ Indeks Pencarian (ANN)", expanded=False):
+        ann_enabled = st.checkbox(
+            "Gunakan indeks ANN",
+            value=app.ann_enabled,
+            help="Untuk galeri besar (ribuan wajah ke atas). Galeri kecil tetap memakai pencarian eksak."
+        )
+        ann_nprobe = st.slider(
+            "nprobe (recall vs kecepatan)", 1, 64, app.ann_nprobe,
+            help="Semakin besar, semakin akurat tetapi semakin lambat"
+        )
+
+        if ann_enabled != app.ann_enabled or ann_nprobe != app.ann_nprobe:
+            app.configure_ann(ann_enabled, ann_nprobe)
+
+        prototypes_enabled = st.checkbox(
+            "Prototipe per identitas",
+            value=app.prototypes_enabled,
+            help="Foto-foto orang yang punya beberapa foto diringkas menjadi centroid atau beberapa medoid; sampel mentah "
+                 "hanya diperiksa di dekat ambang. Orang dengan satu foto tetap dicari lewat ANN/galeri kompak"
+        )
+        if prototypes_enabled != app.prototypes_enabled:
+            app.configure_prototypes(prototypes_enabled)
+        if app.gallery.prototypes is not None and len(app.gallery):
+            st.caption(f"{app.gallery.prototypes.identity_count} orang multi-foto, {len(app.gallery.prototypes)} prototipe; "
+                       f"{len(app.gallery.prototypes.single_rows)} foto tunggal lewat pencarian biasa")
+
+        if app.gallery.ann is not None:
+            if app.gallery.ann.is_trained:
+                st.caption(f"Indeks aktif: {len(app.gallery.ann.centroids)} sel, {len(app.gallery)} wajah")
+            else:
+                st.caption(f"Indeks dibangun otomatis setelah {app.gallery.ann.min_size} wajah")
+
+    with st.sidebar.expander("🗜️ Galeri Kompak", expanded=False):
+        codec_labels = {None: "float32 (penuh)", 'float16': "float16", 'int8': "int8 (skala per dimensi)"}
+        compact_codec = st.selectbox(
+            "Format pemindaian",
+            options=list(codec_labels),
+            index=list(codec_labels).index(app.compact_codec),
+            format_func=codec_labels.get,
+            help="Kandidat dipindai dari kode kompak di RAM, lalu shortlist diurutkan ulang dengan jarak float32 eksak "
+                 "yang dibaca dari file galeri di disk, sehingga matriks float32 tidak dimuat ke RAM. Bila ada "
+                 "perubahan yang belum tersimpan, kode dibuat di samping matriks float32 di RAM"
+        )
+        compact_rerank = st.slider("Ukuran shortlist re-rank", 8, 256, app.compact_rerank, disabled=compact_codec is None)
+        
+        if compact_codec != app.compact_codec or (compact_codec is not None and compact_rerank != app.compact_rerank):
+            app.configure_compact(compact_codec, compact_rerank)
+        
+        memory = app.gallery.memory_report()
+        if memory['faces']:
+            st.caption(f"List float64 (format lama): {memory['float64_list_bytes'] / 2**20:.2f} MB · "
+                       f"matriks float32: {memory['float32_bytes'] / 2**20:.2f} MB"
+                       + (f" (di disk, RAM {memory['float32_resident_bytes'] / 2**20:.2f} MB)" if memory['mapped'] else ""))
+            if memory['compact_bytes'] is not None:
+                st.caption(f"Kode {memory['compact_codec']}: {memory['compact_bytes'] / 2**20:.2f} MB · "
+                           f"total galeri di RAM: {memory['total_bytes'] / 2**20:.2f} MB")
+
     with st.sidebar.expander("🎥 Konfigurasi Webcam", expanded=True):
-        if not st.session_state.available_cameras:
-            with st.spinner("Mendeteksi kamera..."):
-                st.session_state.available_cameras = app.get_available_cameras()
+        refresh_cameras = st.button("🔄 Deteksi Ulang Kamera", disabled=st.session_state.webcam_active)
+        if not st.session_state.webcam_active:
+            app.cameras.probe_async(refresh=refresh_cameras, report=STARTUP)
+            cameras = app.cameras.cached_cameras()
+            if cameras is not None:
+                st.session_state.available_cameras = cameras
         
-        if st.session_state.available_cameras:
-            st.session_state.selected_camera = st.selectbox(
+        if app.cameras.probing and not st.session_state.available_cameras:
+            st.info("⏳ Mendeteksi kamera di latar belakang...")
+        elif st.session_state.available_cameras:
+            selected_cameras = st.multiselect(
                 "Pilih Kamera:",
                 options=st.session_state.available_cameras,
-                index=0,
-                format_func=lambda x: f"Kamera {x} {'(Default)' if x == 0 else ''}"
+                default=st.session_state.available_cameras[:1],
+                format_func=lambda x: f"Kamera {x} {'(Default)' if x == 0 else ''}",
+                disabled=st.session_state.webcam_active,
+                help="Beberapa kamera diproses bersamaan dengan galeri dan worker inferensi yang sama. "
+                     "Hentikan webcam untuk mengganti kamera"
             )
+            # Selama streaming pipeline memakai salinan pilihan saat Mulai ditekan (streaming_cameras)
+            if not st.session_state.webcam_active:
+                st.session_state.selected_cameras = selected_cameras
             st.success(f"✅ {len(st.session_state.available_cameras)} kamera terdeteksi")
         else:
             st.error("❌ Tidak ada kamera yang terdeteksi!")
         
+        inference_workers = st.slider(
+            "Worker Inferensi:", 1, 8, 2,
+            help="Jumlah thread inferensi bersama untuk semua kamera. Saat kewalahan, tiap kamera membuang frame miliknya sendiri."
+        )
+        
+        app.detection.scale = st.select_slider(
+            "Skala Deteksi:",
+            options=[0.25, 0.5, 0.75, 1.0],
+            value=app.detection.scale,
+            help="Frame diperkecil untuk deteksi lalu kotak dipetakan kembali. Lebih kecil = lebih cepat, wajah kecil/jauh bisa terlewat."
+        )
+        
+        motion_gate = st.checkbox(
+            "Deteksi hanya saat ada gerakan", value=True,
+            help="Frame yang hampir sama dengan frame terakhir yang diproses memakai hasil deteksi sebelumnya"
+        )
+        motion_threshold = st.slider(
+            "Ambang gerakan (% piksel berubah)", 0.1, 10.0, 1.0, 0.1, disabled=not motion_gate
+        )
+        motion_refresh = st.slider(
+            "Deteksi ulang paksa tiap (detik)", 0.5, 10.0, 2.0, 0.5, disabled=not motion_gate,
+            help="Frame statis tetap diproses sesekali agar hasil tidak basi"
+        )
+        motion_x = st.slider("Area gerakan horizontal (%)", 0, 100, (0, 100), disabled=not motion_gate)
+        motion_y = st.slider("Area gerakan vertikal (%)", 0, 100, (0, 100), disabled=not motion_gate)
+        
         st.session_state.operation_mode = st.radio(
             "Mode Operasi:",
             ["Streaming Real-time", "Auto Capture & Stop"],
             help="Streaming: Tampilkan video terus menerus. Auto Stop: Berhenti otomatis ketika wajah dikenali"
         )
     
-    tab1, tab2, tab3 = st.tabs(["📷 Upload Gambar", "🎥 Webcam Real-time", "ℹ️ Informasi"])
+    with st.sidebar.expander("📡 Pengiriman Frame", expanded=False):
+        delivery_quality = st.slider("Kualitas JPEG", 30, 95, 80)
+        delivery_width = st.select_slider("Lebar maksimum (px)", options=[320, 480, 640, 960, 1280, 1920], value=960)
+        delivery_fps = st.slider(
+            "FPS tampilan maksimum", 1, 30, 15,
+            help="Dibatasi terpisah dari laju inferensi; frame kamera di antaranya tidak dikirim ke browser"
+        )
+        delivery_skip = st.checkbox(
+            "Lewati frame yang tidak berubah", value=True,
+            help="Frame yang gambar dan overlay-nya hampir sama dengan frame terakhir tidak dikirim ulang"
+        )
+    
+    with st.sidebar.expander("📊 Metrik Pipeline", expanded=False):
+        show_metrics_overlay = st.checkbox("Tampilkan metrik di video", value=False)
+        show_metrics_panel = st.checkbox("Tampilkan panel metrik", value=True)
+        metrics_endpoint = st.checkbox("Endpoint Prometheus (HTTP lokal)", value=False)
+        metrics_port = st.number_input("Port", min_value=1024, max_value=65535, value=9108, disabled=not metrics_endpoint)
+        metrics_file = st.text_input("File .prom (opsional)", placeholder="contoh: /var/lib/node_exporter/face.prom")
+        
+        if metrics_endpoint:
+            try:
+                start_metrics_server(app.metrics, int(metrics_port))
+                st.caption(f"Metrik tersedia di http://127.0.0.1:{int(metrics_port)}/metrics")
+            except OSError as e:
+                st.error(f"Gagal membuka port {int(metrics_port)}: {e}")
+    
+    tab1, tab2, tab_video, tab3 = st.tabs(["📷 Upload Gambar", "🎥 Webcam Real-time", "🎞️ Rekaman Video", "ℹ️ Informasi"])
     
     with tab1:
         st.header("Deteksi Wajah dari Gambar")
@@ -322,15 +643,15 @@ def main_streamlit():
             
             with col2:
                 with st.spinner("Memproses gambar..."):
-                    result_image, face_count, recognized_faces = app.process_image(image)
+                    result_image, face_count, recognized_faces = app.process_image(image, image_bytes=uploaded_image.getvalue())
                     
                     if result_image is not None:
                         st.image(result_image, caption=f"Hasil Deteksi ({face_count} wajah ditemukan)", width='stretch')
                         
                         if face_count > 0:
                             if st.session_state.known_faces_loaded:
-                                if recognized_faces and any(name != "Tidak Dikenal" for name in recognized_faces):
-                                    recognized_names = [name for name in recognized_faces if name != "Tidak Dikenal"]
+                                if recognized_faces and any(name != UNKNOWN_NAME for name in recognized_faces):
+                                    recognized_names = [name for name in recognized_faces if name != UNKNOWN_NAME]
                                     st.success(f"✅ Ditemukan {face_count} wajah!")
                                     st.success(f"👤 Wajah dikenali: {', '.join(set(recognized_names))}")
                                 else:
@@ -355,8 +676,9 @@ def main_streamlit():
         
         with col1:
             if not st.session_state.webcam_active:
-                if st.session_state.available_cameras:
+                if st.session_state.selected_cameras:
                     if st.button("🎬 Mulai Webcam", type="primary", use_container_width=True):
+                        st.session_state.streaming_cameras = list(st.session_state.selected_cameras)
                         st.session_state.webcam_active = True
                         st.session_state.face_recognized = False
                         st.session_state.recognized_name = None
@@ -364,14 +686,19 @@ def main_streamlit():
                         st.rerun()
                 else:
                     st.button("🎬 Mulai Webcam", type="primary", use_container_width=True, disabled=True)
-                    st.error("Tidak ada kamera yang tersedia!")
+                    st.error("Tidak ada kamera yang dipilih!")
             else:
                 if st.button("⏹️ Stop Webcam", type="secondary", use_container_width=True):
                     st.session_state.webcam_active = False
                     st.rerun()
             
+            if st.session_state.webcam_active and not st.session_state.streaming_cameras:
+                st.session_state.webcam_active = False
+                st.error("Tidak ada kamera yang dipilih!")
+            
             if st.session_state.webcam_active:
-                st.info(f"🔴 Webcam aktif (Kamera {st.session_state.selected_camera})")
+                cameras = ', '.join(str(camera) for camera in st.session_state.streaming_cameras)
+                st.info(f"🔴 Webcam aktif (Kamera {cameras})")
                 st.info(f"⏱️ Mode: {st.session_state.operation_mode}")
                 
                 if st.session_state.face_recognized:
@@ -379,75 +706,125 @@ def main_streamlit():
                     st.balloons()
         
         with col2:
-            webcam_placeholder = st.empty()
+            sources = st.session_state.streaming_cameras if st.session_state.webcam_active else [None]
+            grid = st.columns(min(len(sources), 2) or 1)
+            webcam_placeholders = {source: grid[i % len(grid)].empty() for i, source in enumerate(sources)}
+            webcam_placeholder = webcam_placeholders[sources[0]]
             status_placeholder = st.empty()
 
             if st.session_state.webcam_active:
-                cap = cv2.VideoCapture(st.session_state.selected_camera)
+                recognize = st.session_state.known_faces_loaded and len(app.gallery) > 0
+                trackers = {source: FaceTracker() for source in sources}
+                app.metrics.set_gauge('gallery_size', len(app.gallery))
+                if app.service is not None:
+                    process_fn = lambda source, frame: app.service.recognize_frame(frame)
+                else:
+                    process_fn = lambda source, frame: app.recognize_tracked(frame, trackers[source], encode=recognize)
+                if motion_gate:
+                    roi = None
+                    if (motion_x, motion_y) != ((0, 100), (0, 100)):
+                        roi = (motion_x[0] / 100, motion_y[0] / 100, motion_x[1] / 100, motion_y[1] / 100)
+                    gates = {
+                        source: MotionGate(threshold=motion_threshold / 100, roi=roi,
+                                           refresh_interval=motion_refresh, metrics=app.metrics)
+                        for source in sources
+                    }
+                    ungated_fn = process_fn
+                    process_fn = lambda source, frame: gates[source].process(frame, lambda f: ungated_fn(source, f))
+                pipeline = MultiCameraPipeline(
+                    sources,
+                    process_fn,
+                    workers=inference_workers,
+                    target_fps=30,
+                    metrics=app.metrics,
+                    manager=app.cameras
+                )
                 
-                if not cap.isOpened():
-                    st.error(f"Tidak dapat mengakses kamera {st.session_state.selected_camera}!")
+                opened = pipeline.opened_sources()
+                for source in sources:
+                    if source not in opened:
+                        webcam_placeholders[source].error(f"Tidak dapat mengakses kamera {source}!")
+                
+                if not opened:
+                    pipeline.stop()
                     st.session_state.webcam_active = False
                 else:
                     try:
-                        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-                        cap.set(cv2.CAP_PROP_FPS, 30)  
-                        
-                        detector = FaceDetector()
+                        pipeline.start()
+                        last_report = time.monotonic()
+                        stop_streaming = False
+                        deliveries = {
+                            source: FrameDelivery(quality=delivery_quality, max_width=delivery_width,
+                                                  max_fps=delivery_fps, skip_unchanged=delivery_skip)
+                            for source in opened
+                        }
                         
-                        while st.session_state.webcam_active:
-                            ret, frame = cap.read()
-                            if not ret:
-                                st.error("Gagal membaca frame dari kamera")
+                        for batch in pipeline.frames():
+                            if not st.session_state.webcam_active:
                                 break
-                
-                            processed_frame, faces = detector.findFaces(frame, draw=True)
-                            face_detected = False
                             
-                            if faces and st.session_state.known_faces_loaded and app.known_face_encodings:
-                                rgb_frame = cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
-                                face_locations = face_recognition.face_locations(rgb_frame)
-                                face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
+                            for source, processed_frame, detections in batch:
+                                detections = detections or []
                                 
-                                for face_encoding, face_location in zip(face_encodings, face_locations):
-                                    matches = face_recognition.compare_faces(app.known_face_encodings, face_encoding, tolerance=0.6)
-                                    name = "Tidak Dikenal"
-                                    
-                                    if True in matches:
-                                        first_match_index = matches.index(True)
-                                        name = app.known_face_names[first_match_index]
-                                        face_detected = True
-                                        
-                                        if st.session_state.operation_mode == "Auto Capture & Stop":
-                                            st.session_state.face_recognized = True
-                                            st.session_state.recognized_name = name
-                                    
-                                    top, right, bottom, left = face_location
-                                    cv2.rectangle(processed_frame, (left, bottom + 5), (right, bottom + 30), (0, 0, 0), -1)
-                                    color = (0, 255, 0) if name != "Tidak Dikenal" else (0, 0, 255)
-                                    cv2.putText(processed_frame, name, (left + 5, bottom + 22), app.font, 0.6, color, 2)
-                            
-                            cv2.putText(processed_frame, f'Wajah: {len(faces) if faces else 0}', (10, 30), app.font, 0.7, (255, 255, 0), 2)
-                            cv2.putText(processed_frame, f'Kamera: {st.session_state.selected_camera}', (10, 60), app.font, 0.5, (255, 255, 255), 1)
-                            cv2.putText(processed_frame, st.session_state.operation_mode, (10, 80), app.font, 0.5, (255, 255, 255), 1)
+                                for _, _, match in detections:
+                                    if match is not None and match.is_known and st.session_state.operation_mode == "Auto Capture & Stop":
+                                        st.session_state.face_recognized = True
+                                        st.session_state.recognized_name = match.name
+                                
+                                recognized_stop = st.session_state.operation_mode == "Auto Capture & Stop" and st.session_state.face_recognized
+                                if not recognized_stop and not deliveries[source].due():
+                                    continue
+                                
+                                app.annotate_frame(processed_frame, detections)
+                                cv2.putText(processed_frame, f'Wajah: {len(detections)}', (10, 30), app.font, 0.7, (255, 255, 0), 2)
+                                cv2.putText(processed_frame, f'Kamera: {source}', (10, 60), app.font, 0.5, (255, 255, 255), 1)
+                                cv2.putText(processed_frame, st.session_state.operation_mode, (10, 80), app.font, 0.5, (255, 255, 255), 1)
+                                if show_metrics_overlay:
+                                    app.metrics.draw_overlay(processed_frame, app.font)
+                                
+                                if recognized_stop:
+                                    cv2.putText(processed_frame, "WAJAH DIKENALI!", (10, 110), app.font, 1, (0, 255, 0), 2)
+                                    payload = deliveries[source].encode(processed_frame, force=True)
+                                    webcam_placeholders[source].image(payload, caption=f"Kamera {source} - Wajah Dikenali!", output_format='JPEG', width='stretch')
+                                    stop_streaming = True
+                                    break
+                                
+                                overlay_key = tuple((location, match.name if match is not None else None) for _, location, match in detections)
+                                with app.metrics.stage('display'):
+                                    payload = deliveries[source].encode(processed_frame, overlay_key)
+                                    if payload is not None:
+                                        webcam_placeholders[source].image(payload, caption=f"Kamera {source}", output_format='JPEG', width='stretch')
+                                if payload is not None:
+                                    app.metrics.count('frames_displayed')
                             
-                            if st.session_state.operation_mode == "Auto Capture & Stop" and st.session_state.face_recognized:
-                                cv2.putText(processed_frame, "WAJAH DIKENALI!", (10, 110), app.font, 1, (0, 255, 0), 2)
-                                display_frame = cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
-                                webcam_placeholder.image(display_frame, caption="Webcam Live - Wajah Dikenali!", width='stretch')
+                            if stop_streaming:
                                 break
-
-                            display_frame = cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
-                            webcam_placeholder.image(display_frame, caption="Webcam Live", width='stretch')
                             
-                            time.sleep(0.03)  
+                            if time.monotonic() - last_report >= 1.0:
+                                last_report = time.monotonic()
+                                if app.sync_gallery():
+                                    app.metrics.set_gauge('gallery_size', len(app.gallery))
+                                app.metrics.set_gauge('delivery_bytes_per_sec',
+                                                      round(sum(d.stats()['bytes_per_sec'] for d in deliveries.values()), 1))
+                                if show_metrics_panel:
+                                    render_metrics_panel(status_placeholder, app.metrics, deliveries)
+                                if metrics_file:
+                                    try:
+                                        app.metrics.write_prometheus_file(metrics_file)
+                                    except OSError as e:
+                                        print(f"Error menulis metrik: {e}")
+                        
+                        for stats in pipeline.stats():
+                            if stats['failed']:
+                                st.error(f"Gagal membaca frame dari kamera {stats['source']}")
+                        for source, error in pipeline.errors().items():
+                            st.error(f"Error inferensi kamera {source}: {error}")
                             
                     except Exception as e:
                         st.error(f"Error dalam webcam: {e}")
                         traceback.print_exc()
                     finally:
-                        cap.release()
+                        pipeline.stop()
                 
                 if st.session_state.face_recognized and st.session_state.operation_mode == "Auto Capture & Stop":
                     st.success(f"✅ Wajah berhasil dikenali: {st.session_state.recognized_name}")
@@ -456,9 +833,81 @@ def main_streamlit():
             else:
                 if st.session_state.available_cameras:
                     webcam_placeholder.info("Klik 'Mulai Webcam' untuk memulai streaming")
+                elif app.cameras.probing:
+                    webcam_placeholder.info("⏳ Mendeteksi kamera...")
                 else:
                     webcam_placeholder.error("Tidak ada kamera yang terdeteksi. Pastikan kamera terhubung dan tidak digunakan aplikasi lain.")
     
+    with tab_video:
+        st.header("Pengenalan dari Rekaman Video")
+        
+        col_process, col_search = st.columns(2)
+        
+        with col_process:
+            st.subheader("Proses Rekaman")
+            video_paths = st.text_area("Path video (satu per baris)", placeholder="contoh: D:/rekaman/pintu_2024-05-01.mp4")
+            video_camera = st.text_input("Label kamera", value="video")
+            video_start = st.text_input(
+                "Waktu frame pertama (opsional)", placeholder="contoh: 2024-05-01T08:00:00",
+                help="Kosongkan untuk memakai waktu modifikasi file dikurangi durasi video. Hanya untuk satu video."
+            )
+            video_stride = st.slider("Kenali setiap frame ke-", 1, 30, 5, help="Frame di antaranya hanya dilewati, tidak dikenali")
+            video_processes = st.slider("Jumlah proses", 1, os.cpu_count() or 1, os.cpu_count() or 1, key="video_processes")
+            if not app.saved():
+                st.caption("⚠️ Worker video memuat galeri dari disk; perubahan yang belum disimpan tidak ikut dipakai")
+            
+            if st.button("🎞️ Proses Video", use_container_width=True) and video_paths.strip():
+                paths = [line.strip() for line in video_paths.splitlines() if line.strip()]
+                missing = [path for path in paths if not os.path.isfile(path)]
+                if missing:
+                    st.error(f"File tidak ditemukan: {', '.join(missing)}")
+                else:
+                    progress_bar = st.progress(0.0, text="Menyiapkan...")
+                    
+                    def update_video_progress(done, total):
+                        progress_bar.progress(done / total if total else 1.0, text=f"{done}/{total} segmen diproses")
+                    
+                    try:
+                        for summary in recognize_videos(paths, video_camera.strip() or 'video', app.sightings, app.model_dir,
+                                                        processes=video_processes, tolerance=app.tolerance,
+                                                        stride=video_stride, start=video_start.strip() or None,
+                                                        progress_callback=update_video_progress):
+                            st.success(f"✓ {os.path.basename(summary['video'])}: {summary['sightings']} sighting dari "
+                                       f"{summary['frames']} frame ({summary['elapsed_s']:.1f} s)")
+                            for error in summary['errors']:
+                                st.warning(f"Segmen {error}")
+                    except Exception as e:
+                        st.error(f"Error memproses video: {e}")
+        
+        with col_search:
+            st.subheader("Cari Sighting")
+            search_name = st.selectbox("Nama", ["(semua)"] + app.sightings.names())
+            search_camera = st.selectbox("Kamera", ["(semua)"] + app.sightings.cameras())
+            today = datetime.now().date()
+            search_dates = st.date_input("Rentang tanggal", value=(today - timedelta(days=1), today))
+            
+            if isinstance(search_dates, (tuple, list)) and len(search_dates) == 2:
+                results = app.sightings.query(
+                    None if search_name == "(semua)" else search_name,
+                    None if search_camera == "(semua)" else search_camera,
+                    datetime.combine(search_dates[0], datetime.min.time()).timestamp(),
+                    datetime.combine(search_dates[1], datetime.max.time()).timestamp(),
+                    limit=500
+                )
+                if results:
+                    st.dataframe([{
+                        'Nama': sighting.name,
+                        'Kamera': sighting.camera,
+                        'Mulai': datetime.fromtimestamp(sighting.start).strftime('%Y-%m-%d %H:%M:%S'),
+                        'Selesai': datetime.fromtimestamp(sighting.end).strftime('%H:%M:%S'),
+                        'Durasi (s)': round(sighting.end - sighting.start, 1),
+                        'Jarak Terbaik': round(sighting.best_distance, 3),
+                        'Deteksi': sighting.detections,
+                    } for sighting in results], use_container_width=True, hide_index=True)
+                    st.caption(f"{len(results)} sighting (maks. 500 ditampilkan)")
+                else:
+                    st.info("Tidak ada sighting pada rentang ini")
+    
     with tab3:
         st.header("📋 Informasi Aplikasi")
         
@@ -517,7 +966,7 @@ def main_streamlit():
             - face_recognition
             - cvzone
             - Streamlit
-            - Pickle (untuk penyimpanan model)
+            - NumPy memmap + log append-only (untuk penyimpanan model)
             """)
             
             st.subheader("Tips:")
@@ -528,6 +977,22 @@ def main_streamlit():
             - Untuk hasil terbaik, gunakan mode 'Auto Capture & Stop'
             - Data wajah otomatis tersimpan di folder 'saved_models'
             """)
+        
+        st.subheader("⏱️ Waktu Startup")
+        if not app.warmed_up.is_set():
+            st.caption("Model deteksi/encoding masih dimuat di latar belakang")
+        st.dataframe(STARTUP.rows(), use_container_width=True, hide_index=True)
+    
+    STARTUP.mark('first_render')
+    if STARTUP.once('startup_report'):
+        print("Waktu startup per fase:")
+        print(STARTUP.summary())
+    
+    if app.cameras.probing and not st.session_state.webcam_active:
+        # Halaman sudah tampil; polling singkat agar thread skrip tidak tertahan selama probe kamera latar,
+        # lalu render ulang (dengan daftar kamera bila probe sudah selesai)
+        app.cameras.wait(timeout=0.5)
+        st.rerun()
 
 def main():
     """Main function"""
@@ -0,0 +1,75 @@
+import numpy as np
+
+from append_buffer import AppendBuffer
+
+
+class MappedRows:
+    """Baris float32 galeri yang dibaca dari file encoding store (memmap) alih-alih disimpan di RAM
+
+    Dipakai mode kompak: pemindaian memakai kode float16/int8 di RAM, dan hanya baris shortlist
+    yang dibaca dari memmap untuk re-rank eksak. index memetakan posisi galeri ke baris file;
+    baris yang ditambahkan setelah pemetaan disimpan di tail (RAM) dengan nomor len(base) + i.
+    Mendukung fork/append/delete seperti AppendBuffer dan pengindeksan NumPy untuk pembacaan
+    (int, slice, array indeks, mask boolean); np.asarray() menyalin seluruh baris ke RAM.
+    """
+
+    ndim = 2
+    dtype = np.dtype(np.float32)
+
+    def __init__(self, base, index=None):
+        self.base = base
+        self._index = AppendBuffer(np.arange(len(base), dtype=np.int64) if index is None
+                                   else np.asarray(index, dtype=np.int64))
+        self._tail = AppendBuffer(row_shape=base.shape[1:])
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def shape(self):
+        return (len(self),) + self.base.shape[1:]
+
+    @property
+    def array(self):
+        return self
+
+    @property
+    def resident_bytes(self):
+        """Byte di RAM: nomor baris dan baris tail (baris file tidak dihitung)"""
+        return len(self._index) * 8 + len(self._tail) * self.base.shape[1] * 4
+
+    def fork(self):
+        other = MappedRows.__new__(MappedRows)
+        other.base = self.base
+        other._index = self._index.fork()
+        other._tail = self._tail.fork()
+        return other
+
+    def _gather(self, rows):
+        base_rows = len(self.base)
+        if not len(self._tail) or rows.size == 0 or rows.max() < base_rows:
+            return np.asarray(self.base[rows], dtype=np.float32)
+        out = np.empty(rows.shape + self.base.shape[1:], dtype=np.float32)
+        mapped = rows < base_rows
+        out[mapped] = self.base[rows[mapped]]
+        out[~mapped] = self._tail.array[rows[~mapped] - base_rows]
+        return out
+
+    def __getitem__(self, key):
+        rows = self._index.array[key]
+        if np.ndim(rows) == 0:
+            return self._gather(np.array([rows]))[0]
+        return self._gather(rows)
+
+    def __array__(self, dtype=None, copy=None):
+        rows = self._gather(self._index.array)
+        return rows if dtype is None else rows.astype(dtype, copy=False)
+
+    def append(self, rows):
+        rows = np.asarray(rows, dtype=np.float32).reshape((-1,) + self.base.shape[1:])
+        first = len(self.base) + len(self._tail)
+        self._tail.append(rows)
+        self._index.append(np.arange(first, first + len(rows), dtype=np.int64))
+
+    def delete(self, index):
+        self._index.delete(index)
@@ -0,0 +1,223 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+STAGES = ('capture', 'motion', 'detection', 'tracking', 'encoding', 'matching', 'annotation', 'display')
+
+
+class RollingHistogram:
+    """Histogram latensi: bucket kumulatif (gaya Prometheus) + jendela sampel terbaru untuk persentil"""
+
+    def __init__(self, window=512, buckets=BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value_ms):
+        self.counts[bisect_left(self.buckets, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        self.recent.append(value_ms)
+
+    def percentiles(self, qs=(50, 90, 99)):
+        if not self.recent:
+            return {q: None for q in qs}
+        values = np.percentile(np.fromiter(self.recent, dtype=np.float64), qs)
+        return {q: float(v) for q, v in zip(qs, values)}
+
+
+class RateMeter:
+    """FPS terukur dari cap waktu event dalam jendela waktu terakhir"""
+
+    def __init__(self, window_s=2.0):
+        self.window_s = window_s
+        self.events = deque()
+
+    def tick(self, now=None):
+        now = time.monotonic() if now is None else now
+        self.events.append(now)
+        while self.events and now - self.events[0] > self.window_s:
+            self.events.popleft()
+
+    def rate(self, now=None):
+        now = time.monotonic() if now is None else now
+        while self.events and now - self.events[0] > self.window_s:
+            self.events.popleft()
+        if len(self.events) < 2:
+            return 0.0
+        span = now - self.events[0]
+        return (len(self.events) - 1) / span if span > 0 else 0.0
+
+
+class PipelineMetrics:
+    """Metrik per tahap untuk stream live; murah (deque + bisect) sehingga bisa selalu aktif
+
+    stage() kompatibel dengan FaceRecognizer.timings, sehingga objek ini bisa langsung dipasang.
+    """
+
+    def __init__(self, window=512):
+        self.window = window
+        self.started = time.time()
+        self.histograms = {}
+        self.counters = {'frames_captured': 0, 'frames_processed': 0, 'frames_dropped': 0, 'frames_displayed': 0}
+        self.gauges = {'gallery_size': 0}
+        self.display_rate = RateMeter()
+        self.inference_rate = RateMeter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    def observe(self, name, value_ms):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = RollingHistogram(self.window)
+            histogram.observe(value_ms)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+            if name == 'frames_displayed':
+                self.display_rate.tick()
+            elif name == 'frames_processed':
+                self.inference_rate.tick()
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def snapshot(self):
+        """Ringkasan metrik saat ini (untuk panel Streamlit dan overlay)"""
+        with self._lock:
+            stages = {}
+            for name, histogram in self.histograms.items():
+                p = histogram.percentiles()
+                stages[name] = {
+                    'count': histogram.count,
+                    'mean_ms': histogram.total / histogram.count if histogram.count else None,
+                    'p50_ms': p[50],
+                    'p90_ms': p[90],
+                    'p99_ms': p[99],
+                }
+            return {
+                'uptime_s': time.time() - self.started,
+                'display_fps': self.display_rate.rate(),
+                'inference_fps': self.inference_rate.rate(),
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+                'stages': stages,
+            }
+
+    def busiest_stage(self):
+        """Tahap dengan p50 terbesar (kandidat bottleneck), atau None"""
+        stages = self.snapshot()['stages']
+        candidates = [(stats['p50_ms'], name) for name, stats in stages.items()
+                      if stats['p50_ms'] is not None and name != 'capture']
+        return max(candidates)[1] if candidates else None
+
+    def render_prometheus(self, prefix='face_recognition'):
+        """Metrik dalam format teks eksposisi Prometheus"""
+        lines = [
+            f"# HELP {prefix}_stage_latency_ms Latensi per tahap pipeline (ms)",
+            f"# TYPE {prefix}_stage_latency_ms histogram",
+        ]
+        with self._lock:
+            for name, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_stage_latency_ms_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_latency_ms_bucket{{stage="{name}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{prefix}_stage_latency_ms_sum{{stage="{name}"}} {histogram.total:.3f}')
+                lines.append(f'{prefix}_stage_latency_ms_count{{stage="{name}"}} {histogram.count}')
+
+            lines.append(f"# TYPE {prefix}_frames_total counter")
+            for name, value in sorted(self.counters.items()):
+                kind = name[len('frames_'):] if name.startswith('frames_') else name
+                lines.append(f'{prefix}_frames_total{{kind="{kind}"}} {value}')
+
+            lines.append(f"# TYPE {prefix}_fps gauge")
+            lines.append(f'{prefix}_fps{{stage="display"}} {self.display_rate.rate():.3f}')
+            lines.append(f'{prefix}_fps{{stage="inference"}} {self.inference_rate.rate():.3f}')
+
+            for name, value in sorted(self.gauges.items()):
+                lines.append(f"# TYPE {prefix}_{name} gauge")
+                lines.append(f"{prefix}_{name} {value}")
+
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus_file(self, path):
+        """Menulis file .prom secara atomik (untuk textfile collector node_exporter)"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def draw_overlay(self, frame, font=cv2.FONT_HERSHEY_SIMPLEX):
+        """Menggambar FPS dan p50 tiap tahap di pojok kanan atas frame"""
+        snapshot = self.snapshot()
+        lines = [f"FPS {snapshot['display_fps']:.1f} / inf {snapshot['inference_fps']:.1f}",
+                 f"drop {snapshot['counters'].get('frames_dropped', 0)}"]
+        for name in STAGES:
+            stats = snapshot['stages'].get(name)
+            if stats and stats['p50_ms'] is not None:
+                lines.append(f"{name} {stats['p50_ms']:.1f} ms")
+
+        x = frame.shape[1] - 190
+        for i, line in enumerate(lines):
+            cv2.putText(frame, line, (x, 20 + 18 * i), font, 0.45, (0, 255, 255), 1)
+        return frame
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    metrics = None
+
+    def do_GET(self):
+        if self.path.rstrip('/') not in ('', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.metrics.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_servers = {}
+_servers_lock = threading.Lock()
+
+
+def start_metrics_server(metrics, port=9108, host='127.0.0.1'):
+    """Endpoint HTTP lokal /metrics; satu server per port per proses (aman dipanggil ulang saat rerun)"""
+    with _servers_lock:
+        server = _servers.get(port)
+        if server is not None:
+            server.RequestHandlerClass.metrics = metrics
+            return server
+
+        handler = type('MetricsHandler', (_MetricsHandler,), {'metrics': metrics})
+        server = ThreadingHTTPServer((host, port), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name=f"metrics-{port}", daemon=True).start()
+        _servers[port] = server
+        return server
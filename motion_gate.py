@@ -0,0 +1,77 @@
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Gerbang perubahan frame: deteksi hanya dijalankan bila isi ROI berubah cukup banyak
+
+    Frame diperkecil ke grayscale kecil (size) lalu dibandingkan dengan frame terakhir yang
+    benar-benar diproses. Frame dianggap berubah bila fraksi piksel yang selisihnya melebihi
+    pixel_delta lebih besar dari threshold. Frame statis memakai hasil terakhir, tetapi
+    setiap refresh_interval detik tetap diproses agar orang yang diam tidak hilang.
+    roi adalah (x0, y0, x1, y1) dalam fraksi 0..1 dari lebar/tinggi frame.
+    """
+
+    def __init__(self, threshold=0.01, roi=None, refresh_interval=2.0, pixel_delta=15, size=(96, 54), metrics=None):
+        self.threshold = threshold
+        self.roi = roi
+        self.refresh_interval = refresh_interval
+        self.pixel_delta = pixel_delta
+        self.size = size
+        self.metrics = metrics
+        self.frames_processed = 0
+        self.frames_skipped = 0
+        self.last_change = 0.0
+        self._reference = None
+        self._processed_at = None
+        self._result = None
+
+    def _thumbnail(self, frame):
+        if self.roi is not None:
+            height, width = frame.shape[:2]
+            x0, y0, x1, y1 = self.roi
+            frame = frame[int(y0 * height):max(int(y1 * height), int(y0 * height) + 1),
+                          int(x0 * width):max(int(x1 * width), int(x0 * width) + 1)]
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def changed(self, frame, now=None):
+        """(perlu_diproses, thumbnail): berubah, belum ada referensi, atau waktu refresh tiba"""
+        now = time.monotonic() if now is None else now
+        if self.metrics is not None:
+            with self.metrics.stage('motion'):
+                thumbnail = self._thumbnail(frame)
+        else:
+            thumbnail = self._thumbnail(frame)
+        if self._reference is None or self._processed_at is None:
+            self.last_change = 1.0
+            return True, thumbnail
+
+        self.last_change = float(np.count_nonzero(cv2.absdiff(thumbnail, self._reference) > self.pixel_delta)) / thumbnail.size
+        if self.last_change > self.threshold:
+            return True, thumbnail
+        return now - self._processed_at >= self.refresh_interval, thumbnail
+
+    def process(self, frame, process_fn, now=None):
+        """process_fn(frame) bila frame berubah, selain itu hasil pemrosesan terakhir"""
+        now = time.monotonic() if now is None else now
+        changed, thumbnail = self.changed(frame, now)
+        if not changed:
+            self.frames_skipped += 1
+            if self.metrics is not None:
+                self.metrics.count('frames_skipped_static')
+            return self._result
+
+        self._result = process_fn(frame)
+        self._reference = thumbnail
+        self._processed_at = now
+        self.frames_processed += 1
+        return self._result
+
+    def reset(self):
+        self._reference = None
+        self._processed_at = None
+        self._result = None
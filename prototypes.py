@@ -0,0 +1,225 @@
+import numpy as np
+
+from append_buffer import AppendBuffer
+
+
+def pairwise_distances(a, b):
+    """Matriks jarak euclidean antara baris a dan baris b"""
+    sq = np.einsum('ij,ij->i', a, a)[:, None] + np.einsum('ij,ij->i', b, b)[None, :] - 2.0 * (a @ b.T)
+    np.maximum(sq, 0.0, out=sq)
+    return np.sqrt(sq, out=sq)
+
+
+def k_medoids(samples, k, iterations=10):
+    """(indeks medoid, assignment, matriks jarak) untuk k cluster; inisialisasi farthest-first"""
+    dist = pairwise_distances(samples, samples)
+    medoids = [int(np.argmin(dist.sum(axis=1)))]
+    while len(medoids) < k:
+        medoids.append(int(np.argmax(dist[:, medoids].min(axis=1))))
+    medoids = np.array(medoids)
+
+    for _ in range(iterations):
+        assign = np.argmin(dist[:, medoids], axis=1)
+        updated = medoids.copy()
+        for cluster in range(k):
+            members = np.flatnonzero(assign == cluster)
+            if len(members):
+                updated[cluster] = members[np.argmin(dist[np.ix_(members, members)].sum(axis=1))]
+        if np.array_equal(updated, medoids):
+            break
+        medoids = updated
+
+    return medoids, np.argmin(dist[:, medoids], axis=1), dist
+
+
+def identity_prototypes(samples, spread=0.3, max_prototypes=3):
+    """(prototipe, radius) satu identitas: sampel tunggal, centroid, atau beberapa medoid bila sampel membentuk
+    kelompok terpisah (mis. dengan/tanpa kacamata); bila medoid pun tidak rapat, centroid tetap dipakai"""
+    samples = np.asarray(samples, dtype=np.float32)
+    if len(samples) == 1:
+        return samples.copy(), np.zeros(1, dtype=np.float32)
+
+    centroid = samples.mean(axis=0, keepdims=True)
+    radius = float(np.linalg.norm(samples - centroid, axis=1).max())
+    if radius <= spread or max_prototypes < 2:
+        return centroid, np.array([radius], dtype=np.float32)
+
+    for k in range(2, min(max_prototypes, len(samples)) + 1):
+        medoids, assign, dist = k_medoids(samples, k)
+        radii = np.array([np.max(dist[assign == cluster, medoid], initial=0.0)
+                          for cluster, medoid in enumerate(medoids)], dtype=np.float32)
+        if radii.max() <= spread:
+            return samples[medoids].copy(), radii
+    return centroid, np.array([radius], dtype=np.float32)
+
+
+class PrototypeIndex:
+    """Prototipe per identitas (nama) untuk pencocokan galeri dengan banyak sampel per orang
+
+    Hanya identitas dengan lebih dari satu sampel yang diberi prototipe; baris identitas bersampel
+    tunggal (single_rows) dicari FaceGallery lewat jalur biasa (ANN, mode kompak, atau eksak).
+    Sampel satu identitas diringkas menjadi centroid, atau beberapa medoid bila sampelnya menyebar
+    lebih dari spread. Radius prototipe adalah jarak terjauh sampel anggotanya, sehingga jarak query
+    ke sampel mana pun minimal d(query, prototipe) - radius. Bila prototipe terdekat jelas di dalam
+    toleransi (di bawah tolerance - margin), hanya sampel identitas itu yang dihitung eksak; di dekat
+    ambang, sampel mentah semua identitas yang batas bawahnya masih di bawah toleransi diperiksa.
+    """
+
+    def __init__(self, spread=0.3, max_prototypes=3, margin=0.08):
+        self.spread = spread
+        self.max_prototypes = max_prototypes
+        self.margin = margin
+        self.prototype_hits = 0
+        self.fallbacks = 0
+        self._row_owner = AppendBuffer(dtype=np.int64)
+        # name <-> id hanya bertambah dan id tidak pernah dipakai ulang (penghitung dibagi antar fork),
+        # sehingga kedua kamus aman dibagi oleh snapshot copy-on-write tanpa disalin
+        self._ids = {}
+        self._names = {}
+        self._identities = {}
+        self._next_id = [0]
+        self._flat = None
+
+    def __len__(self):
+        return sum(len(radii) for _, _, radii in self._identities.values())
+
+    @property
+    def identity_count(self):
+        return len(self._identities)
+
+    def fork(self):
+        """Salinan copy-on-write: pemilik baris dibagi (AppendBuffer), kamus identitas disalin dangkal"""
+        other = PrototypeIndex(self.spread, self.max_prototypes, self.margin)
+        other._row_owner = self._row_owner.fork()
+        other._ids = self._ids
+        other._names = self._names
+        other._identities = dict(self._identities)
+        other._next_id = self._next_id
+        other._flat = self._flat
+        return other
+
+    def _identity_id(self, name):
+        if name not in self._ids:
+            identity = self._next_id[0]
+            self._next_id[0] += 1
+            self._names[identity] = name
+            self._ids[name] = identity
+        return self._ids[name]
+
+    def _set_identity(self, identity, name, samples):
+        if len(samples) > 1:
+            prototypes, radii = identity_prototypes(samples, self.spread, self.max_prototypes)
+            self._identities[identity] = (name, prototypes, radii)
+        else:
+            self._identities.pop(identity, None)
+        self._flat = None
+
+    def build(self, matrix, names):
+        """Menghitung ulang prototipe semua identitas dari matriks galeri"""
+        self._ids = {}
+        self._names = {}
+        self._identities = {}
+        self._next_id = [0]
+        owners = np.array([self._identity_id(name) for name in names], dtype=np.int64)
+        self._row_owner = AppendBuffer(owners)
+
+        order = np.argsort(owners, kind='stable')
+        bounds = np.flatnonzero(np.diff(owners[order])) + 1
+        for rows in np.split(order, bounds) if len(order) else []:
+            # Identitas bersampel tunggal tidak diberi prototipe; barisnya tidak perlu dibaca
+            if len(rows) > 1:
+                identity = int(owners[rows[0]])
+                self._set_identity(identity, self._names[identity], matrix[rows])
+        self._flat = None
+
+    def add(self, matrix, name):
+        """Baris terakhir matriks adalah sampel baru untuk name; hanya prototipe identitas itu yang dihitung ulang"""
+        identity = self._identity_id(name)
+        self._row_owner.append(identity)
+        self._set_identity(identity, name, matrix[self._row_owner.array == identity])
+
+    def remove(self, index, matrix, refresh=True):
+        """Baris index sudah dihapus dari matriks (baris setelahnya bergeser satu)
+
+        refresh=False menunda perhitungan ulang prototipe identitasnya sampai refresh(name) dipanggil,
+        mis. saat semua sampel satu orang dihapus berturut-turut.
+        """
+        identity = int(self._row_owner.array[index])
+        self._row_owner.delete(index)
+        self._flat = None
+        if refresh:
+            self._set_identity(identity, self._names[identity], matrix[self._row_owner.array == identity])
+
+    def refresh(self, name, matrix):
+        """Menghitung ulang prototipe name dari baris miliknya di matriks"""
+        identity = self._ids.get(name)
+        if identity is not None:
+            self._set_identity(identity, name, matrix[self._row_owner.array == identity])
+
+    @property
+    def single_rows(self):
+        """Indeks baris milik identitas bersampel tunggal (tidak tercakup prototipe)"""
+        return self._flatten()[6]
+
+    def _flatten(self):
+        if self._flat is None:
+            owners = []
+            prototypes = []
+            radii = []
+            for identity, (_, points, point_radii) in self._identities.items():
+                owners.extend([identity] * len(point_radii))
+                prototypes.append(points)
+                radii.append(point_radii)
+            matrix = np.ascontiguousarray(np.concatenate(prototypes)) if prototypes else None
+            row_owner = self._row_owner.array
+            order = np.argsort(row_owner, kind='stable')
+            single_rows = np.flatnonzero(~np.isin(row_owner, list(self._identities)))
+            self._flat = (matrix, np.einsum('ij,ij->i', matrix, matrix) if matrix is not None else None,
+                          np.array(owners, dtype=np.int64), np.concatenate(radii) if radii else None,
+                          order, row_owner[order], single_rows)
+        return self._flat
+
+    def _members(self, identities):
+        _, _, _, _, order, sorted_owner, _ = self._flat
+        lo = np.searchsorted(sorted_owner, identities, side='left')
+        hi = np.searchsorted(sorted_owner, identities, side='right')
+        if len(identities) == 1:
+            return order[lo[0]:hi[0]]
+        return np.concatenate([order[start:end] for start, end in zip(lo, hi)])
+
+    def _nearest_sample(self, query, identities, matrix, sq_norms):
+        rows = self._members(identities)
+        sq = query @ query + sq_norms[rows] - 2.0 * (matrix[rows] @ query)
+        best = int(np.argmin(sq))
+        return int(rows[best]), float(np.sqrt(max(sq[best], 0.0)))
+
+    def match(self, queries, matrix, sq_norms, tolerance):
+        """(indeks baris, jarak) sampel terdekat di antara identitas multi-sampel; indeks -1 bila di luar toleransi"""
+        prototypes, p_sq_norms, owners, radii, _, _, _ = self._flatten()
+        indices = np.full(len(queries), -1, dtype=np.int64)
+        distances = np.full(len(queries), np.inf, dtype=np.float32)
+        if prototypes is None or not len(queries):
+            return indices, distances
+
+        sq = np.einsum('ij,ij->i', queries, queries)[:, None] + p_sq_norms[None, :] - 2.0 * (queries @ prototypes.T)
+        np.maximum(sq, 0.0, out=sq)
+        dist = np.sqrt(sq, out=sq)
+
+        for i, (query, row) in enumerate(zip(queries, dist)):
+            best = int(np.argmin(row))
+            distances[i] = row[best]
+            if row[best] <= tolerance - self.margin:
+                index, distance = self._nearest_sample(query, owners[best:best + 1], matrix, sq_norms)
+                if distance <= tolerance:
+                    self.prototype_hits += 1
+                    indices[i], distances[i] = index, distance
+                    continue
+
+            candidates = np.unique(owners[row - radii <= tolerance])
+            if len(candidates):
+                self.fallbacks += 1
+                index, distance = self._nearest_sample(query, candidates, matrix, sq_norms)
+                distances[i] = distance
+                if distance <= tolerance:
+                    indices[i] = index
+        return indices, distances
@@ -0,0 +1,126 @@
+import numpy as np
+
+from append_buffer import AppendBuffer
+
+CODEC_DTYPES = {'float16': np.float16, 'int8': np.int8}
+
+
+class QuantizedMatrix:
+    """Salinan kompak matriks encoding galeri untuk pemindaian kandidat
+
+    - float16: setiap elemen disimpan sebagai half precision (2 byte)
+    - int8: setiap dimensi diskalakan terpisah (scale = max |x_d| / 127), 1 byte per elemen
+
+    Jarak dihitung di domain kompak per potongan baris (potongan diubah ke float32 sementara),
+    lalu FaceGallery menghitung ulang jarak eksak untuk shortlist dari baris float32. Galeri yang
+    dimuat dari GalleryStore membaca baris itu dari memmap file store dan kodenya dari file kode
+    yang tersimpan, sehingga hanya kode yang tinggal di RAM.
+    """
+
+    def __init__(self, codec='int8', headroom=1.1, chunk_size=2048):
+        if codec not in CODEC_DTYPES:
+            raise ValueError(f"Codec tidak dikenal: {codec}")
+        self.codec = codec
+        self.headroom = headroom
+        self.chunk_size = chunk_size
+        self.scale = None
+        self._codes = AppendBuffer(dtype=CODEC_DTYPES[codec])
+        self._sq_norms = AppendBuffer()
+
+    def __len__(self):
+        return len(self._sq_norms)
+
+    @property
+    def codes(self):
+        return self._codes.array
+
+    @property
+    def nbytes(self):
+        """Byte yang dipakai kode, norma dan skala (tanpa kapasitas cadangan)"""
+        if not len(self):
+            return 0
+        scale_bytes = self.scale.nbytes if self.scale is not None else 0
+        return self.codes.nbytes + len(self) * 4 + scale_bytes
+
+    def fork(self):
+        """Salinan copy-on-write (kode dan norma dibagi, lihat AppendBuffer)"""
+        other = QuantizedMatrix(self.codec, self.headroom, self.chunk_size)
+        other.scale = self.scale
+        other._codes = self._codes.fork()
+        other._sq_norms = self._sq_norms.fork()
+        return other
+
+    def quantize(self, matrix):
+        """Kode untuk baris matriks dengan skala saat ini"""
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if self.codec == 'float16':
+            return matrix.astype(np.float16)
+        return np.clip(np.rint(matrix / self.scale), -127, 127).astype(np.int8)
+
+    def _dequantize(self, codes):
+        codes = codes.astype(np.float32)
+        if self.codec == 'int8':
+            codes *= self.scale
+        return codes
+
+    def build(self, matrix):
+        """Mengkuantisasi seluruh matriks (dan menghitung skala per dimensi untuk int8)
+
+        matrix dibaca per potongan, sehingga bisa berupa memmap atau MappedRows tanpa disalin utuh ke RAM.
+        """
+        rows, dim = matrix.shape
+        if self.codec == 'int8':
+            peak = np.zeros(dim, dtype=np.float32)
+            for start in range(0, rows, self.chunk_size):
+                np.maximum(peak, np.abs(np.asarray(matrix[start:start + self.chunk_size])).max(axis=0), out=peak)
+            peak = peak if rows else np.ones(dim, dtype=np.float32)
+            self.scale = (np.maximum(peak, 1e-6) * self.headroom / 127.0).astype(np.float32)
+
+        codes = np.empty((rows, dim), dtype=CODEC_DTYPES[self.codec])
+        for start in range(0, rows, self.chunk_size):
+            codes[start:start + self.chunk_size] = self.quantize(matrix[start:start + self.chunk_size])
+        self.load(codes, self.scale)
+
+    def load(self, codes, scale=None):
+        """Memakai kode yang sudah ada (mis. dari file kode GalleryStore) tanpa membaca baris float32"""
+        codes = np.ascontiguousarray(codes, dtype=CODEC_DTYPES[self.codec])
+        self.scale = scale
+        sq_norms = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), self.chunk_size):
+            block = self._dequantize(codes[start:start + self.chunk_size])
+            sq_norms[start:start + len(block)] = np.einsum('ij,ij->i', block, block)
+        self._codes = AppendBuffer(codes)
+        self._sq_norms = AppendBuffer(sq_norms)
+
+    def needs_rebuild(self, row):
+        """True bila row berada di luar rentang skala int8 saat ini (akan terpotong)"""
+        return self.codec == 'int8' and bool(np.any(np.abs(row) > self.scale * 127.0))
+
+    def add(self, row):
+        row = np.asarray(row, dtype=np.float32)
+        code = self.quantize(row[None, :])
+        value = self._dequantize(code)[0]
+        self._codes.append(code)
+        self._sq_norms.append(value @ value)
+
+    def remove(self, index):
+        self._codes.delete(index)
+        self._sq_norms.delete(index)
+
+    def distances(self, queries, rows=None):
+        """Jarak euclidean aproksimasi (jumlah query x jumlah baris) di domain kompak; rows membatasi ke baris itu"""
+        queries = np.asarray(queries, dtype=np.float32)
+        q_norms = np.einsum('ij,ij->i', queries, queries)
+        # Untuk int8, skala dipindah ke query sehingga potongan kode cukup di-cast ke float32
+        scaled = queries * self.scale if self.codec == 'int8' else queries
+        codes = self.codes if rows is None else self.codes[rows]
+        sq_norms = self._sq_norms.array if rows is None else self._sq_norms.array[rows]
+        out = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for start in range(0, len(codes), self.chunk_size):
+            block = codes[start:start + self.chunk_size].astype(np.float32)
+            out[:, start:start + len(block)] = scaled @ block.T
+        out *= -2.0
+        out += q_norms[:, None]
+        out += sq_norms[None, :]
+        np.maximum(out, 0.0, out=out)
+        return np.sqrt(out, out=out)
@@ -0,0 +1,291 @@
+import threading
+from contextlib import nullcontext
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from ann_index import IVFIndex
+from detection import FaceDetectionStage
+from encoding_cache import image_cache_key
+from face_gallery import FaceGallery, UNKNOWN_NAME, DEFAULT_TOLERANCE
+
+
+def crop_face_region(frame, face_location, margin=0.5, max_face_size=None):
+    """Potongan frame di sekitar wajah (diperlebar margin) dan lokasi wajah relatif terhadap potongan
+
+    Bila wajah lebih besar dari max_face_size piksel, potongan diperkecil; dlib hanya memakai
+    chip 150x150 sehingga detail tambahan tidak mengubah encoding secara berarti.
+    """
+    top, right, bottom, left = face_location
+    height, width = frame.shape[:2]
+    margin_y = int((bottom - top) * margin)
+    margin_x = int((right - left) * margin)
+
+    crop_top = max(0, top - margin_y)
+    crop_left = max(0, left - margin_x)
+    crop_bottom = min(height, bottom + margin_y)
+    crop_right = min(width, right + margin_x)
+
+    crop = frame[crop_top:crop_bottom, crop_left:crop_right]
+    location = (top - crop_top, right - crop_left, bottom - crop_top, left - crop_left)
+
+    face_size = max(bottom - top, right - left)
+    if max_face_size and face_size > max_face_size:
+        factor = max_face_size / float(face_size)
+        crop = cv2.resize(crop, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+        location = tuple(int(round(v * factor)) for v in location)
+
+    return crop, location
+
+
+def batch_face_encodings(items, padding=0.25):
+    """Encoding 128-d untuk banyak (gambar RGB, lokasi) sekaligus dalam satu forward pass dlib
+
+    Hasilnya sama dengan face_recognition.face_encodings per wajah (landmark 5 titik, chip 150x150),
+    tetapi jaringan dijalankan sekali untuk seluruh batch.
+    """
+    if not items:
+        return []
+    import dlib
+    from face_recognition import api as face_recognition_api
+
+    chips = []
+    for rgb_image, (top, right, bottom, left) in items:
+        landmarks = face_recognition_api.pose_predictor_5_point(rgb_image, dlib.rectangle(left, top, right, bottom))
+        chips.append(dlib.get_face_chip(rgb_image, landmarks, size=150, padding=padding))
+    descriptors = face_recognition_api.face_encoder.compute_face_descriptor(chips)
+    return [np.array(descriptor) for descriptor in descriptors]
+
+
+def apply_ann_settings(gallery, enabled, nprobe=8):
+    """Mengaktifkan/menonaktifkan indeks ANN pada galeri, atau hanya mengganti nprobe bila sudah aktif"""
+    if not enabled:
+        gallery.disable_ann()
+    elif gallery.ann is None:
+        gallery.enable_ann(IVFIndex(nprobe=nprobe))
+    else:
+        gallery.ann.nprobe = nprobe
+
+
+def apply_prototype_settings(gallery, enabled):
+    """Mengaktifkan/menonaktifkan pencocokan lewat prototipe per identitas"""
+    if not enabled:
+        gallery.disable_prototypes()
+    elif gallery.prototypes is None:
+        gallery.enable_prototypes()
+
+
+def apply_compact_settings(gallery, codec=None, rerank=32):
+    """Mengaktifkan mode galeri kompak ('float16'/'int8'), atau kembali ke float32 penuh bila codec None"""
+    if codec is None:
+        gallery.disable_compact()
+    elif gallery.compact is None or gallery.compact.codec != codec:
+        gallery.enable_compact(codec, rerank=rerank)
+    else:
+        gallery.rerank = rerank
+
+
+class FaceRecognizer:
+    """Inti pengenalan wajah tanpa Streamlit: deteksi, encoding, pencocokan galeri dan anotasi"""
+
+    # Model dlib dimuat sekali per proses, jadi status warm-up dibagi semua instance (semua sesi)
+    warmed_up = threading.Event()
+
+    def __init__(self, gallery=None, tolerance=DEFAULT_TOLERANCE, detection=None, encoding_cache=None):
+        self.gallery = gallery if gallery is not None else FaceGallery()
+        self.tolerance = tolerance
+        self.ann_enabled = False
+        self.ann_nprobe = 8
+        self.compact_codec = None
+        self.compact_rerank = 32
+        self.prototypes_enabled = False
+        self.detection = detection or FaceDetectionStage()
+        self.encoding_cache = encoding_cache
+        self.roi_encoding = True
+        self.roi_margin = 0.5
+        self.max_face_size = 300
+        self.max_input_side = 1920
+        self.timings = None
+        self.font = cv2.FONT_HERSHEY_SIMPLEX
+        self._encode_lock = threading.Lock()
+
+    def warm_up(self, report=None):
+        """Memuat modul dan model deteksi/encoding lebih awal memakai frame dummy (hasilnya dibuang)
+
+        Detektor mediapipe dibuat per thread, sehingga yang dihangatkan di sini terutama impor
+        modul dan pemuatan model dlib; report (opsional) mencatat durasi tiap fase.
+        """
+        phase = report.phase if report is not None else (lambda name, background: nullcontext())
+        frame = np.zeros((240, 320, 3), dtype=np.uint8)
+
+        with phase('warm_up_detector', background=True):
+            self.detection.detect(frame)
+
+        with phase('warm_up_encoder', background=True):
+            import face_recognition
+            with self._encode_lock:
+                face_recognition.face_encodings(frame[:, :, ::-1].copy(), [(60, 220, 180, 100)])
+        self.warmed_up.set()
+
+    def start_warm_up(self, report=None):
+        """Menjalankan warm_up di thread latar agar render pertama UI tidak menunggu model"""
+        thread = threading.Thread(target=self.warm_up, args=(report,), name="model-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def stage(self, name):
+        """Context manager pengukur waktu tahap pipeline (tanpa biaya bila timings tidak dipasang)"""
+        if self.timings is None:
+            return nullcontext()
+        return self.timings.stage(name)
+
+    def settings(self):
+        """Pengaturan deteksi + encoding yang memengaruhi hasil (untuk kunci cache dan laporan benchmark)"""
+        settings = self.detection.settings()
+        settings.update({
+            'roi_encoding': self.roi_encoding,
+            'roi_margin': self.roi_margin,
+            'max_face_size': self.max_face_size,
+            'max_input_side': self.max_input_side,
+        })
+        return settings
+
+    def configure_ann(self, enabled, nprobe=8):
+        """Mengaktifkan/menonaktifkan indeks ANN untuk galeri besar"""
+        self.ann_enabled = enabled
+        self.ann_nprobe = nprobe
+        apply_ann_settings(self.gallery, enabled, nprobe)
+
+    def configure_compact(self, codec=None, rerank=32):
+        """Mode galeri kompak: pemindaian float16/int8 + re-rank eksak shortlist, hemat memori"""
+        self.compact_codec = codec
+        self.compact_rerank = rerank
+        apply_compact_settings(self.gallery, codec, rerank)
+
+    def configure_prototypes(self, enabled):
+        """Identitas multi-sampel: cocokkan ke centroid/medoid per nama, sampel mentah hanya di dekat ambang"""
+        self.prototypes_enabled = enabled
+        apply_prototype_settings(self.gallery, enabled)
+
+    def match_faces(self, face_encodings, top_k=None):
+        """Mencocokkan semua wajah dalam satu frame terhadap galeri sekaligus"""
+        with self.stage('matching'):
+            if top_k:
+                return self.gallery.top_k(face_encodings, k=top_k, tolerance=self.tolerance)
+            return self.gallery.match(face_encodings, tolerance=self.tolerance)
+
+    def draw_face_label(self, frame, face_location, name):
+        """Menggambar label nama di bawah kotak wajah"""
+        top, right, bottom, left = face_location
+        cv2.rectangle(frame, (left, bottom + 5), (right, bottom + 30), (0, 0, 0), -1)
+        color = (0, 255, 0) if name != UNKNOWN_NAME else (0, 0, 255)
+        cv2.putText(frame, name, (left + 5, bottom + 22), self.font, 0.6, color, 2)
+
+    def detect_faces(self, frame, encode=True):
+        """Deteksi satu kali (cvzone) lalu encoding pada frame bersih memakai kotak yang sama"""
+        with self.stage('detection'):
+            faces, face_locations = self.detection.detect(frame)
+        face_encodings = []
+
+        if faces and encode:
+            face_encodings = self.encode_faces(frame, face_locations)
+
+        return faces, face_locations, face_encodings
+
+    def encode_faces(self, frame, face_locations):
+        """Encoding 128-d untuk lokasi wajah pada frame BGR
+
+        Dengan roi_encoding, hanya potongan di sekitar setiap wajah yang dikonversi dan di-encode,
+        bukan seluruh frame. Model dlib dipakai bersama oleh semua thread inferensi, sehingga
+        encoding diserialkan; deteksi tetap berjalan paralel.
+        """
+        import face_recognition
+
+        with self.stage('encoding'), self._encode_lock:
+            if not self.roi_encoding:
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                return face_recognition.face_encodings(rgb_frame, face_locations)
+
+            face_encodings = []
+            for face_location in face_locations:
+                crop, location = crop_face_region(frame, face_location, self.roi_margin, self.max_face_size)
+                rgb_crop = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+                face_encodings.extend(face_recognition.face_encodings(rgb_crop, [location]))
+            return face_encodings
+
+    def limit_resolution(self, frame):
+        """Memperkecil frame bila sisi terpanjangnya melebihi max_input_side"""
+        longest = max(frame.shape[:2])
+        if not self.max_input_side or longest <= self.max_input_side:
+            return frame
+        factor = self.max_input_side / float(longest)
+        return cv2.resize(frame, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+
+    def recognize_frame(self, frame, encode=True):
+        """Deteksi dan pencocokan satu frame, mengembalikan daftar (face, lokasi, match)"""
+        faces, face_locations, face_encodings = self.detect_faces(frame, encode)
+        matches = self.match_faces(face_encodings) if face_encodings else [None] * len(faces)
+        return list(zip(faces, face_locations, matches))
+
+    def recognize_tracked(self, frame, tracker, encode=True):
+        """Seperti recognize_frame, tetapi encoding hanya untuk track baru, kadaluarsa, atau ragu"""
+        with self.stage('detection'):
+            faces, face_locations = self.detection.detect(frame)
+        with self.stage('tracking'):
+            tracks = tracker.update(face_locations)
+
+        if not encode:
+            return list(zip(faces, face_locations, [None] * len(faces)))
+
+        selected = tracker.select_for_encoding(tracks)
+        if selected:
+            face_encodings = self.encode_faces(frame, [face_locations[i] for i in selected])
+            for i, match in zip(selected, self.match_faces(face_encodings)):
+                tracker.record(tracks[i], match)
+
+        return list(zip(faces, face_locations, tracker.results(tracks)))
+
+    def annotate_frame(self, frame, detections):
+        """Menggambar kotak deteksi dan label nama hasil recognize_frame"""
+        with self.stage('annotation'):
+            self.detection.draw(frame, [face for face, _, _ in detections])
+            for _, face_location, match in detections:
+                if match is not None:
+                    self.draw_face_label(frame, face_location, match.name)
+            return frame
+
+    def recognize_cached(self, frame, image_bytes, encode=True):
+        """Seperti recognize_frame, tetapi lokasi dan encoding diambil dari encoding_cache bila ada"""
+        key = image_cache_key(image_bytes, self.settings())
+        entry = self.encoding_cache.get(key)
+
+        if entry is None or (encode and entry.faces and entry.face_encodings is None):
+            faces, face_locations, face_encodings = self.detect_faces(frame, encode)
+            entry = self.encoding_cache.put(key, faces, face_locations, face_encodings if encode else None)
+
+        if encode and entry.face_encodings:
+            matches = self.match_faces(entry.face_encodings)
+        else:
+            matches = [None] * len(entry.faces)
+        return list(zip(entry.faces, entry.face_locations, matches))
+
+    def recognize_image(self, image, image_bytes=None):
+        """Mengenali wajah pada gambar PIL (RGB) atau array BGR, mengembalikan (gambar RGB beranotasi, deteksi)
+
+        Bila image_bytes (isi file asli) diberikan dan encoding_cache aktif, deteksi dan encoding
+        gambar yang sama tidak dihitung ulang.
+        """
+        if isinstance(image, Image.Image):
+            frame = cv2.cvtColor(np.array(image.convert('RGB')), cv2.COLOR_RGB2BGR)
+        else:
+            frame = image.copy()
+        frame = self.limit_resolution(frame)
+
+        encode = len(self.gallery) > 0
+        if self.encoding_cache is not None and image_bytes is not None:
+            detections = self.recognize_cached(frame, image_bytes, encode)
+        else:
+            detections = self.recognize_frame(frame, encode)
+        self.annotate_frame(frame, detections)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), detections
@@ -0,0 +1,376 @@
+"""Layanan pengenalan wajah lokal (asyncio + HTTP) dengan encoding micro-batch
+
+Satu proses memegang model yang sudah hangat dan galeri di memori; Streamlit (dan klien lain)
+cukup mengirim gambar lewat HTTP. Crop wajah dari request yang datang bersamaan dikumpulkan
+menjadi satu batch encoding dlib (max_batch atau max_wait_ms, mana yang lebih dulu).
+
+    python recognition_service.py --model-dir saved_models --port 8765
+
+API (semua respons JSON kecuali /metrics):
+    GET  /health                     status dan ukuran galeri
+    GET  /faces                      daftar nama di galeri
+    POST /recognize                  body = bytes gambar (JPEG/PNG), hasil deteksi + pencocokan
+    POST /enroll?name=<nama>         body = bytes gambar dengan tepat satu wajah
+    POST /faces/delete?name=<nama>   menghapus semua sampel wajah dengan nama tersebut
+    GET  /metrics                    metrik format Prometheus
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+import cv2
+import numpy as np
+
+from detection import scale_face
+from face_gallery import DEFAULT_TOLERANCE
+from gallery_store import open_store
+from metrics import PipelineMetrics
+from recognition import FaceRecognizer, batch_face_encodings, crop_face_region
+
+MAX_BODY_BYTES = 32 * 1024 * 1024
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               413: 'Payload Too Large', 422: 'Unprocessable Entity', 500: 'Internal Server Error'}
+
+
+class ServiceError(Exception):
+    """Error yang dikembalikan ke klien sebagai respons HTTP dengan status tertentu"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class MicroBatcher:
+    """Mengumpulkan item dari banyak coroutine menjadi satu panggilan process_batch
+
+    Batch dikirim saat berisi max_batch item atau max_wait_ms setelah item pertama masuk.
+    process_batch(items) dijalankan di executor dan harus mengembalikan hasil dengan urutan yang sama.
+    """
+
+    def __init__(self, process_batch, max_batch=32, max_wait_ms=10, executor=None, metrics=None):
+        self.process_batch = process_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.executor = executor
+        self.metrics = metrics
+        self.batches = 0
+        self.items = 0
+        self._queue = None
+        self._task = None
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            start = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self.executor, self.process_batch, items)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(items)
+            if self.metrics is not None:
+                self.metrics.observe('encoding', (time.perf_counter() - start) * 1000)
+                self.metrics.set_gauge('encoding_batch_size', len(items))
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+def detection_to_dict(face, face_location, match):
+    return {
+        'bbox': [int(v) for v in face['bbox']],
+        'score': float(face['score'][0]) if face.get('score') else None,
+        'location': [int(v) for v in face_location],
+        'match': None if match is None else {
+            'name': match.name,
+            'distance': float(match.distance),
+            'confidence': float(match.confidence),
+            'index': int(match.index),
+        },
+    }
+
+
+class RecognitionService:
+    """Inti pengenalan (deteksi, encoding micro-batch, pencocokan, enrollment) untuk banyak klien
+
+    Deteksi berjalan paralel di pool thread (detektor per thread), encoding di satu thread
+    melalui MicroBatcher, dan semua akses galeri dijaga satu lock.
+    """
+
+    def __init__(self, model_dir='saved_models', tolerance=DEFAULT_TOLERANCE, max_batch=32, max_wait_ms=10,
+                 detect_workers=None, metrics=None):
+        self.metrics = metrics or PipelineMetrics()
+        self.store = open_store(model_dir)
+        self.recognizer = FaceRecognizer(self.store.load_gallery(), tolerance=tolerance)
+        self.recognizer.timings = self.metrics
+        self.recognizer.configure_prototypes(True)
+        self.metrics.set_gauge('gallery_size', len(self.recognizer.gallery))
+        self._gallery_lock = threading.RLock()
+        self._detect_pool = ThreadPoolExecutor(detect_workers or os.cpu_count(), thread_name_prefix="detect")
+        self._encode_pool = ThreadPoolExecutor(1, thread_name_prefix="encode")
+        self.batcher = MicroBatcher(self._encode_batch, max_batch, max_wait_ms, self._encode_pool, self.metrics)
+
+    @property
+    def gallery(self):
+        return self.recognizer.gallery
+
+    def start(self):
+        self.batcher.start()
+        return self
+
+    async def close(self):
+        await self.batcher.close()
+        self._detect_pool.shutdown(wait=False)
+        self._encode_pool.shutdown(wait=False)
+
+    def _encode_batch(self, crops):
+        return batch_face_encodings(crops)
+
+    def _prepare(self, image_bytes):
+        """Decode, batasi resolusi dan deteksi; mengembalikan deteksi (koordinat gambar asli) dan crop RGB"""
+        frame = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ServiceError(400, "Gambar tidak bisa dibaca")
+
+        original_side = max(frame.shape[:2])
+        frame = self.recognizer.limit_resolution(frame)
+        factor = original_side / float(max(frame.shape[:2]))
+
+        with self.recognizer.stage('detection'):
+            faces, face_locations = self.recognizer.detection.detect(frame)
+
+        crops = []
+        for face_location in face_locations:
+            crop, location = crop_face_region(frame, face_location, self.recognizer.roi_margin,
+                                              self.recognizer.max_face_size)
+            crops.append((cv2.cvtColor(crop, cv2.COLOR_BGR2RGB), location))
+
+        if factor != 1.0:
+            faces = [scale_face(face, factor) for face in faces]
+            face_locations = [tuple(int(round(v * factor)) for v in location) for location in face_locations]
+        return faces, face_locations, crops
+
+    def _match(self, face_encodings):
+        with self._gallery_lock:
+            if not len(self.gallery):
+                return [None] * len(face_encodings)
+            return self.recognizer.match_faces(face_encodings)
+
+    async def recognize(self, image_bytes):
+        loop = asyncio.get_running_loop()
+        faces, face_locations, crops = await loop.run_in_executor(self._detect_pool, self._prepare, image_bytes)
+        if not faces:
+            return []
+        if not len(self.gallery):
+            # Tidak ada yang bisa dicocokkan; encoding dlib (tahap termahal) dilewati seperti encode=False
+            return [detection_to_dict(face, location, None) for face, location in zip(faces, face_locations)]
+        face_encodings = await asyncio.gather(*(self.batcher.submit(crop) for crop in crops))
+        matches = await loop.run_in_executor(self._detect_pool, self._match, list(face_encodings))
+        return [detection_to_dict(*detection) for detection in zip(faces, face_locations, matches)]
+
+    async def enroll(self, name, image_bytes):
+        loop = asyncio.get_running_loop()
+        faces, _, crops = await loop.run_in_executor(self._detect_pool, self._prepare, image_bytes)
+        if len(faces) != 1:
+            raise ServiceError(422, f"Foto harus berisi tepat satu wajah ({len(faces)} terdeteksi)")
+        face_encoding = await self.batcher.submit(crops[0])
+        return await loop.run_in_executor(self._detect_pool, self._add, face_encoding, name)
+
+    def _add(self, face_encoding, name):
+        with self._gallery_lock:
+            self.gallery.add(face_encoding, name)
+            self.store.append([face_encoding], [name])
+            self.store.maybe_compact()
+            self.metrics.set_gauge('gallery_size', len(self.gallery))
+            return len(self.gallery)
+
+    def delete(self, name):
+        with self._gallery_lock:
+            if name not in self.gallery.names:
+                return False
+            self.store.delete_at(self.gallery.remove_all(name))
+            self.store.maybe_compact()
+            self.metrics.set_gauge('gallery_size', len(self.gallery))
+            return True
+
+    def names(self):
+        with self._gallery_lock:
+            return list(self.gallery.names)
+
+
+class RecognitionServer:
+    """Server HTTP/1.1 minimal di atas asyncio.start_server (keep-alive, body Content-Length)"""
+
+    def __init__(self, service):
+        self.service = service
+
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        try:
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            raise ServiceError(400, "Request line tidak valid")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            headers[key.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length') or 0)
+        if length > MAX_BODY_BYTES:
+            raise ServiceError(413, f"Body melebihi {MAX_BODY_BYTES} bytes")
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), target, headers, body
+
+    async def _dispatch(self, method, target, body):
+        url = urlsplit(target)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        path = url.path.rstrip('/') or '/'
+
+        if path == '/health' and method == 'GET':
+            return 200, {'status': 'ok', 'faces': len(self.service.gallery)}
+        if path == '/faces' and method == 'GET':
+            return 200, {'names': self.service.names()}
+        if path == '/metrics' and method == 'GET':
+            return 200, self.service.metrics.render_prometheus()
+        if path == '/recognize' and method == 'POST':
+            if not body:
+                raise ServiceError(400, "Body gambar kosong")
+            return 200, {'faces': await self.service.recognize(body)}
+        if path == '/enroll' and method == 'POST':
+            if not query.get('name') or not body:
+                raise ServiceError(400, "Parameter name dan body gambar wajib diisi")
+            total = await self.service.enroll(query['name'], body)
+            return 200, {'added': query['name'], 'faces': total}
+        if path == '/faces/delete' and method == 'POST':
+            if not query.get('name'):
+                raise ServiceError(400, "Parameter name wajib diisi")
+            return 200, {'deleted': self.service.delete(query['name'])}
+        if path in ('/health', '/faces', '/metrics', '/recognize', '/enroll', '/faces/delete'):
+            raise ServiceError(405, f"Metode {method} tidak didukung untuk {path}")
+        raise ServiceError(404, f"Path {path} tidak ditemukan")
+
+    async def _write_response(self, writer, status, payload, keep_alive):
+        if isinstance(payload, str):
+            body = payload.encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            content_type = 'application/json; charset=utf-8'
+
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, body = request
+                    keep_alive = headers.get('connection', '').lower() != 'close'
+                    status, payload = await self._dispatch(method, target, body)
+                except ServiceError as e:
+                    status, payload = e.status, {'error': e.message}
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as e:
+                    status, payload = 500, {'error': str(e)}
+
+                await self._write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8765):
+        self.service.start()
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Layanan pengenalan berjalan di http://{host}:{port} ({len(self.service.gallery)} wajah)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Layanan pengenalan wajah lokal (HTTP)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--model-dir', default='saved_models')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--max-batch', type=int, default=32, help="Jumlah crop maksimum per batch encoding")
+    parser.add_argument('--max-wait-ms', type=float, default=10.0,
+                        help="Batas tunggu untuk melengkapi batch setelah crop pertama masuk")
+    parser.add_argument('--detect-workers', type=int, default=None, help="Jumlah thread deteksi (default: jumlah CPU)")
+    args = parser.parse_args(argv)
+
+    service = RecognitionService(args.model_dir, tolerance=args.tolerance, max_batch=args.max_batch,
+                                 max_wait_ms=args.max_wait_ms, detect_workers=args.detect_workers)
+    try:
+        asyncio.run(RecognitionServer(service).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import json
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+import cv2
+
+from face_gallery import MatchResult
+
+DEFAULT_SERVICE_URL = 'http://127.0.0.1:8765'
+
+
+class ServiceUnavailable(Exception):
+    """Layanan pengenalan tidak bisa dihubungi atau mengembalikan error"""
+
+
+def detection_from_dict(data):
+    """(face, lokasi, match) dengan bentuk yang sama seperti FaceRecognizer.recognize_frame"""
+    face = {'bbox': tuple(data['bbox']), 'score': [data['score'] or 0.0]}
+    match = data.get('match')
+    if match is not None:
+        match = MatchResult(match['name'], match['distance'], match['confidence'], match['index'])
+    return face, tuple(data['location']), match
+
+
+class RecognitionClient:
+    """Klien HTTP sinkron untuk recognition_service (dipakai Streamlit sebagai thin client)"""
+
+    def __init__(self, base_url=DEFAULT_SERVICE_URL, timeout=10.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def _request(self, method, path, body=None):
+        request = Request(self.base_url + path, data=body, method=method)
+        if body is not None:
+            request.add_header('Content-Type', 'application/octet-stream')
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except HTTPError as e:
+            try:
+                message = json.loads(e.read().decode('utf-8'))['error']
+            except (ValueError, KeyError):
+                message = e.reason
+            raise ServiceUnavailable(f"{e.code}: {message}") from e
+        except (URLError, OSError) as e:
+            raise ServiceUnavailable(f"Layanan {self.base_url} tidak bisa dihubungi: {e}") from e
+
+    def health(self):
+        return self._request('GET', '/health')
+
+    def is_available(self):
+        try:
+            return self.health().get('status') == 'ok'
+        except ServiceUnavailable:
+            return False
+
+    def names(self):
+        return self._request('GET', '/faces')['names']
+
+    def recognize(self, image_bytes):
+        """Deteksi + pencocokan untuk bytes gambar, mengembalikan daftar (face, lokasi, match)"""
+        response = self._request('POST', '/recognize', image_bytes)
+        return [detection_from_dict(data) for data in response['faces']]
+
+    def recognize_frame(self, frame, quality=90):
+        """Seperti recognize, untuk frame BGR (dikirim sebagai JPEG)"""
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise ValueError("Frame tidak bisa di-encode ke JPEG")
+        return self.recognize(buffer.tobytes())
+
+    def enroll(self, name, image_bytes):
+        return self._request('POST', f"/enroll?name={quote(name)}", image_bytes)
+
+    def delete(self, name):
+        return self._request('POST', f"/faces/delete?name={quote(name)}", b'')['deleted']
@@ -0,0 +1,156 @@
+import os
+import threading
+
+from face_gallery import FaceGallery
+from gallery_store import open_store
+
+
+class SharedGallery:
+    """Satu galeri per proses yang dibagi semua sesi, dengan snapshot copy-on-write
+
+    Pembaca mengambil snapshot (FaceGallery yang tidak pernah diubah lagi) tanpa lock.
+    Penulis diserialkan oleh satu lock: galeri disalin, diubah, disimpan ke store, lalu
+    dipublikasikan sebagai snapshot baru dengan version + 1 dalam satu assignment atomik.
+    Sesi cukup membandingkan version untuk mengetahui ada perubahan.
+    """
+
+    def __init__(self, model_dir, auto_save=True):
+        self.model_dir = model_dir
+        self.auto_save = auto_save
+        self.store = None
+        self._state = (0, FaceGallery())
+        self._dirty = False
+        self._write_lock = threading.RLock()
+
+    @property
+    def version(self):
+        return self._state[0]
+
+    @property
+    def snapshot(self):
+        """Galeri terbaru; jangan diubah langsung, gunakan update()"""
+        return self._state[1]
+
+    def state(self):
+        """(version, snapshot) yang konsisten satu sama lain"""
+        return self._state
+
+    def _publish(self, gallery):
+        self._state = (self._state[0] + 1, gallery)
+        return self._state[0]
+
+    def reload(self):
+        """Memuat ulang galeri dari store di disk dan mempublikasikannya sebagai snapshot baru"""
+        compact = self.snapshot.compact
+        return self._load(compact.codec if compact is not None else None, self.snapshot.rerank)
+
+    def _load(self, codec, rerank):
+        with self._write_lock:
+            self.store = open_store(self.model_dir)
+            # Mode kompak dimuat langsung dari store: kode dari file kode, baris float32 tetap di memmap
+            gallery = self.store.load_gallery(codec, rerank=rerank)
+            self._dirty = False
+            ann = self.snapshot.ann
+            if ann is not None:
+                gallery.enable_ann(type(ann)(ann.nlist, ann.nprobe, ann.min_size, ann.iterations, ann.seed))
+            prototypes = self.snapshot.prototypes
+            if prototypes is not None:
+                gallery.enable_prototypes(type(prototypes)(prototypes.spread, prototypes.max_prototypes, prototypes.margin))
+            self._publish(gallery)
+            return gallery
+
+    def load_compact(self, codec, rerank=32):
+        """Mengaktifkan mode kompak dengan memuat ulang galeri dari store (baris float32 tidak dimuat ke RAM)
+
+        Hanya bila snapshot sudah sama dengan isi store (auto save aktif dan tidak ada perubahan tertunda);
+        mengembalikan False bila tidak, dan pemanggil mengaktifkan mode kompak pada galeri di RAM.
+        """
+        with self._write_lock:
+            if self.store is None or not self.auto_save or self._dirty:
+                return False
+            self._load(codec, rerank)
+            return True
+
+    @property
+    def dirty(self):
+        """True bila ada perubahan yang belum tersimpan ke store (auto save mati atau gagal menulis)"""
+        return self._dirty
+
+    def _persist(self, old, new, removed=()):
+        """Menulis perubahan ke store: tombstone untuk penghapusan, append untuk penambahan di akhir,
+        selain itu (atau bila ada perubahan tertunda) seluruh galeri ditulis ulang"""
+        if not self.auto_save:
+            self._dirty = True
+            return
+        try:
+            if self.store is None:
+                self.store = open_store(self.model_dir)
+            if self._dirty:
+                self.store.rewrite(new.matrix, new.names)
+            elif removed:
+                self.store.delete_at(removed)
+            elif len(new) >= len(old) and new.names[:len(old)] == old.names:
+                added = len(new) - len(old)
+                if added:
+                    self.store.append(new.matrix[-added:], new.names[-added:])
+            else:
+                self.store.rewrite(new.matrix, new.names)
+            self._dirty = False
+            self.store.maybe_compact()
+        except Exception as e:
+            print(f"Error menyimpan perubahan galeri: {e}")
+            self._dirty = True
+
+    def update(self, mutate, persist=True):
+        """Menjalankan mutate(galeri_salinan) lalu mempublikasikan hasilnya; mengembalikan hasil mutate
+
+        Penulis lain menunggu selama mutate berjalan, pembaca tetap memakai snapshot lama.
+        """
+        with self._write_lock:
+            old = self.snapshot
+            gallery = old.copy()
+            result = mutate(gallery)
+            if persist:
+                self._persist(old, gallery)
+            self._publish(gallery)
+            return result
+
+    def add(self, encoding, name):
+        return self.update(lambda gallery: gallery.add(encoding, name))
+
+    def remove(self, name):
+        """Menghapus semua sampel dengan nama tertentu (dicari pada snapshot terbaru di dalam lock)"""
+        with self._write_lock:
+            old = self.snapshot
+            if name not in old.names:
+                return False
+            gallery = old.copy()
+            removed = gallery.remove_all(name)
+            self._persist(old, gallery, removed=removed)
+            self._publish(gallery)
+            return True
+
+    def save(self):
+        """Menulis seluruh snapshot saat ini sebagai generasi baru store"""
+        with self._write_lock:
+            if self.store is None:
+                self.store = open_store(self.model_dir)
+            gallery = self.snapshot
+            self.store.rewrite(gallery.matrix, gallery.names)
+            self._dirty = False
+            return len(gallery)
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_gallery(model_dir):
+    """SharedGallery untuk model_dir, dibuat dan dimuat sekali per proses"""
+    key = os.path.abspath(model_dir)
+    with _shared_lock:
+        gallery = _shared.get(key)
+        if gallery is None:
+            gallery = _shared[key] = SharedGallery(model_dir)
+            gallery.reload()
+        return gallery
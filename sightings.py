@@ -0,0 +1,150 @@
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+
+Sighting = namedtuple('Sighting', ['name', 'camera', 'start', 'end', 'best_distance', 'detections', 'video'])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sightings (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    camera TEXT NOT NULL,
+    start_ts REAL NOT NULL,
+    end_ts REAL NOT NULL,
+    best_distance REAL,
+    detections INTEGER NOT NULL,
+    video TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sightings_name_start ON sightings (name, start_ts);
+CREATE INDEX IF NOT EXISTS idx_sightings_camera_start ON sightings (camera, start_ts);
+CREATE INDEX IF NOT EXISTS idx_sightings_start ON sightings (start_ts);
+CREATE TABLE IF NOT EXISTS sightings_meta (key TEXT PRIMARY KEY, value REAL NOT NULL);
+"""
+
+# Memproses video yang sama dua kali menghasilkan sighting yang sama persis; index unik membuat
+# penulisan ulangnya diabaikan. Database lama dibersihkan dari duplikat sekali sebelum index dibuat.
+UNIQUE_INDEX = """
+DELETE FROM sightings WHERE id NOT IN (
+    SELECT MIN(id) FROM sightings GROUP BY video, camera, name, start_ts
+);
+CREATE UNIQUE INDEX idx_sightings_unique ON sightings (video, camera, name, start_ts);
+"""
+
+
+def merge_sightings(sightings, max_gap):
+    """Menggabungkan sighting nama dan kamera yang sama bila jeda antaranya <= max_gap detik
+
+    Dipakai untuk menyambung sighting yang terpotong batas segmen video.
+    """
+    merged = []
+    for sighting in sorted(sightings, key=lambda s: (s.camera, s.name, s.start)):
+        previous = merged[-1] if merged else None
+        if (previous is not None and previous.camera == sighting.camera and previous.name == sighting.name
+                and sighting.start - previous.end <= max_gap):
+            merged[-1] = previous._replace(
+                end=max(previous.end, sighting.end),
+                best_distance=min(previous.best_distance, sighting.best_distance),
+                detections=previous.detections + sighting.detections,
+            )
+        else:
+            merged.append(sighting)
+    return sorted(merged, key=lambda s: s.start)
+
+
+class SightingStore:
+    """Log sighting (nama, kamera, mulai, selesai, jarak terbaik) di SQLite ber-index
+
+    Waktu disimpan sebagai detik epoch. Query rentang waktu memakai index start_ts: batas bawah
+    diperketat dengan durasi sighting terpanjang yang pernah ditulis, sehingga tidak perlu
+    memindai seluruh tabel meskipun rekaman mencakup berbulan-bulan. Durasi itu disimpan di
+    sightings_meta dan dibaca ulang setiap query, karena proses lain bisa menulis ke file yang sama.
+    """
+
+    def __init__(self, path='sightings.db'):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        with self.conn:
+            if not self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_sightings_unique'").fetchone():
+                self.conn.executescript(UNIQUE_INDEX)
+
+    @property
+    def max_span(self):
+        """Durasi sighting terpanjang yang pernah ditulis ke database (oleh proses mana pun)"""
+        with self._lock:
+            return self._max_span()
+
+    def _max_span(self):
+        row = self.conn.execute("SELECT value FROM sightings_meta WHERE key = 'max_span'").fetchone()
+        return row[0] if row else 0.0
+
+    def add_many(self, sightings):
+        """Menulis banyak sighting dalam satu transaksi, mengembalikan jumlah yang baru tertulis
+
+        Sighting yang sudah ada (video, kamera, nama dan waktu mulai sama) dilewati.
+        """
+        rows = [(s.name, str(s.camera), s.start, s.end, s.best_distance, s.detections, s.video) for s in sightings]
+        if not rows:
+            return 0
+        span = max(end - start for _, _, start, end, _, _, _ in rows)
+        with self._lock, self.conn:
+            inserted = self.conn.executemany(
+                "INSERT OR IGNORE INTO sightings (name, camera, start_ts, end_ts, best_distance, detections, video) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows).rowcount
+            # max() di dalam upsert: nilai lebih besar yang ditulis proses lain tidak pernah diturunkan
+            self.conn.execute(
+                "INSERT INTO sightings_meta (key, value) VALUES ('max_span', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = max(value, excluded.value)", (span,))
+        return inserted
+
+    def query(self, name=None, camera=None, start=None, end=None, limit=1000):
+        """Sighting yang beririsan dengan rentang [start, end], terurut menurut waktu mulai"""
+        clauses = []
+        params = []
+        if name is not None:
+            clauses.append('name = ?')
+            params.append(name)
+        if camera is not None:
+            clauses.append('camera = ?')
+            params.append(str(camera))
+        if start is not None:
+            # Batas bawah start_ts (start - max_span) diisi di bawah lock, lihat di bawah
+            lower = len(params)
+            clauses.append('start_ts >= ? AND end_ts >= ?')
+            params.extend([start, start])
+        if end is not None:
+            clauses.append('start_ts <= ?')
+            params.append(end)
+
+        sql = "SELECT name, camera, start_ts, end_ts, best_distance, detections, video FROM sightings"
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY start_ts'
+        if limit:
+            sql += f' LIMIT {int(limit)}'
+        with self._lock:
+            if start is not None:
+                params[lower] = start - self._max_span()
+            return [Sighting(*row) for row in self.conn.execute(sql, params)]
+
+    def names(self):
+        with self._lock:
+            return [row[0] for row in self.conn.execute("SELECT DISTINCT name FROM sightings ORDER BY name")]
+
+    def cameras(self):
+        with self._lock:
+            return [row[0] for row in self.conn.execute("SELECT DISTINCT camera FROM sightings ORDER BY camera")]
+
+    def count(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM sightings").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
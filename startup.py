@@ -0,0 +1,66 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupReport:
+    """Durasi fase cold start (impor, muat galeri, render pertama, warm-up model, probe kamera)
+
+    Hanya kemunculan pertama setiap fase yang dicatat, sehingga rerun Streamlit dan sesi
+    berikutnya tidak menimpa angka cold start.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.phases = {}
+        self._claimed = set()
+        self._lock = threading.Lock()
+
+    def once(self, name):
+        """True hanya pada panggilan pertama untuk name di proses ini (mis. agar warm-up tidak diulang)"""
+        with self._lock:
+            if name in self._claimed:
+                return False
+            self._claimed.add(name)
+            return True
+
+    def _record(self, name, start, end, background):
+        with self._lock:
+            if name not in self.phases:
+                self.phases[name] = {
+                    'start_ms': (start - self.origin) * 1000,
+                    'duration_ms': (end - start) * 1000,
+                    'background': background,
+                }
+
+    @contextmanager
+    def phase(self, name, background=False):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, start, time.perf_counter(), background)
+
+    def mark(self, name):
+        """Mencatat titik waktu sejak awal proses (mis. 'first_render') sebagai fase yang dimulai di 0"""
+        self._record(name, self.origin, time.perf_counter(), False)
+
+    def done(self, name):
+        return name in self.phases
+
+    def rows(self):
+        with self._lock:
+            items = sorted(self.phases.items(), key=lambda item: item[1]['start_ms'])
+        return [{
+            'Fase': name,
+            'Mulai (ms)': round(phase['start_ms'], 1),
+            'Durasi (ms)': round(phase['duration_ms'], 1),
+            'Thread': 'latar' if phase['background'] else 'utama',
+        } for name, phase in items]
+
+    def summary(self):
+        return '\n'.join(f"{row['Fase']:<18} mulai {row['Mulai (ms)']:>9.1f} ms  durasi {row['Durasi (ms)']:>9.1f} ms"
+                         f"  ({row['Thread']})" for row in self.rows())
+
+
+STARTUP = StartupReport()
@@ -0,0 +1,47 @@
+import numpy as np
+
+from ann_index import IVFIndex
+from face_gallery import FaceGallery
+from prototypes import PrototypeIndex
+from recognition import apply_ann_settings
+
+
+def _gallery(size=50, seed=0):
+    rng = np.random.default_rng(seed)
+    return FaceGallery(rng.normal(size=(size, 128)).astype(np.float32), [f"orang_{i}" for i in range(size)])
+
+
+def test_enable_ann_keeps_passed_index():
+    gallery = _gallery()
+    index = IVFIndex(nlist=4, nprobe=3, min_size=0)
+    assert gallery.enable_ann(index) is index
+    assert gallery.ann is index
+    assert gallery.ann.nprobe == 3
+    assert len(gallery.ann.centroids) == 4
+
+
+def test_apply_ann_settings_keeps_nprobe():
+    gallery = _gallery()
+    apply_ann_settings(gallery, True, nprobe=16)
+    assert gallery.ann.nprobe == 16
+
+
+def test_enable_prototypes_keeps_passed_index():
+    gallery = _gallery()
+    index = PrototypeIndex(spread=0.4, max_prototypes=2, margin=0.05)
+    assert gallery.enable_prototypes(index) is index
+    assert gallery.prototypes.spread == 0.4
+
+
+def test_prototypes_leave_single_photo_identities_to_ann():
+    gallery = _gallery(size=200)
+    rng = np.random.default_rng(1)
+    for _ in range(3):
+        gallery.add(gallery.matrix[0] + rng.normal(scale=0.01, size=128).astype(np.float32), "orang_0")
+    gallery.enable_ann(IVFIndex(nlist=4, nprobe=4, min_size=0))
+    gallery.enable_prototypes()
+
+    assert gallery.prototypes.identity_count == 1
+    assert len(gallery.prototypes.single_rows) == 199
+    queries = gallery.matrix[[0, 5, 150]]
+    assert [match.name for match in gallery.match(queries)] == ["orang_0", "orang_5", "orang_150"]
@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+
+from gallery_store import GalleryStore
+
+
+def _rows(size, seed=0):
+    return np.random.default_rng(seed).normal(scale=0.1, size=(size, 128)).astype(np.float32)
+
+
+def test_log_replay_applies_adds_and_tombstones(tmp_path):
+    store = GalleryStore(str(tmp_path))
+    rows = _rows(6)
+    store.rewrite(rows[:4], ['a', 'b', 'c', 'd'])
+    store.append(rows[4:], ['e', 'f'])
+    store.delete_at([1, 3])
+
+    matrix, names, sq_norms = GalleryStore(str(tmp_path)).load()
+    assert names == ['a', 'c', 'e', 'f']
+    np.testing.assert_array_equal(matrix, rows[[0, 2, 4, 5]])
+    np.testing.assert_allclose(sq_norms, np.einsum('ij,ij->i', matrix, matrix), rtol=1e-6)
+
+
+def test_truncated_log_line_is_ignored(tmp_path):
+    store = GalleryStore(str(tmp_path))
+    store.rewrite(_rows(2), ['a', 'b'])
+    with open(store._log_path(), 'ab') as f:
+        f.write(b'{"op": "add", "row": 2, "na')
+
+    _, names, _ = GalleryStore(str(tmp_path)).load()
+    assert names == ['a', 'b']
+
+
+def test_compaction_drops_tombstones_and_keeps_ids(tmp_path):
+    store = GalleryStore(str(tmp_path), compact_min_rows=2)
+    rows = _rows(8)
+    store.rewrite(rows, list('abcdefgh'))
+    store.delete_at([0, 1, 2])
+    assert store.needs_compaction()
+
+    other = GalleryStore(str(tmp_path))
+    other.load()
+    generation = store.generation
+    store.compact()
+    assert store.generation == generation + 1
+    assert not os.path.exists(store._encodings_path(generation))
+
+    # Posisi milik proses lain tetap mengenai baris yang benar setelah kompaksi
+    other.delete_at([0])
+    matrix, names, _ = GalleryStore(str(tmp_path)).load()
+    assert names == list('efgh')
+    np.testing.assert_array_equal(matrix, rows[4:])
+
+
+def test_compact_mode_reads_persisted_codes(tmp_path):
+    store = GalleryStore(str(tmp_path))
+    rows = _rows(300)
+    store.rewrite(rows, [f"orang_{i}" for i in range(300)])
+    gallery = GalleryStore(str(tmp_path)).load_gallery('int8', rerank=16)
+    assert gallery.mapped
+    assert os.path.exists(store._codes_path('int8'))
+    assert gallery.memory_report()['total_bytes'] < rows.nbytes / 2
+    assert [match.index for match in gallery.match(rows[[3, 150]])] == [3, 150]
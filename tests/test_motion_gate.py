@@ -0,0 +1,61 @@
+import numpy as np
+
+from motion_gate import MotionGate
+
+
+def _frame(value=0):
+    return np.full((240, 320, 3), value, dtype=np.uint8)
+
+
+def _counting():
+    calls = []
+
+    def process(frame):
+        calls.append(frame)
+        return len(calls)
+    return process, calls
+
+
+def test_static_frames_reuse_last_result():
+    gate = MotionGate(refresh_interval=10.0)
+    process, calls = _counting()
+    assert gate.process(_frame(), process, now=0.0) == 1
+    assert gate.process(_frame(), process, now=1.0) == 1
+    assert gate.process(_frame(), process, now=2.0) == 1
+    assert len(calls) == 1
+    assert gate.frames_skipped == 2
+
+
+def test_changed_frame_is_processed():
+    gate = MotionGate(refresh_interval=10.0)
+    process, calls = _counting()
+    gate.process(_frame(), process, now=0.0)
+    assert gate.process(_frame(200), process, now=0.5) == 2
+    assert gate.last_change > gate.threshold
+
+
+def test_static_frame_refreshed_after_interval():
+    gate = MotionGate(refresh_interval=2.0)
+    process, calls = _counting()
+    gate.process(_frame(), process, now=0.0)
+    gate.process(_frame(), process, now=1.9)
+    assert len(calls) == 1
+    gate.process(_frame(), process, now=2.0)
+    assert len(calls) == 2
+    assert gate.frames_processed == 2
+
+
+def test_changes_outside_roi_are_ignored():
+    gate = MotionGate(roi=(0.0, 0.0, 0.5, 1.0), refresh_interval=10.0)
+    process, calls = _counting()
+    gate.process(_frame(), process, now=0.0)
+
+    right = _frame()
+    right[:, 200:] = 255
+    gate.process(right, process, now=0.1)
+    assert len(calls) == 1
+
+    left = _frame()
+    left[:, :100] = 255
+    gate.process(left, process, now=0.2)
+    assert len(calls) == 2
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from quantization import QuantizedMatrix
+
+
+def _matrix(size=500, seed=0):
+    return np.random.default_rng(seed).normal(scale=0.1, size=(size, 128)).astype(np.float32)
+
+
+@pytest.mark.parametrize('codec', ['float16', 'int8'])
+def test_distances_close_to_exact(codec):
+    matrix = _matrix()
+    quantized = QuantizedMatrix(codec)
+    quantized.build(matrix)
+    queries = matrix[:5] + 0.01
+    exact = np.linalg.norm(matrix[None, :, :] - queries[:, None, :], axis=2)
+    assert np.abs(quantized.distances(queries) - exact).max() < 0.02
+    assert quantized.nbytes < matrix.nbytes
+
+
+def test_add_remove_and_fork_keep_rows_in_sync():
+    matrix = _matrix()
+    quantized = QuantizedMatrix('int8')
+    quantized.build(matrix)
+    snapshot = quantized.fork()
+
+    quantized.add(matrix[0] * 0.5)
+    quantized.remove(3)
+    assert len(quantized) == len(matrix)
+    assert len(snapshot) == len(matrix)
+    np.testing.assert_array_equal(snapshot.codes[3], quantized.quantize(matrix[3:4])[0])
+    np.testing.assert_array_equal(quantized.codes[3], quantized.quantize(matrix[4:5])[0])
+
+
+def test_int8_rebuild_needed_outside_scale():
+    quantized = QuantizedMatrix('int8')
+    quantized.build(_matrix())
+    assert not quantized.needs_rebuild(_matrix(1, seed=1)[0] * 0.5)
+    assert quantized.needs_rebuild(np.full(128, 10.0, dtype=np.float32))
+
+
+def test_load_reuses_codes_without_rows():
+    matrix = _matrix()
+    built = QuantizedMatrix('int8')
+    built.build(matrix)
+    loaded = QuantizedMatrix('int8')
+    loaded.load(built.codes, built.scale)
+    np.testing.assert_allclose(loaded.distances(matrix[:3]), built.distances(matrix[:3]))
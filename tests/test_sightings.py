@@ -0,0 +1,53 @@
+from sightings import Sighting, SightingStore, merge_sightings
+
+
+def _store(tmp_path):
+    return SightingStore(str(tmp_path / 'sightings.db'))
+
+
+def test_query_returns_overlapping_sightings(tmp_path):
+    store = _store(tmp_path)
+    store.add_many([
+        Sighting('budi', 0, 100.0, 1100.0, 0.3, 40, 'a.mp4'),
+        Sighting('ani', 0, 1200.0, 1210.0, 0.4, 3, 'a.mp4'),
+        Sighting('budi', 1, 2000.0, 2005.0, 0.35, 2, 'b.mp4'),
+    ])
+    # Sighting panjang yang dimulai jauh sebelum rentang tetap ikut
+    assert [s.name for s in store.query(start=1050.0, end=1205.0)] == ['budi', 'ani']
+    assert [s.camera for s in store.query(name='budi')] == ['0', '1']
+    assert store.query(start=1300.0, end=1900.0) == []
+    store.close()
+
+
+def test_max_span_is_shared_between_writers(tmp_path):
+    first = _store(tmp_path)
+    second = _store(tmp_path)
+    second.add_many([Sighting('budi', 0, 0.0, 500.0, 0.3, 10, 'a.mp4')])
+    first.add_many([Sighting('ani', 0, 600.0, 610.0, 0.3, 2, 'a.mp4')])
+
+    assert first.max_span == 500.0
+    assert [s.name for s in first.query(start=400.0, end=450.0)] == ['budi']
+    first.close()
+    second.close()
+
+
+def test_reprocessed_video_is_not_duplicated(tmp_path):
+    store = _store(tmp_path)
+    sightings = [Sighting('budi', 0, 10.0, 12.0, 0.3, 5, 'a.mp4'), Sighting('ani', 0, 15.0, 16.0, 0.4, 2, 'a.mp4')]
+    assert store.add_many(sightings) == 2
+    assert store.add_many(sightings) == 0
+    assert store.count() == 2
+    store.close()
+
+
+def test_merge_stitches_segment_boundaries():
+    sightings = [
+        Sighting('budi', 0, 0.0, 59.5, 0.4, 30, 'a.mp4'),
+        Sighting('budi', 0, 60.0, 80.0, 0.3, 10, 'a.mp4'),
+        Sighting('budi', 1, 60.0, 70.0, 0.5, 5, 'a.mp4'),
+        Sighting('budi', 0, 120.0, 130.0, 0.45, 4, 'a.mp4'),
+    ]
+    merged = merge_sightings(sightings, max_gap=1.0)
+    assert [(s.camera, s.start, s.end) for s in merged] == [(0, 0.0, 80.0), (1, 60.0, 70.0), (0, 120.0, 130.0)]
+    assert merged[0].best_distance == 0.3
+    assert merged[0].detections == 40
@@ -0,0 +1,139 @@
+from collections import Counter, deque
+
+from face_gallery import MatchResult, UNKNOWN_NAME
+
+
+def location_iou(a, b):
+    """IoU dua lokasi (top, right, bottom, left)"""
+    top = max(a[0], b[0])
+    right = min(a[1], b[1])
+    bottom = min(a[2], b[2])
+    left = max(a[3], b[3])
+    inter = max(0, right - left) * max(0, bottom - top)
+    if not inter:
+        return 0.0
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    return inter / float(area_a + area_b - inter)
+
+
+class Track:
+    """Satu wajah yang diikuti antar frame beserta cache hasil pengenalannya"""
+
+    def __init__(self, track_id, location, frame_index, vote_window):
+        self.id = track_id
+        self.location = location
+        self.first_seen = frame_index
+        self.last_seen = frame_index
+        self.last_encoded = None
+        self.misses = 0
+        self.matches = deque(maxlen=vote_window)
+
+    @property
+    def last_match(self):
+        return self.matches[-1] if self.matches else None
+
+    @property
+    def label(self):
+        """Nama hasil voting beberapa pengenalan terakhir (seri dimenangkan yang paling baru)"""
+        if not self.matches:
+            return None
+        counts = Counter(match.name for match in self.matches)
+        best = max(counts.values())
+        for match in reversed(self.matches):
+            if counts[match.name] == best:
+                return match.name
+
+    def smoothed_match(self):
+        """MatchResult terbaru yang sesuai dengan label hasil voting"""
+        label = self.label
+        if label is None:
+            return None
+        for match in reversed(self.matches):
+            if match.name == label:
+                return match
+
+
+class FaceTracker:
+    """Tracker IoU sederhana: encoding hanya dihitung untuk track baru, saat refresh, atau saat ragu"""
+
+    def __init__(self, iou_threshold=0.3, max_misses=10, refresh_interval=30, uncertain_interval=5,
+                 min_confidence=0.6, vote_window=7):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.refresh_interval = refresh_interval
+        self.uncertain_interval = uncertain_interval
+        self.min_confidence = min_confidence
+        self.vote_window = vote_window
+        self.tracks = []
+        self.frame_index = 0
+        self.encodes = 0
+        self.encodes_skipped = 0
+        self._next_id = 1
+
+    def update(self, face_locations):
+        """Mengasosiasikan lokasi frame ini ke track yang ada, mengembalikan track sejajar dengan lokasi"""
+        self.frame_index += 1
+        pairs = []
+        for ti, track in enumerate(self.tracks):
+            for li, location in enumerate(face_locations):
+                iou = location_iou(track.location, location)
+                if iou >= self.iou_threshold:
+                    pairs.append((iou, ti, li))
+        pairs.sort(reverse=True)
+
+        assigned = [None] * len(face_locations)
+        used_tracks = set()
+        for _, ti, li in pairs:
+            if ti in used_tracks or assigned[li] is not None:
+                continue
+            used_tracks.add(ti)
+            assigned[li] = self.tracks[ti]
+
+        for li, location in enumerate(face_locations):
+            track = assigned[li]
+            if track is None:
+                track = Track(self._next_id, location, self.frame_index, self.vote_window)
+                self._next_id += 1
+                self.tracks.append(track)
+                assigned[li] = track
+            track.location = location
+            track.last_seen = self.frame_index
+            track.misses = 0
+
+        for track in self.tracks:
+            if track.last_seen != self.frame_index:
+                track.misses += 1
+        self.tracks = [track for track in self.tracks if track.misses <= self.max_misses]
+
+        return assigned
+
+    def needs_encoding(self, track):
+        """True untuk track baru, setelah refresh_interval, atau lebih cepat (uncertain_interval) bila ragu"""
+        match = track.last_match
+        if match is None or track.last_encoded is None:
+            return True
+        age = self.frame_index - track.last_encoded
+        if match.confidence < self.min_confidence:
+            return age >= self.uncertain_interval
+        return age >= self.refresh_interval
+
+    def select_for_encoding(self, tracks):
+        """Indeks track yang perlu di-encode pada frame ini"""
+        selected = [i for i, track in enumerate(tracks) if self.needs_encoding(track)]
+        self.encodes_skipped += len(tracks) - len(selected)
+        return selected
+
+    def record(self, track, match):
+        """Menyimpan hasil pengenalan baru ke track"""
+        track.matches.append(match)
+        track.last_encoded = self.frame_index
+        self.encodes += 1
+
+    def results(self, tracks):
+        """MatchResult hasil voting untuk setiap track (UNKNOWN_NAME bila belum pernah dikenali)"""
+        results = []
+        for track in tracks:
+            match = track.smoothed_match()
+            results.append(match if match is not None else MatchResult(UNKNOWN_NAME, float('inf'), 0.0, -1))
+        return results
@@ -0,0 +1,232 @@
+"""Pengenalan wajah pada file rekaman video, hasilnya log sighting di SQLite
+
+Setiap video dibagi menjadi segmen waktu yang di-decode paralel oleh beberapa proses.
+Dari setiap segmen hanya frame ke-stride yang dikenali; deteksi berurutan untuk nama yang
+sama digabung menjadi sighting (nama, mulai, selesai, jarak terbaik).
+
+Contoh:
+    python video_recognize.py rekaman/pintu_2024-05-01.mp4 --camera pintu --start 2024-05-01T08:00:00
+    python video_recognize.py rekaman/*.mp4 --camera lobi --stride 10 --workers 8
+    python video_recognize.py --query --name Budi --since 2024-05-01 --until 2024-05-02
+
+Sighting disimpan di <model-dir>/sightings.db (sama dengan tab Rekaman Video di aplikasi).
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from multiprocessing import Pool
+
+import cv2
+
+from face_gallery import DEFAULT_TOLERANCE
+from gallery_store import load_gallery
+from recognition import FaceRecognizer
+from sightings import Sighting, SightingStore, merge_sightings
+
+DEFAULT_DB = 'sightings.db'
+
+_recognizer = None
+
+
+def _init_worker(model_dir, tolerance):
+    """Initializer pool: setiap worker memuat galeri dan detektor satu kali"""
+    global _recognizer
+    _recognizer = FaceRecognizer(load_gallery(model_dir), tolerance=tolerance)
+
+
+def video_info(path):
+    """(jumlah frame, fps) dari header video"""
+    capture = cv2.VideoCapture(path)
+    try:
+        if not capture.isOpened():
+            raise ValueError(f"Tidak dapat membuka video: {path}")
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        return frame_count, fps
+    finally:
+        capture.release()
+
+
+def video_origin(path, duration, start=None):
+    """Waktu epoch frame pertama: start (datetime/ISO) bila diberikan, selain itu mtime file dikurangi durasi"""
+    if start is None:
+        return os.path.getmtime(path) - duration
+    if isinstance(start, str):
+        start = datetime.fromisoformat(start)
+    return start.timestamp()
+
+
+def plan_segments(path, camera, stride=5, segment_seconds=60.0, start=None, max_gap=None):
+    """Daftar segmen (tuple) untuk recognize_segment; batas segmen diselaraskan ke kelipatan stride"""
+    frame_count, fps = video_info(path)
+    origin = video_origin(path, frame_count / fps, start)
+    max_gap = max_gap if max_gap is not None else max(2.0, 3 * stride / fps)
+    segment_frames = max(stride, int(segment_seconds * fps) // stride * stride)
+    return [
+        (path, str(camera), first, min(first + segment_frames, frame_count), fps, stride, origin, max_gap)
+        for first in range(0, frame_count, segment_frames)
+    ]
+
+
+def recognize_segment(segment, recognizer=None):
+    """Worker: mengenali frame ke-stride dalam satu segmen dan mengembalikan sighting-nya"""
+    recognizer = recognizer or _recognizer
+    path, camera, first, last, fps, stride, origin, max_gap = segment
+    result = {'video': path, 'first_frame': first, 'frames': 0, 'sightings': [], 'error': None}
+
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        result['error'] = 'Gagal membuka video'
+        return result
+
+    open_sightings = {}
+    closed = []
+    try:
+        if first:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, first)
+        for frame_index in range(first, last):
+            if frame_index % stride:
+                # grab() melewati frame tanpa konversi warna; hanya frame sampel yang di-retrieve
+                if not capture.grab():
+                    break
+                continue
+            ok, frame = capture.read()
+            if not ok:
+                break
+            result['frames'] += 1
+            timestamp = origin + frame_index / fps
+
+            for _, _, match in recognizer.recognize_frame(frame, encode=len(recognizer.gallery) > 0):
+                if match is None or not match.is_known:
+                    continue
+                current = open_sightings.get(match.name)
+                if current is not None and timestamp - current.end <= max_gap:
+                    open_sightings[match.name] = current._replace(
+                        end=timestamp,
+                        best_distance=min(current.best_distance, float(match.distance)),
+                        detections=current.detections + 1,
+                    )
+                else:
+                    if current is not None:
+                        closed.append(current)
+                    open_sightings[match.name] = Sighting(match.name, camera, timestamp, timestamp,
+                                                          float(match.distance), 1, path)
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        capture.release()
+
+    result['sightings'] = closed + list(open_sightings.values())
+    return result
+
+
+def recognize_videos(paths, camera, store, model_dir='saved_models', processes=None, tolerance=DEFAULT_TOLERANCE,
+                     stride=5, segment_seconds=60.0, start=None, batch_size=500, progress_callback=None):
+    """Memproses video satu per satu (segmen paralel) dan menulis sighting ke store per batch
+
+    Sighting yang terpotong batas segmen disambung dengan merge_sightings sebelum ditulis.
+    Menghasilkan ringkasan per video.
+    """
+    if start is not None and len(paths) > 1:
+        raise ValueError("start hanya bisa dipakai untuk satu video")
+
+    plans = [(path, plan_segments(path, camera, stride, segment_seconds, start)) for path in paths]
+    total = sum(len(segments) for _, segments in plans)
+    done = 0
+    if progress_callback:
+        progress_callback(0, total)
+
+    def run(pool_map):
+        nonlocal done
+        for path, segments in plans:
+            started = time.perf_counter()
+            sightings = []
+            frames = 0
+            errors = []
+            for result in pool_map(segments):
+                done += 1
+                frames += result['frames']
+                sightings.extend(result['sightings'])
+                if result['error']:
+                    errors.append(f"frame {result['first_frame']}: {result['error']}")
+                if progress_callback:
+                    progress_callback(done, total)
+
+            max_gap = segments[0][7] if segments else 0.0
+            merged = merge_sightings(sightings, max_gap)
+            for i in range(0, len(merged), batch_size):
+                store.add_many(merged[i:i + batch_size])
+            yield {
+                'video': path,
+                'segments': len(segments),
+                'frames': frames,
+                'sightings': len(merged),
+                'errors': errors,
+                'elapsed_s': round(time.perf_counter() - started, 2),
+            }
+
+    if processes == 1:
+        _init_worker(model_dir, tolerance)
+        yield from run(lambda segments: map(recognize_segment, segments))
+        return
+
+    with Pool(processes=processes, initializer=_init_worker, initargs=(model_dir, tolerance)) as pool:
+        yield from run(lambda segments: pool.imap_unordered(recognize_segment, segments))
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+
+def format_sighting(sighting):
+    start = datetime.fromtimestamp(sighting.start)
+    end = datetime.fromtimestamp(sighting.end)
+    return (f"{sighting.name:<20} kamera {sighting.camera:<10} {start:%Y-%m-%d %H:%M:%S} - {end:%H:%M:%S} "
+            f"({sighting.end - sighting.start:.0f} s, jarak {sighting.best_distance:.3f}, {sighting.detections} deteksi)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pengenalan wajah pada rekaman video (log sighting SQLite)")
+    parser.add_argument('videos', nargs='*', help="File video")
+    parser.add_argument('--db', help="File SQLite sighting (default: <model-dir>/sightings.db)")
+    parser.add_argument('--camera', help="Label kamera untuk sighting (default: 'video'); filter kamera saat --query")
+    parser.add_argument('--start', help="Waktu frame pertama (ISO, mis. 2024-05-01T08:00:00); default mtime - durasi")
+    parser.add_argument('--stride', type=int, default=5, help="Kenali setiap frame ke-N")
+    parser.add_argument('--segment-seconds', type=float, default=60.0)
+    parser.add_argument('--model-dir', default='saved_models')
+    parser.add_argument('--workers', '-w', type=int, default=None, help="Jumlah proses (default: jumlah core)")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--query', action='store_true', help="Cari sighting alih-alih memproses video")
+    parser.add_argument('--name')
+    parser.add_argument('--since', help="Awal rentang query (ISO)")
+    parser.add_argument('--until', help="Akhir rentang query (ISO)")
+    parser.add_argument('--limit', type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    store = SightingStore(args.db or os.path.join(args.model_dir, DEFAULT_DB))
+    try:
+        if args.query:
+            for sighting in store.query(args.name, args.camera, _parse_time(args.since), _parse_time(args.until),
+                                        args.limit):
+                print(format_sighting(sighting))
+            return
+
+        if not args.videos:
+            parser.error("Tidak ada file video")
+        if args.stride < 1:
+            parser.error("--stride minimal 1")
+
+        for summary in recognize_videos(args.videos, args.camera or 'video', store, args.model_dir, args.workers,
+                                        args.tolerance, args.stride, args.segment_seconds, args.start):
+            print(f"{summary['video']}: {summary['frames']} frame dikenali dari {summary['segments']} segmen, "
+                  f"{summary['sightings']} sighting dalam {summary['elapsed_s']:.1f} s", file=sys.stderr)
+            for error in summary['errors']:
+                print(f"  error {error}", file=sys.stderr)
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import threading
+import time
+
+import cv2
+
+
+class LatestFrameCapture:
+    """Thread capture kamera yang hanya menyimpan frame terbaru (frame lama langsung ditimpa)"""
+
+    def __init__(self, source, width=640, height=480, fps=30, metrics=None):
+        self.source = source
+        self.metrics = metrics
+        self.cap = cv2.VideoCapture(source)
+        if self.cap.isOpened():
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            self.cap.set(cv2.CAP_PROP_FPS, fps)
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        self.frames_captured = 0
+        self.failed = False
+        self._frame = None
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"capture-{source}", daemon=True)
+
+    def is_opened(self):
+        return self.cap.isOpened()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            ret, frame = self.cap.read()
+            if not ret:
+                self.failed = True
+                break
+            if self.metrics is not None:
+                self.metrics.observe('capture', (time.perf_counter() - start) * 1000)
+                self.metrics.count('frames_captured')
+            with self._cond:
+                self._frame = frame
+                self._seq += 1
+                self.frames_captured += 1
+                self._cond.notify_all()
+
+        with self._cond:
+            self._cond.notify_all()
+
+    def read(self, after_seq=0, timeout=1.0):
+        """Menunggu frame yang lebih baru dari after_seq, mengembalikan (seq, frame) atau (after_seq, None)"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._seq <= after_seq and not self.failed and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            if self._seq <= after_seq:
+                return after_seq, None
+            return self._seq, self._frame
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=2.0)
+        self.cap.release()